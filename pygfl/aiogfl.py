@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: aiogfl.py
+:synopsis: Interface asyncio de pygfl (Python 3 uniquement).
+:author: Stéphane JULIEN
+
+Les appels à la bibliothèque sont exécutés dans un pool de threads dédié : ctypes libère le GIL
+pendant les appels, ils s'exécutent donc réellement en parallèle sans bloquer la boucle d'événements.
+
+Exemple :
+  async with AsyncGFL(max_workers=4) as agfl:
+    bitmap = await agfl.aload(b"photo.jpg")
+    small = await agfl.aresize(bitmap, 320, 200)
+    await agfl.asave(small, b"small.png", "png")
+
+Annuler la tâche qui attend un chargement interrompt le décodage (voir CancelToken) ; un délai
+peut aussi être donné à chaque chargement (`timeout`, GFL_Cancelled est alors levée).
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from ctypes import POINTER, byref
+
+import pygfl
+from pygfl import (GFL_BITMAP, GFL_LOAD_HIGH_QUALITY_THUMBNAIL, GFL_LZW, GFL_RESIZE_BILINEAR,
+                   Bitmap, CancelToken)
+
+
+def _discard(future):
+  "Libère le résultat d'un appel dont plus personne n'attend la fin."
+  if not future.cancelled() and future.exception() is None:
+    result = future.result()
+    if isinstance(result, Bitmap):
+      result.close()
+
+
+class AsyncGFL(object):
+  """\
+  Appels à la bibliothèque depuis une boucle asyncio.
+
+  Les images retournées (Bitmap) appartiennent à l'appelant, qui doit les fermer.
+  """
+  def __init__(self, gfl=None, max_workers=None, max_concurrency=None, executor=None):
+    """\
+    :param _GFL gfl: Instance de la bibliothèque (créée si None).
+    :param int max_workers: Nombre de threads du pool créé (par défaut : min(32, nombre de cœurs + 4),
+                            comme ThreadPoolExecutor).
+    :param int max_concurrency: Nombre maximum d'appels en cours (par défaut : `max_workers`, ou le
+                                nombre de cœurs avec `executor`) ; les appels suivants attendent sans
+                                occuper le pool.
+    :param concurrent.futures.Executor executor: Pool à utiliser au lieu d'en créer un ; il n'est pas
+                                                 arrêté par close().
+    """
+    self.gfl = gfl if gfl is not None else pygfl._GFL()
+    cpus = os.cpu_count() or 1
+    self._own_executor = executor is None
+    if executor is None:
+      max_workers = max_workers or min(32, cpus + 4)
+      executor = ThreadPoolExecutor(max_workers)
+    self.executor = executor
+    self.max_concurrency = max_concurrency or max_workers or cpus
+    self._slots = None  # Sémaphore créé dans la boucle d'événements
+
+  async def _run(self, func, *args, timeout=None):
+    """\
+    Exécute `func(token, *args)` dans le pool, `token` étant un CancelToken de délai `timeout`.
+
+    Si la tâche appelante est annulée, le jeton est annulé et le résultat éventuel est libéré ;
+    la place n'est rendue qu'à la fin effective de l'appel. Le délai court à partir de l'appel,
+    attente d'une place comprise.
+    """
+    token = CancelToken(timeout)
+    if self._slots is None:
+      self._slots = asyncio.Semaphore(self.max_concurrency)
+    await self._slots.acquire()
+    try:
+      future = asyncio.get_running_loop().run_in_executor(self.executor, func, token, *args)
+    except BaseException:
+      self._slots.release()
+      raise
+    future.add_done_callback(lambda _future: self._slots.release())
+    try:
+      return await asyncio.shield(future)
+    except asyncio.CancelledError:
+      token.cancel()
+      future.add_done_callback(_discard)
+      raise
+
+  # Fonctions exécutées dans le pool :
+  def _load(self, token, filename, page):
+    return self.gfl.load_bitmap(filename, page, token=token)
+
+  def _load_bytes(self, token, data, page):
+    return self.gfl.load_bytes(data, page, token=token)
+
+  def _thumbnail(self, token, filename, width, height, page):
+    return self.gfl.load_thumbnail(filename, width, height, page, GFL_LOAD_HIGH_QUALITY_THUMBNAIL, token)
+
+  def _save(self, _token, bitmap, filename, _type, compression, quality):
+    save_params = self.gfl.new_save_params(_type, compression, quality)
+    pygfl.libgfl.gflSaveBitmap(filename, bitmap, byref(save_params))
+
+  def _save_bytes(self, _token, bitmap, _type, compression, quality):
+    return self.gfl.save_bytes(bitmap, _type, compression, quality)
+
+  def _resize(self, _token, bitmap, width, height, method):
+    p_bitmap = POINTER(GFL_BITMAP)()
+    pygfl.libgfl.gflResize(bitmap, byref(p_bitmap), width, height, method, 0)
+    return Bitmap(p_bitmap)
+
+  def _file_info(self, _token, filename):
+    return self.gfl.file_info(filename)
+
+  def _convert(self, token, filenames, target, options):
+    self.gfl.convert2img(filenames, target, token=token, **options)
+
+  def _scaled(self, token, filename, max_width, max_height, method, page):
+    return self.gfl.load_scaled(filename, max_width, max_height, method, page, token).bitmap
+
+  def _region(self, token, filename, rect, page):
+    return self.gfl.load_region(filename, rect, page, token)
+
+  def _transcode(self, token, src, dst, options):
+    self.gfl.transcode(src, dst, token=token, **options)
+
+  # Interface asynchrone :
+  async def aload(self, filename, page=0, timeout=None):
+    """\
+    Charge une page d'un fichier (voir _GFL.load_bitmap) ; annulable pendant le décodage.
+
+    :param float timeout: Délai en secondes.
+    :rtype: Bitmap
+    """
+    return await self._run(self._load, filename, page, timeout=timeout)
+
+  async def aload_bytes(self, data, page=0, timeout=None):
+    """\
+    Charge une page d'une image en mémoire (voir _GFL.load_bytes) ; annulable pendant le décodage.
+
+    :param float timeout: Délai en secondes.
+    :rtype: Bitmap
+    """
+    return await self._run(self._load_bytes, data, page, timeout=timeout)
+
+  async def athumbnail(self, filename, width, height, page=0, timeout=None):
+    """\
+    Charge une vignette (voir _GFL.load_thumbnail) ; annulable pendant le décodage.
+
+    :param float timeout: Délai en secondes.
+    :rtype: Bitmap
+    """
+    return await self._run(self._thumbnail, filename, width, height, page, timeout=timeout)
+
+  async def aload_scaled(self, filename, max_width, max_height, method=GFL_RESIZE_BILINEAR, page=0,
+                         timeout=None):
+    """\
+    Charge une page réduite (voir _GFL.load_scaled) ; annulable pendant le décodage.
+
+    :param float timeout: Délai en secondes.
+    :rtype: Bitmap
+    """
+    return await self._run(self._scaled, filename, max_width, max_height, method, page, timeout=timeout)
+
+  async def aload_region(self, filename, rect, page=0, timeout=None):
+    """\
+    Charge un rectangle d'une page (voir _GFL.load_region) ; annulable entre deux lignes.
+
+    :param float timeout: Délai en secondes.
+    :rtype: Bitmap
+    """
+    return await self._run(self._region, filename, rect, page, timeout=timeout)
+
+  async def atranscode(self, src, dst, timeout=None, **options):
+    "Convertit une page dans un autre format (voir _GFL.transcode) ; annulable."
+    return await self._run(self._transcode, src, dst, options, timeout=timeout)
+
+  async def asave(self, bitmap, filename, _type="tiff", compression=GFL_LZW, quality=None):
+    "Enregistre une image dans un fichier (gflSaveBitmap)."
+    return await self._run(self._save, bitmap, filename, _type, compression, quality)
+
+  async def asave_bytes(self, bitmap, _type="png", compression=None, quality=None):
+    """\
+    Encode une image en mémoire (voir _GFL.save_bytes).
+
+    :rtype: bytes
+    """
+    return await self._run(self._save_bytes, bitmap, _type, compression, quality)
+
+  async def aresize(self, bitmap, width, height, method=GFL_RESIZE_BILINEAR):
+    """\
+    Redimensionne une image (gflResize).
+
+    :rtype: Bitmap
+    """
+    return await self._run(self._resize, bitmap, width, height, method)
+
+  async def afile_info(self, filename):
+    """\
+    Informations d'en-tête d'un fichier (voir _GFL.file_info).
+
+    :rtype: FILE_INFO
+    """
+    return await self._run(self._file_info, filename)
+
+  async def aconvert(self, filenames, target, timeout=None, **options):
+    "Convertit des fichiers en un fichier multi-pages (voir _GFL.convert2img) ; annulable."
+    return await self._run(self._convert, filenames, target, options, timeout=timeout)
+
+  def close(self, wait=True):
+    "Arrête le pool de threads (s'il a été créé par AsyncGFL)."
+    if self._own_executor:
+      self.executor.shutdown(wait)
+
+  async def __aenter__(self):
+    return self
+
+  async def __aexit__(self, _exc_type, _exc_value, _traceback):
+    await asyncio.get_running_loop().run_in_executor(None, self.close)
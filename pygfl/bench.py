@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: bench.py
+:synopsis: Mesures de performance de pygfl (chargement, transformation, enregistrement).
+:author: Stéphane JULIEN
+
+Génère un corpus synthétique (TIFF G4 et LZW, JPEG, PNG ; plusieurs tailles et nombres de pages),
+chronomètre les opérations courantes et écrit les résultats en JSON : débit, latences (percentiles)
+et pic de mémoire résidente, pour suivre les régressions et l'effet des nouveaux modes
+(par exemple transcode ligne par ligne ou image complète).
+
+Usage : python bench.py [--backend native|fake] [--library CHEMIN] [--sizes 640x480,2480x3508] [--pages 1,4] [--repeat 3]
+                        [--only load,thumbnail] [--output resultats.json] [--workdir REPERTOIRE] [--stats]
+                        [--in-process]
+
+--library indique la bibliothèque native à charger (sinon recherche par pygfl.load_library) ;
+--backend fake (ou --fake) mesure pygfl sur la bibliothèque simulée en Python (fakegfl), sans libgfl ;
+--stats ajoute aux résultats les compteurs par fonction de la bibliothèque (voir CallStats).
+Chaque mesure est exécutée dans un processus neuf : `peak_rss_kb` est le pic de ce processus et
+`rss_delta_kb` sa hausse pendant la mesure. Avec --in-process, les mesures s'enchaînent dans le
+processus courant : le pic est alors cumulatif et `rss_delta_kb` n'est que la hausse de ce pic.
+La mesure `startup` (import de pygfl et initialisation de la bibliothèque) est faite dans des processus neufs.
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections import namedtuple, OrderedDict
+from ctypes import POINTER, addressof, byref, memmove
+
+import pygfl
+from pygfl import (GFL_BINARY, GFL_BITMAP, GFL_CCITT_FAX4, GFL_GREY, GFL_HANDLE, GFL_LZW, GFL_RGB,
+                   _clock, _fs_native, bitmap_header)
+
+# (nom, type de fichier, compression, type d'image, multi-pages)
+FORMATS = (('tiff-g4', 'tiff', GFL_CCITT_FAX4, GFL_BINARY, True),
+           ('tiff-lzw', 'tiff', GFL_LZW, GFL_GREY, True),
+           ('jpeg', 'jpeg', None, GFL_RGB, False),
+           ('png', 'png', None, GFL_RGB, False))
+
+CORPUS_FILE = namedtuple('CORPUS_FILE', ['path', 'format', 'type', 'compression', 'width', 'height', 'pages'])
+
+
+# ==========================
+# Corpus
+# ==========================
+def synthetic_bitmap(gfl, _type, width, height, seed=0):
+  """\
+  Image de synthèse : dégradé décalé d'une ligne à l'autre (se compresse sans être uniforme).
+
+  :rtype: Bitmap
+  """
+  bitmap = gfl._alloc_like(bitmap_header(_type, width, height, dpi=200), width, height)
+  bytes_per_line = bitmap.BytesPerLine
+  pattern = bytes(bytearray((i * 7 + seed * 13) & 0xff for i in range(bytes_per_line + 256)))
+  buf = bitmap.buffer()
+  address = addressof(buf)
+  for y in range(height):
+    shift = (y * 3) % 256
+    memmove(address + y * bytes_per_line, pattern[shift:shift + bytes_per_line], bytes_per_line)
+  del buf
+  return bitmap
+
+
+def _write(gfl, path, bitmaps, _type, compression):
+  "Enregistre une ou plusieurs pages (gflFileCreate / gflFileAddPicture)."
+  save_params = gfl.new_save_params(_type, compression, 85)
+  handle = GFL_HANDLE()
+  pygfl.libgfl.gflFileCreate(byref(handle), _fs_native(path), len(bitmaps), byref(save_params))
+  try:
+    for bitmap in bitmaps:
+      pygfl.libgfl.gflFileAddPicture(handle, bitmap)
+  finally:
+    pygfl.libgfl.gflFileClose(handle)
+
+
+def make_corpus(gfl, directory, sizes, pages):
+  """\
+  Génère le corpus : chaque format pour chaque taille, et pour chaque nombre de pages (TIFF).
+
+  :param sizes: Tailles des images.
+  :type  sizes: list((int, int))
+  :param pages: Nombres de pages des fichiers multi-pages.
+  :type  pages: list(int)
+  :rtype: list(CORPUS_FILE)
+  """
+  corpus = []
+  for name, _type, compression, bitmap_type, multipage in FORMATS:
+    if not gfl.formats.is_writable(_type):
+      continue
+    extension = gfl.formats.format(_type).Extensions[0]
+    for width, height in sizes:
+      for count in (pages if multipage else [1]):
+        path = os.path.join(directory, '{}-{}x{}-{}p.{}'.format(name, width, height, count, extension))
+        bitmaps = [synthetic_bitmap(gfl, bitmap_type, width, height, seed) for seed in range(count)]
+        try:
+          _write(gfl, path, bitmaps, _type, compression)
+        finally:
+          for bitmap in bitmaps:
+            bitmap.close()
+        corpus.append(CORPUS_FILE(path, name, _type, compression, width, height, count))
+  return corpus
+
+
+# ==========================
+# Mesures
+# ==========================
+def _time(func, *args, **kwargs):
+  "Durée d'un appel ; une image retournée est libérée hors mesure."
+  start = _clock()
+  result = func(*args, **kwargs)
+  elapsed = _clock() - start
+  if isinstance(result, pygfl.Bitmap):
+    result.close()
+  return elapsed
+
+
+def _resize(bitmap, width, height):
+  p_bitmap = POINTER(GFL_BITMAP)()
+  pygfl.libgfl.gflResize(bitmap, byref(p_bitmap), width, height, pygfl.GFL_RESIZE_BILINEAR, 0)
+  return pygfl.Bitmap(p_bitmap)
+
+
+def bench_file_info(gfl, corpus, workdir):
+  return [_time(gfl._read_file_info, _fs_native(item.path)) for item in corpus]
+
+
+def bench_info_scan(gfl, corpus, workdir):
+  "Lecture des en-têtes de tout le corpus (FileInfoCache.scan, cache vide)."
+  path = os.path.join(workdir, 'scan.db')
+  if os.path.exists(path):
+    os.remove(path)
+  with pygfl.FileInfoCache(gfl, path) as cache:
+    return [_time(cache.scan, os.path.dirname(corpus[0].path))]
+
+
+def bench_load(gfl, corpus, workdir):
+  return [_time(gfl.load_bitmap, _fs_native(item.path)) for item in corpus]
+
+
+def bench_thumbnail(gfl, corpus, workdir):
+  return [_time(gfl.load_thumbnail, _fs_native(item.path), 256, 256) for item in corpus]
+
+
+def bench_resize(gfl, corpus, workdir):
+  latencies = []
+  for item in corpus:
+    with gfl.load_bitmap(_fs_native(item.path)) as bitmap:
+      latencies.append(_time(_resize, bitmap, max(1, item.width // 2), max(1, item.height // 2)))
+  return latencies
+
+
+def bench_save(gfl, corpus, workdir):
+  "Encodage en mémoire dans le format et la compression du fichier source."
+  latencies = []
+  for item in corpus:
+    with gfl.load_bitmap(_fs_native(item.path)) as bitmap:
+      latencies.append(_time(gfl.save_bytes, bitmap, item.type, item.compression))
+  return latencies
+
+
+def bench_convert2img(gfl, corpus, workdir, threads=0):
+  "Conversion de chaque fichier en TIFF G4."
+  target = _fs_native(os.path.join(workdir, 'convert.tif'))
+  return [_time(gfl.convert2img, [_fs_native(item.path)], target, 'tiff', GFL_CCITT_FAX4, threads=threads)
+          for item in corpus]
+
+
+def bench_convert2img_threads(gfl, corpus, workdir):
+  return bench_convert2img(gfl, corpus, workdir, threads=4)
+
+
+def bench_transcode_streaming(gfl, corpus, workdir, streaming=True):
+  "Conversion de la première page de chaque fichier en TIFF LZW, ligne par ligne (voir _GFL.transcode)."
+  target = _fs_native(os.path.join(workdir, 'transcode.tif'))
+  return [_time(gfl.transcode, _fs_native(item.path), target, 'tiff', GFL_LZW, streaming=streaming)
+          for item in corpus]
+
+
+def bench_transcode_full(gfl, corpus, workdir):
+  "Même conversion, image complète chargée puis enregistrée."
+  return bench_transcode_streaming(gfl, corpus, workdir, streaming=False)
+
+
+BENCHMARKS = OrderedDict([('file_info', bench_file_info),
+                          ('info_scan', bench_info_scan),
+                          ('load', bench_load),
+                          ('thumbnail', bench_thumbnail),
+                          ('resize', bench_resize),
+                          ('save', bench_save),
+                          ('convert2img', bench_convert2img),
+                          ('convert2img_threads', bench_convert2img_threads),
+                          ('transcode_streaming', bench_transcode_streaming),
+                          ('transcode_full', bench_transcode_full)])
+
+
+def peak_rss_kb():
+  "Pic de mémoire résidente du processus en Kio (None si indisponible)."
+  try:
+    import resource
+  except ImportError:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _percentile(ordered, percent):
+  "Percentile (rang le plus proche) d'une liste triée."
+  rank = int(math.ceil(percent / 100.0 * len(ordered)))
+  return ordered[min(len(ordered) - 1, max(0, rank - 1))]
+
+
+def summarize(latencies):
+  """\
+  Débit et latences d'une série de mesures.
+
+  :param latencies: Durées en secondes.
+  :rtype: dict
+  """
+  ordered = sorted(latencies)
+  total = sum(ordered)
+  return OrderedDict([('count', len(ordered)),
+                      ('total_s', round(total, 6)),
+                      ('ops_per_s', round(len(ordered) / total, 3) if total else None),
+                      ('mean_ms', round(1000 * total / len(ordered), 3)),
+                      ('p50_ms', round(1000 * _percentile(ordered, 50), 3)),
+                      ('p90_ms', round(1000 * _percentile(ordered, 90), 3)),
+                      ('p99_ms', round(1000 * _percentile(ordered, 99), 3)),
+                      ('max_ms', round(1000 * ordered[-1], 3))])
+
+
+def merge_calls(total, snapshot):
+  "Ajoute à `total` les compteurs d'un CallStats.snapshot() (processus de mesure)."
+  for name, counter in snapshot.items():
+    merged = total.setdefault(name, {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'errors': {},
+                                     'bytes_in': 0, 'bytes_out': 0})
+    for key in ('calls', 'total_s', 'bytes_in', 'bytes_out'):
+      merged[key] += counter[key]
+    merged['max_s'] = max(merged['max_s'], counter['max_s'])
+    for code, count in counter['errors'].items():
+      merged['errors'][code] = merged['errors'].get(code, 0) + count
+  return total
+
+
+_STARTUP = '''\
+import json, sys, time
+clock = getattr(time, 'perf_counter', time.time)
+start = clock()
+import pygfl
+imported = clock()
+pygfl.get_library(sys.argv[1] or None, sys.argv[2] or None)
+pygfl._GFL()
+print(json.dumps([imported - start, clock() - imported]))
+'''
+
+
+def _child_env():
+  "Environnement des processus de mesure : pygfl et bench importables."
+  env = dict(os.environ)
+  here = os.path.dirname(os.path.abspath(__file__))
+  env['PYTHONPATH'] = os.pathsep.join(path for path in (here, env.get('PYTHONPATH')) if path)
+  return env
+
+
+def _last_json_line(output):
+  return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def measure_startup(library=None, repeat=5, backend=None):
+  """\
+  Durées d'import de pygfl et d'initialisation de la bibliothèque, chacune dans un nouveau processus.
+
+  :rtype: dict
+  :return: {'import': résumé, 'init': résumé} (voir summarize)
+  """
+  env = _child_env()
+  imports, inits = [], []
+  for _ in range(repeat):
+    import_s, init_s = _last_json_line(subprocess.check_output(
+      [sys.executable, '-c', _STARTUP, backend or '', library or ''], env=env))
+    imports.append(import_s)
+    inits.append(init_s)
+  return OrderedDict([('import', summarize(imports)), ('init', summarize(inits))])
+
+
+def _measure(gfl, name, corpus, workdir, repeat):
+  "Exécute une mesure `repeat` fois ; retourne (latences, pic RSS avant, pic RSS après)."
+  bench = BENCHMARKS[name]
+  before = peak_rss_kb()
+  latencies = []
+  for _ in range(repeat):
+    latencies.extend(bench(gfl, corpus, workdir))
+  return latencies, before, peak_rss_kb()
+
+
+_CHILD = '''\
+import json, sys
+import bench
+print(json.dumps(bench._child_main(*json.loads(sys.argv[1]))))
+'''
+
+
+def _child_main(name, backend, library, corpus, workdir, repeat, stats):
+  "Processus de mesure (voir run) : ouvre la bibliothèque et exécute une seule mesure."
+  calls = pygfl.CallStats() if stats else None
+  pygfl.get_library(backend, library, calls)
+  gfl = pygfl._GFL()
+  formats = dict((fmt[0], fmt) for fmt in FORMATS)
+  corpus = [CORPUS_FILE(path, fmt, formats[fmt][1], formats[fmt][2], width, height, count)
+            for path, fmt, width, height, count in corpus]
+  latencies, before, after = _measure(gfl, name, corpus, workdir, repeat)
+  return {'latencies': latencies, 'rss_before_kb': before, 'peak_rss_kb': after,
+          'calls': calls.snapshot() if calls is not None else None}
+
+
+def run(gfl, workdir, sizes=((640, 480), (2480, 3508)), pages=(1, 4), repeat=3, only=None,
+        backend=None, library=None, stats=False, isolate=True):
+  """\
+  Génère le corpus dans `workdir` et exécute les mesures.
+
+  :param int repeat: Nombre de passages sur le corpus pour chaque mesure.
+  :param only: Noms des mesures à exécuter (par défaut : toutes, voir BENCHMARKS).
+  :param backend: Implémentation de la bibliothèque des processus de mesure (voir open_backend).
+  :param library: Bibliothèque native des processus de mesure.
+  :param bool stats: Compteurs par fonction (CallStats) des processus de mesure, dans results['calls'].
+  :param bool isolate: Chaque mesure dans un nouveau processus (pic de mémoire propre à la mesure) ;
+                       sinon dans le processus courant, avec `gfl`.
+  :rtype: dict
+  """
+  corpus_dir = os.path.join(workdir, 'corpus')
+  if not os.path.isdir(corpus_dir):
+    os.makedirs(corpus_dir)
+  corpus = make_corpus(gfl, corpus_dir, list(sizes), list(pages))
+
+  results = OrderedDict()
+  calls = {} if stats and isolate else None
+  env = _child_env()
+  for name in BENCHMARKS:
+    if only and name not in only:
+      continue
+    if isolate:
+      args = [name, backend, library,
+              [(item.path, item.format, item.width, item.height, item.pages) for item in corpus],
+              workdir, repeat, stats]
+      child = _last_json_line(subprocess.check_output(
+        [sys.executable, '-c', _CHILD, json.dumps(args)], env=env))
+      latencies, before, after = child['latencies'], child['rss_before_kb'], child['peak_rss_kb']
+      if calls is not None:
+        merge_calls(calls, child['calls'])
+    else:
+      latencies, before, after = _measure(gfl, name, corpus, workdir, repeat)
+    summary = results[name] = summarize(latencies)
+    summary['peak_rss_kb'] = after
+    summary['rss_delta_kb'] = None if after is None else after - before
+
+  report = OrderedDict([('library_version', gfl.formats.version),
+                        ('python', sys.version.split()[0]),
+                        ('platform', sys.platform),
+                        ('corpus', OrderedDict([('files', len(corpus)),
+                                                ('bytes', sum(os.path.getsize(item.path) for item in corpus)),
+                                                ('sizes', ['{}x{}'.format(*size) for size in sizes]),
+                                                ('pages', list(pages))])),
+                        ('benchmarks', results),
+                        ('peak_rss_kb', peak_rss_kb())])
+  if calls is not None:
+    report['calls'] = calls
+  return report
+
+
+def main(argv=None):
+  import argparse
+  parser = argparse.ArgumentParser(description="Mesures de performance de pygfl.")
+  parser.add_argument('--backend', help="Implémentation de la bibliothèque ({})".format(', '.join(sorted(pygfl.BACKENDS))))
+  parser.add_argument('--fake', dest='backend', action='store_const', const='fake', help="Équivaut à --backend fake")
+  parser.add_argument('--library', help="Bibliothèque native à charger (par exemple une bibliothèque de substitution)")
+  parser.add_argument('--sizes', default='640x480,2480x3508', help="Tailles des images (LxH,LxH...)")
+  parser.add_argument('--pages', default='1,4', help="Nombres de pages des TIFF (n,n...)")
+  parser.add_argument('--repeat', type=int, default=3, help="Nombre de passages sur le corpus")
+  parser.add_argument('--only', help="Mesures à exécuter ({},startup)".format(','.join(BENCHMARKS)))
+  parser.add_argument('--workdir', help="Répertoire de travail conservé (par défaut : temporaire)")
+  parser.add_argument('--output', help="Fichier de résultats (par défaut : sortie standard)")
+  parser.add_argument('--stats', action='store_true', help="Compteurs par fonction de la bibliothèque")
+  parser.add_argument('--in-process', action='store_true',
+                      help="Mesures dans le processus courant (pic de mémoire cumulatif)")
+  args = parser.parse_args(argv)
+
+  sizes = [tuple(int(value) for value in size.split('x')) for size in args.sizes.split(',')]
+  pages = [int(count) for count in args.pages.split(',')]
+  only = set(args.only.split(',')) if args.only else None
+
+  startup = measure_startup(args.library, args.repeat, args.backend) if not only or 'startup' in only else None
+  # Sans --in-process, les compteurs viennent des processus de mesure (voir run).
+  stats = pygfl.CallStats() if args.stats and args.in_process else None
+  pygfl.get_library(args.backend, args.library, stats)
+  gfl = pygfl._GFL()
+
+  workdir = args.workdir or tempfile.mkdtemp(prefix='pygfl-bench-')
+  try:
+    results = run(gfl, workdir, sizes, pages, args.repeat, only, args.backend, args.library,
+                  args.stats, not args.in_process)
+    if startup is not None:
+      results['startup'] = startup
+    if stats is not None:
+      results['calls'] = stats.snapshot()
+  finally:
+    if not args.workdir:
+      shutil.rmtree(workdir, True)
+
+  text = json.dumps(results, indent=2)
+  if args.output:
+    with open(args.output, 'w') as fp:
+      fp.write(text)
+  else:
+    print(text)
+
+
+if __name__ == '__main__':
+  main()
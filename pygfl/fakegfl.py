@@ -0,0 +1,862 @@
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: fakegfl.py
+:synopsis: Bibliothèque GFL de substitution en Python pur (tests et mesures sans la bibliothèque native).
+:author: Stéphane JULIEN
+
+FakeGFL présente la même interface que GFL : les fonctions gfl* utilisées par pygfl, avec les mêmes
+arguments et les mêmes erreurs (GFL_Exception). Les images sont de vrais GFL_BITMAP alloués par ctypes ;
+les fichiers ne contiennent en revanche que les pages (en-tête JSON puis octets bruts de la palette
+et des pixels), seuls les fichiers écrits par FakeGFL peuvent donc être relus.
+
+Les traitements sont approchés : redimensionnement au plus proche voisin, niveaux de gris tirés de la
+première composante, rotations par multiples de 90° uniquement. Les chargements appellent les fonctions
+de rappel Progress et WantCancel (décodage simulé, durée `delay`). L'allocateur éventuel transmis à
+gflLibraryInitEx est ignoré.
+
+Usage : pygfl.open_backend('fake') ou variable d'environnement PYGFL_BACKEND=fake.
+"""
+from __future__ import unicode_literals
+
+import ctypes
+import json
+import operator
+import struct
+import threading
+import time
+from ctypes import POINTER, c_void_p, pointer
+
+import pygfl
+from pygfl import GFL_BITMAP, GFL_COLORMAP, GFL_Exception, GFL_UINT8
+from pygfl import (GFL_BINARY, GFL_GREY, GFL_COLORS, GFL_RGB, GFL_RGBA, GFL_BGR, GFL_ABGR, GFL_BGRA,
+                   GFL_ARGB, GFL_CMYK, GFL_CM_RGB, GFL_CM_GREY, GFL_CM_CMYK, GFL_TOP_LEFT, GFL_READ, GFL_WRITE)
+
+_MAGIC = b'FAKEGFL2'
+_HEADER_SIZE = struct.Struct('>I')  # Taille de l'en-tête JSON, après _MAGIC
+_PAGE_FIELDS = ('Type', 'Width', 'Height', 'BitsPerComponent', 'Xdpi', 'Ydpi', 'BytesPerLine')
+
+# Formats : (nom, description, extensions, compressions, types d'image (type, bits) gérés ou None pour tous)
+_FORMATS = [
+  ('tiff', 'TIFF', ('tif', 'tiff'), (0, 1, 2, 3, 4, 7, 8, 9, 11), None),
+  ('png', 'Portable Network Graphics', ('png',), (0, 4),
+   frozenset([(GFL_BINARY, 1), (GFL_GREY, 8), (GFL_GREY, 16), (GFL_COLORS, 8),
+              (GFL_RGB, 8), (GFL_RGB, 16), (GFL_RGBA, 8), (GFL_RGBA, 16)])),
+  ('jpeg', 'JPEG / JFIF', ('jpg', 'jpeg', 'jpe'), (3,),
+   frozenset([(GFL_GREY, 8), (GFL_RGB, 8), (GFL_CMYK, 8)])),
+  ('bmp', 'Windows Bitmap', ('bmp',), (0, 1),
+   frozenset([(GFL_BINARY, 1), (GFL_GREY, 8), (GFL_COLORS, 8), (GFL_RGB, 8), (GFL_BGR, 8)])),
+]
+
+_COMPRESSION_NAMES = {0: 'None', 1: 'RLE', 2: 'LZW', 3: 'JPEG', 4: 'ZIP', 7: 'CCITT FAX3',
+                      8: 'CCITT FAX3-2D', 9: 'CCITT FAX4', 11: 'LZW + Predictor'}
+
+# gflChangeColorDepth : mode -> (type, composantes) ; les autres modes donnent une image GFL_GREY
+_DEPTH_MODES = {pygfl.GFL_MODE_TO_BINARY: (GFL_BINARY, 1),
+                pygfl.GFL_MODE_TO_RGB: (GFL_RGB, 3), pygfl.GFL_MODE_TO_BGR: (GFL_BGR, 3),
+                pygfl.GFL_MODE_TO_RGBA: (GFL_RGBA, 4), pygfl.GFL_MODE_TO_ABGR: (GFL_ABGR, 4),
+                pygfl.GFL_MODE_TO_BGRA: (GFL_BGRA, 4), pygfl.GFL_MODE_TO_ARGB: (GFL_ARGB, 4)}
+_DEPTH_MODES.update((mode, (GFL_COLORS, 1)) for mode in range(pygfl.GFL_MODE_TO_8COLORS,
+                                                               pygfl.GFL_MODE_TO_256COLORS + 1))
+
+# Conversions 1 bit <-> 1 octet par pixel (0 ou 255)
+_UNPACK = [bytes(bytearray(255 if value & (0x80 >> k) else 0 for k in range(8))) for value in range(256)]
+_PACK = dict((bits, value) for value, bits in enumerate(_UNPACK))
+_THRESHOLD = bytes(bytearray(255 if value >= 128 else 0 for value in range(256)))
+
+
+def _error(code, message):
+  return GFL_Exception(code.value, message)
+
+
+def _value(arg):
+  "Valeur d'un entier ou d'un objet ctypes (c_uint16, c_void_p...)."
+  return getattr(arg, 'value', arg)
+
+
+def _target(arg):
+  "Objet désigné par un argument byref() ou pointer()."
+  if hasattr(arg, '_obj'):
+    return arg._obj
+  if isinstance(arg, ctypes._Pointer):
+    return arg.contents
+  return arg
+
+
+def _text(value):
+  return value.decode('latin-1') if isinstance(value, bytes) else value
+
+
+def _unpack(line, width):
+  "Ligne 1 bit -> un octet (0 ou 255) par pixel."
+  return b''.join([_UNPACK[byte] for byte in bytearray(line[:(width + 7) // 8])])[:width]
+
+
+def _pack(pixels, size):
+  "Un octet (0 ou 255) par pixel -> ligne 1 bit de `size` octets."
+  pixels += b'\0' * (-len(pixels) % 8)
+  line = bytes(bytearray(_PACK[pixels[k:k + 8]] for k in range(0, len(pixels), 8)))
+  return line.ljust(size, b'\0')
+
+
+def _picker(indexes):
+  "Fonction retournant les octets d'une ligne (bytearray) aux positions `indexes`."
+  if len(indexes) == 1:
+    index = indexes[0]
+    return lambda line: bytes(bytearray((line[index],)))
+  getter = operator.itemgetter(*indexes)
+  return lambda line: bytes(bytearray(getter(line)))
+
+
+def _data(bitmap):
+  "Adresse des pixels d'une image."
+  return ctypes.cast(bitmap.Data, c_void_p).value
+
+
+def _line(bitmap, y):
+  return ctypes.string_at(_data(bitmap) + y * bitmap.BytesPerLine, bitmap.BytesPerLine)
+
+
+def _set_line(bitmap, y, line):
+  ctypes.memmove(_data(bitmap) + y * bitmap.BytesPerLine, line, min(len(line), bitmap.BytesPerLine))
+
+
+def _step(bitmap):
+  "Octets par pixel (1 pour une image 1 bit, traitée un octet par pixel)."
+  return 1 if bitmap.BitsPerComponent == 1 else bitmap.BytesPerPixel
+
+
+def _pixels(bitmap, y):
+  "Ligne `y` à raison d'un octet (0 ou 255) par pixel pour une image 1 bit."
+  line = _line(bitmap, y)
+  if bitmap.BitsPerComponent == 1:
+    return _unpack(line, bitmap.Width)
+  return line
+
+
+def _set_pixels(bitmap, y, pixels):
+  if bitmap.BitsPerComponent == 1:
+    pixels = _pack(pixels, bitmap.BytesPerLine)
+  _set_line(bitmap, y, pixels)
+
+
+class FakeGFL(object):
+  """\
+  Bibliothèque de substitution (voir le module).
+
+  Les arguments reçus sont ceux que pygfl passe à la bibliothèque native (objets Bitmap, byref(),
+  pointeurs) ; `stats` (CallStats) mesure les appels comme pour GFL.
+  """
+  def __init__(self, libname=None, stats=None):
+    """\
+    Les fonctions gfl* de l'instance sont celles de la classe, précédées de la conversion des arguments
+    (et des mesures si `stats` est donné) ; entre elles, les fonctions appellent celles de la classe.
+
+    :param basestring libname: Ignoré (signature de GFL).
+    :param CallStats stats: Active le mode instrumenté.
+    """
+    self.stats = stats
+    self.delay = 0.0  # Durée simulée d'un décodage (secondes)
+    self._lock = threading.Lock()
+    self._bitmaps = {}  # {adresse du GFL_BITMAP: (GFL_BITMAP, pixels, palette)}
+    self._memory = {}  # {adresse: tampon} des blocs remis à l'appelant
+    self._handles = {}  # {handle: état} des fichiers et lectures / écritures ligne à ligne
+    self._next_handle = 0x1000
+    for name in dir(self):
+      if name.startswith('gfl'):
+        func = self._unwrapped(getattr(self, name))
+        if stats is not None:
+          func = stats.wrap(name, func)
+        setattr(self, name, func)
+
+  @staticmethod
+  def _unwrapped(func):
+    "Remplace les objets ayant un `_as_parameter_` (Bitmap) par sa valeur, comme ctypes."
+    def call(*args):
+      return func(*[getattr(arg, '_as_parameter_', arg) for arg in args])
+    call.__name__ = func.__name__
+    return call
+
+  def bind_all(self):
+    "Fonctions de la bibliothèque non simulées (voir GFL.bind_all)."
+    return sorted(name for name in pygfl.GFL.signatures() if not hasattr(self, name))
+
+  def close(self):
+    self.gflLibraryExit()
+
+  def _after_fork(self):
+    "Processus fils (voir pygfl.get_library)."
+    self._lock = threading.Lock()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+  # ==========================
+  # Mémoire
+  # ==========================
+  def _alloc(self, _type, width, height, bits=8, padding=1, colormap=None):
+    "Alloue une image (pixels à zéro) ; les images GFL_COLORS reçoivent une palette de gris."
+    if width <= 0 or height <= 0:
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Dimensions {}x{} invalides.".format(width, height))
+    if _type == GFL_BINARY:
+      bits = 1
+    components = pygfl._COMPONENTS[_type]
+    bitmap = GFL_BITMAP()
+    bitmap.Type = _type
+    bitmap.Origin = GFL_TOP_LEFT
+    bitmap.Width = width
+    bitmap.Height = height
+    bitmap.BitsPerComponent = bits
+    bitmap.ComponentsPerPixel = components
+    bitmap.BytesPerPixel = (bits * components) // 8
+    bytes_per_line = (width * bits * components + 7) // 8
+    padding = max(1, padding)
+    bitmap.BytesPerLine = (bytes_per_line + padding - 1) // padding * padding
+    bitmap.LinePadding = padding
+    bitmap.TransparentIndex = -1
+    bitmap.Xdpi = bitmap.Ydpi = 72
+    data = (GFL_UINT8 * (bitmap.BytesPerLine * height))()
+    bitmap.Data = ctypes.cast(data, POINTER(GFL_UINT8))
+    if _type == GFL_COLORS:
+      if colormap is None:
+        colormap = GFL_COLORMAP()
+        for k in range(256):
+          colormap.Red[k] = colormap.Green[k] = colormap.Blue[k] = k
+      else:
+        colormap = GFL_COLORMAP.from_buffer_copy(colormap)
+      bitmap.ColorMap = pointer(colormap)
+      bitmap.ColorUsed = 256
+    else:
+      colormap = None
+    with self._lock:
+      self._bitmaps[ctypes.addressof(bitmap)] = (bitmap, data, colormap)
+    return pointer(bitmap)
+
+  def _alloc_like(self, bitmap, width, height):
+    "Alloue une image du type de `bitmap` (résolution et palette comprises)."
+    p_bitmap = self._alloc(bitmap.Type, width, height, bitmap.BitsPerComponent, 1,
+                           bitmap.ColorMap.contents if bitmap.ColorMap else None)
+    p_bitmap.contents.Xdpi = bitmap.Xdpi
+    p_bitmap.contents.Ydpi = bitmap.Ydpi
+    return p_bitmap
+
+  @staticmethod
+  def _set_out(arg, value):
+    "Écrit `value` (pointeur ou entier) à l'adresse désignée par `arg` (byref)."
+    target = _target(arg)
+    if isinstance(value, ctypes._Pointer):
+      ctypes.memmove(ctypes.addressof(target), ctypes.addressof(value), ctypes.sizeof(value))
+    else:
+      target.value = value
+
+  def _keep(self, data):
+    "Tampon remis à l'appelant (libéré par gflMemoryFree)."
+    with self._lock:
+      self._memory[ctypes.addressof(data)] = data
+    return ctypes.addressof(data)
+
+  def gflMemoryAlloc(self, size):
+    return self._keep((ctypes.c_char * max(1, _value(size)))())
+
+  def gflMemoryRealloc(self, ptr, size):
+    size = _value(size)
+    new = FakeGFL.gflMemoryAlloc(self, size)
+    address = _value(ctypes.cast(ptr, c_void_p)) if ptr else None
+    if address:
+      old = self._memory[address]
+      ctypes.memmove(new, old, min(size, ctypes.sizeof(old)))
+      FakeGFL.gflMemoryFree(self, address)
+    return new
+
+  def gflMemoryFree(self, ptr):
+    address = _value(ctypes.cast(ptr, c_void_p))
+    with self._lock:
+      if self._memory.pop(address, None) is None:
+        raise ValueError("Bloc mémoire inconnu ou déjà libéré : {:#x}.".format(address or 0))
+
+  def _new_handle(self, state):
+    with self._lock:
+      self._next_handle += 1
+      self._handles[self._next_handle] = state
+      return self._next_handle
+
+  def _pop_handle(self, handle):
+    with self._lock:
+      return self._handles.pop(_value(handle))
+
+  # ==========================
+  # Bibliothèque
+  # ==========================
+  def gflLibraryInit(self):
+    return 0
+
+  def gflLibraryInitEx(self, alloc, realloc, free, user_params):
+    return 0
+
+  def gflLibraryExit(self):
+    pass
+
+  def gflEnableLZW(self, value):
+    pass
+
+  def gflSetPluginsPathname(self, path):
+    pass
+
+  def gflGetVersion(self):
+    return b'3.40-fake'
+
+  def gflGetVersionOfLibformat(self):
+    return b'3.40-fake'
+
+  def gflGetErrorString(self, error):
+    return "Erreur GFL {}".format(_value(error)).encode('ascii')
+
+  def gflGetDefaultLoadParams(self, load_params):
+    load_params = _target(load_params)
+    ctypes.memset(ctypes.addressof(load_params), 0, ctypes.sizeof(load_params))
+    load_params.FormatIndex = -1
+    load_params.Origin = GFL_TOP_LEFT
+    load_params.ColorModel = GFL_RGB
+    load_params.LinePadding = 1
+
+  gflGetDefaultThumbnailParams = gflGetDefaultLoadParams
+  gflGetDefaultPreviewParams = gflGetDefaultLoadParams
+
+  def gflGetDefaultSaveParams(self, save_params):
+    save_params = _target(save_params)
+    ctypes.memset(ctypes.addressof(save_params), 0, ctypes.sizeof(save_params))
+    save_params.FormatIndex = -1
+    save_params.Quality = 75
+    save_params.CompressionLevel = 6
+
+  # ==========================
+  # Formats
+  # ==========================
+  def _format(self, index):
+    index = _value(index)
+    if not 0 <= index < len(_FORMATS):
+      raise _error(pygfl.GFL_ERROR_BAD_FORMAT_INDEX, "Format {} inconnu.".format(index))
+    return _FORMATS[index]
+
+  def gflGetNumberOfFormat(self):
+    return len(_FORMATS)
+
+  def gflGetFormatIndexByName(self, name):
+    name = _text(name)
+    for index, fmt in enumerate(_FORMATS):
+      if fmt[0] == name:
+        return index
+    return -1
+
+  def gflGetFormatNameByIndex(self, index):
+    return self._format(index)[0].encode('ascii')
+
+  def gflGetFormatDescriptionByIndex(self, index):
+    return self._format(index)[1].encode('ascii')
+
+  def gflGetDefaultFormatSuffixByIndex(self, index):
+    return self._format(index)[2][0].encode('ascii')
+
+  def gflFormatIsSupported(self, name):
+    return FakeGFL.gflGetFormatIndexByName(self, name) >= 0
+
+  def gflFormatIsReadableByIndex(self, index):
+    return 0 <= _value(index) < len(_FORMATS)
+
+  gflFormatIsWritableByIndex = gflFormatIsReadableByIndex
+
+  def gflGetFormatInformationByIndex(self, index, format_info):
+    name, description, extensions, _compressions, _types = self._format(index)
+    format_info = _target(format_info)
+    format_info.Index = _value(index)
+    format_info.Name = name.encode('ascii')
+    format_info.Description = description.encode('ascii')
+    format_info.Status = GFL_READ.value | GFL_WRITE.value
+    format_info.NumberOfExtension = len(extensions)
+    for k, ext in enumerate(extensions):
+      format_info.Extension[k].value = ext.encode('ascii')
+
+  def gflCompressionIsSupportedByIndex(self, index, compression):
+    return _value(compression) in self._format(index)[3]
+
+  def gflBitmapTypeIsSupportedByIndex(self, index, _type, bits):
+    types = self._format(index)[4]
+    return types is None or (_value(_type), _value(bits)) in types
+
+  # ==========================
+  # Fichiers
+  # ==========================
+  @staticmethod
+  def _encode(pages, format_index, compression):
+    """\
+    _MAGIC, taille de l'en-tête, en-tête JSON (format, compression, champs de chaque page
+    avec la taille de sa palette et de ses pixels) puis octets de chaque page (palette, pixels).
+    """
+    headers, blobs = [], []
+    for page in pages:
+      header = dict((field, int(page[field])) for field in _PAGE_FIELDS)
+      header['ColorMap'] = None if page['ColorMap'] is None else len(page['ColorMap'])
+      header['Data'] = len(page['Data'])
+      headers.append(header)
+      blobs.extend(blob for blob in (page['ColorMap'], page['Data']) if blob is not None)
+    header = json.dumps({'format': int(format_index), 'compression': int(compression),
+                         'pages': headers}).encode('utf-8')
+    return b''.join([_MAGIC, _HEADER_SIZE.pack(len(header)), header] + blobs)
+
+  @staticmethod
+  def _decode(data):
+    if not data.startswith(_MAGIC):
+      raise _error(pygfl.GFL_ERROR_UNKNOWN_FORMAT, "Format de fichier inconnu.")
+    try:
+      offset = len(_MAGIC) + _HEADER_SIZE.size
+      size, = _HEADER_SIZE.unpack_from(data, len(_MAGIC))
+      content = json.loads(data[offset:offset + size].decode('utf-8'))
+      offset += size
+      pages = []
+      for header in content['pages']:
+        page = dict((field, int(header[field])) for field in _PAGE_FIELDS)
+        for field in ('ColorMap', 'Data'):
+          size = header[field]
+          if size is None and field == 'ColorMap':
+            page[field] = None
+            continue
+          size = int(size)
+          if size < 0 or offset + size > len(data):
+            raise ValueError("Fichier tronqué.")
+          page[field] = data[offset:offset + size]
+          offset += size
+        if ((page['ColorMap'] is not None and len(page['ColorMap']) != ctypes.sizeof(GFL_COLORMAP))
+            or min(page['Width'], page['Height'], page['BytesPerLine']) < 0
+            or len(page['Data']) < page['BytesPerLine'] * page['Height']):
+          raise ValueError("Page incohérente.")
+        pages.append(page)
+      return {'format': int(content['format']), 'compression': int(content['compression']), 'pages': pages}
+    except (struct.error, ValueError, KeyError, TypeError, AttributeError):
+      raise _error(pygfl.GFL_ERROR_FILE_READ, "Fichier illisible.")
+
+  def _read(self, filename):
+    try:
+      with open(filename, 'rb') as fp:
+        return self._decode(fp.read())
+    except (IOError, OSError):
+      raise _error(pygfl.GFL_ERROR_FILE_OPEN, "Ouverture de {!r} impossible.".format(filename))
+
+  def _write(self, filename, pages, save_params):
+    data = self._encode(pages, save_params.FormatIndex, save_params.Compression)
+    try:
+      with open(filename, 'wb') as fp:
+        fp.write(data)
+    except (IOError, OSError):
+      raise _error(pygfl.GFL_ERROR_FILE_CREATE, "Création de {!r} impossible.".format(filename))
+
+  @staticmethod
+  def _read_handle(handle, callbacks):
+    "Lit tout le contenu d'un handle par les fonctions de rappel Read."
+    chunks = []
+    buf = ctypes.create_string_buffer(64 * 1024)
+    while True:
+      count = callbacks.Read(handle, buf, len(buf))
+      if not count:
+        return b''.join(chunks)
+      chunks.append(buf.raw[:count])
+
+  @staticmethod
+  def _page(bitmap):
+    "Page sérialisable d'une image."
+    return {'Type': bitmap.Type, 'Width': bitmap.Width, 'Height': bitmap.Height,
+            'BitsPerComponent': bitmap.BitsPerComponent, 'Xdpi': bitmap.Xdpi, 'Ydpi': bitmap.Ydpi,
+            'BytesPerLine': bitmap.BytesPerLine,
+            'ColorMap': ctypes.string_at(bitmap.ColorMap, ctypes.sizeof(GFL_COLORMAP)) if bitmap.ColorMap else None,
+            'Data': ctypes.string_at(bitmap.Data, bitmap.BytesPerLine * bitmap.Height)}
+
+  def _check_save(self, bitmap, save_params):
+    self._format(save_params.FormatIndex)
+    if not bitmap.Width or not bitmap.Height:
+      raise _error(pygfl.GFL_ERROR_BAD_BITMAP, "Image vide.")
+
+  def _bitmap(self, page, load_params, height=None):
+    "Image d'une page ; seule la ligne 0 est remplie si `height` est donné (descripteur)."
+    colormap = page['ColorMap'] and GFL_COLORMAP.from_buffer_copy(page['ColorMap'])
+    p_bitmap = self._alloc(page['Type'], page['Width'], height or page['Height'], page['BitsPerComponent'],
+                           load_params.LinePadding, colormap)
+    bitmap = p_bitmap.contents
+    bitmap.Xdpi = page['Xdpi']
+    bitmap.Ydpi = page['Ydpi']
+    if height is None:
+      data, size = page['Data'], page['BytesPerLine']
+      if size == bitmap.BytesPerLine:
+        ctypes.memmove(bitmap.Data, data, len(data))
+      else:
+        for y in range(bitmap.Height):
+          _set_line(bitmap, y, data[y * size:(y + 1) * size])
+    return p_bitmap
+
+  def _fill_info(self, file_info, content, size):
+    if not file_info:
+      return
+    file_info = _target(file_info)
+    page = content['pages'][0]
+    name, description = _FORMATS[content['format']][:2]
+    compression = _value(content['compression'])
+    file_info.Type = page['Type']
+    file_info.Origin = GFL_TOP_LEFT
+    file_info.Width = page['Width']
+    file_info.Height = page['Height']
+    file_info.FormatIndex = content['format']
+    file_info.FormatName = name.encode('ascii')
+    file_info.Description = description.encode('ascii')
+    file_info.Xdpi = page['Xdpi']
+    file_info.Ydpi = page['Ydpi']
+    file_info.BitsPerComponent = page['BitsPerComponent']
+    file_info.ComponentsPerPixel = pygfl._COMPONENTS[page['Type']]
+    file_info.NumberOfImages = len(content['pages'])
+    file_info.FileSize = size
+    file_info.ColorModel = {GFL_BINARY: GFL_CM_GREY, GFL_GREY: GFL_CM_GREY,
+                            GFL_CMYK: GFL_CM_CMYK}.get(page['Type'], GFL_CM_RGB)
+    file_info.Compression = compression
+    file_info.CompressionDescription = _COMPRESSION_NAMES.get(compression, 'Unknown').encode('ascii')
+
+  def _decode_steps(self, load_params):
+    "Décodage simulé : appelle Progress et WantCancel (annulation : GFL_ERROR_FILE_READ)."
+    callbacks = load_params.Callbacks
+    for step in range(10):
+      if callbacks.WantCancel and callbacks.WantCancel(callbacks.WantCancelParams):
+        raise _error(pygfl.GFL_ERROR_FILE_READ, "Lecture interrompue.")
+      if callbacks.Progress:
+        callbacks.Progress(step * 10, callbacks.ProgressParams)
+      if self.delay:
+        time.sleep(self.delay / 10)
+
+  def _load(self, content, size, pp_bitmap, load_params, file_info, box=None):
+    "Charge la page demandée (réduite pour tenir dans `box` pour une vignette)."
+    load_params = _target(load_params)
+    pages = content['pages']
+    if not 0 <= load_params.ImageWanted < len(pages):
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Page {} absente.".format(load_params.ImageWanted))
+    self._decode_steps(load_params)
+    p_bitmap = self._bitmap(pages[load_params.ImageWanted], load_params)
+    if box is not None:
+      bitmap = p_bitmap.contents
+      ratio = min(float(box[0]) / bitmap.Width, float(box[1]) / bitmap.Height, 1.0)
+      p_thumbnail = POINTER(GFL_BITMAP)()
+      try:
+        FakeGFL.gflResize(self, p_bitmap, ctypes.byref(p_thumbnail), max(1, int(bitmap.Width * ratio)),
+                       max(1, int(bitmap.Height * ratio)), 0, 0)
+      finally:
+        FakeGFL.gflFreeBitmap(self, p_bitmap)
+      p_bitmap = p_thumbnail
+    self._set_out(pp_bitmap, p_bitmap)
+    self._fill_info(file_info, content, size)
+
+  @staticmethod
+  def _size(filename):
+    try:
+      with open(filename, 'rb') as fp:
+        fp.seek(0, 2)
+        return fp.tell()
+    except (IOError, OSError):
+      return 0
+
+  def gflGetFileInformation(self, filename, index, file_info):
+    self._fill_info(file_info, self._read(filename), self._size(filename))
+
+  def gflGetFileInformationEx(self, filename, index, file_info, flags):
+    FakeGFL.gflGetFileInformation(self, filename, index, file_info)
+
+  def gflGetFileInformationFromMemory(self, data, size, index, file_info):
+    self._fill_info(file_info, self._decode(ctypes.string_at(data, size)), size)
+
+  def gflGetFileInformationFromHandle(self, handle, index, callbacks, file_info):
+    data = self._read_handle(handle, _target(callbacks))
+    self._fill_info(file_info, self._decode(data), len(data))
+
+  def gflFreeFileInformation(self, file_info):
+    pass
+
+  def gflLoadBitmap(self, filename, pp_bitmap, load_params, file_info):
+    self._load(self._read(filename), self._size(filename), pp_bitmap, load_params, file_info)
+
+  def gflLoadBitmapFromMemory(self, data, size, pp_bitmap, load_params, file_info):
+    self._load(self._decode(ctypes.string_at(data, size)), size, pp_bitmap, load_params, file_info)
+
+  def gflLoadBitmapFromHandle(self, handle, pp_bitmap, load_params, file_info):
+    data = self._read_handle(handle, _target(load_params).Callbacks)
+    self._load(self._decode(data), len(data), pp_bitmap, load_params, file_info)
+
+  def gflLoadThumbnail(self, filename, width, height, pp_bitmap, load_params, file_info):
+    self._load(self._read(filename), self._size(filename), pp_bitmap, load_params, file_info, (width, height))
+
+  def gflLoadThumbnailFromMemory(self, data, size, width, height, pp_bitmap, load_params, file_info):
+    self._load(self._decode(ctypes.string_at(data, size)), size, pp_bitmap, load_params, file_info,
+               (width, height))
+
+  def gflLoadThumbnailFromHandle(self, handle, width, height, pp_bitmap, load_params, file_info):
+    data = self._read_handle(handle, _target(load_params).Callbacks)
+    self._load(self._decode(data), len(data), pp_bitmap, load_params, file_info, (width, height))
+
+  gflLoadPreview = gflLoadThumbnail
+  gflLoadPreviewFromHandle = gflLoadThumbnailFromHandle
+
+  def gflSaveBitmap(self, filename, p_bitmap, save_params):
+    save_params = _target(save_params)
+    self._check_save(p_bitmap.contents, save_params)
+    self._write(filename, [self._page(p_bitmap.contents)], save_params)
+
+  def gflSaveBitmapIntoMemory(self, pp_data, p_size, p_bitmap, save_params):
+    save_params = _target(save_params)
+    self._check_save(p_bitmap.contents, save_params)
+    data = self._encode([self._page(p_bitmap.contents)], save_params.FormatIndex, save_params.Compression)
+    buf = ctypes.create_string_buffer(data, len(data))
+    self._set_out(pp_data, ctypes.cast(self._keep(buf), POINTER(GFL_UINT8)))
+    self._set_out(p_size, len(data))
+
+  def gflSaveBitmapIntoHandle(self, handle, p_bitmap, save_params):
+    save_params = _target(save_params)
+    self._check_save(p_bitmap.contents, save_params)
+    data = self._encode([self._page(p_bitmap.contents)], save_params.FormatIndex, save_params.Compression)
+    if save_params.Callbacks.Write(handle, data, len(data)) != len(data):
+      raise _error(pygfl.GFL_ERROR_FILE_WRITE, "Écriture incomplète.")
+
+  def gflFileCreate(self, p_handle, filename, count, save_params):
+    save_params = pygfl.GFL_SAVE_PARAMS.from_buffer_copy(_target(save_params))
+    self._format(save_params.FormatIndex)
+    self._set_out(p_handle, self._new_handle((filename, [], save_params)))
+
+  def gflFileAddPicture(self, handle, p_bitmap):
+    with self._lock:
+      pages = self._handles[_value(handle)][1]
+    pages.append(self._page(p_bitmap.contents))
+
+  def gflFileClose(self, handle):
+    filename, pages, save_params = self._pop_handle(handle)
+    self._write(filename, pages, save_params)
+
+  # ==========================
+  # Lecture / écriture ligne à ligne
+  # ==========================
+  def gflLoadBitmapBegin(self, p_handle, filename, pp_bitmap, load_params, file_info):
+    content = self._read(filename)
+    load_params = _target(load_params)
+    pages = content['pages']
+    if not 0 <= load_params.ImageWanted < len(pages):
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Page {} absente.".format(load_params.ImageWanted))
+    page = pages[load_params.ImageWanted]
+    # Descripteur : une seule ligne allouée, comme la bibliothèque native.
+    p_bitmap = self._bitmap(page, load_params, height=1)
+    p_bitmap.contents.Height = page['Height']
+    self._set_out(p_handle, self._new_handle([page, 0]))
+    self._set_out(pp_bitmap, p_bitmap)
+    self._fill_info(file_info, content, self._size(filename))
+
+  def gflLoadBitmapReadLine(self, handle, buf):
+    with self._lock:
+      state = self._handles[_value(handle)]
+    page, y = state
+    if y >= page['Height']:
+      raise _error(pygfl.GFL_ERROR_FILE_READ, "Fin de l'image.")
+    size = page['BytesPerLine']
+    ctypes.memmove(buf, page['Data'][y * size:(y + 1) * size], size)
+    state[1] += 1
+
+  def gflLoadBitmapEnd(self, handle):
+    self._pop_handle(handle)
+
+  def gflSaveBitmapBegin(self, p_handle, filename, p_bitmap, save_params):
+    header = _target(p_bitmap)
+    save_params = pygfl.GFL_SAVE_PARAMS.from_buffer_copy(_target(save_params))
+    self._check_save(header, save_params)
+    page = self._page_header(header)
+    self._set_out(p_handle, self._new_handle((filename, page, [], save_params)))
+
+  @staticmethod
+  def _page_header(header):
+    page = {'Type': header.Type, 'Width': header.Width, 'Height': header.Height,
+            'BitsPerComponent': header.BitsPerComponent, 'Xdpi': header.Xdpi, 'Ydpi': header.Ydpi,
+            'BytesPerLine': header.BytesPerLine,
+            'ColorMap': ctypes.string_at(header.ColorMap, ctypes.sizeof(GFL_COLORMAP)) if header.ColorMap else None}
+    return page
+
+  def gflSaveBitmapWriteLine(self, handle, buf):
+    with self._lock:
+      _filename, page, lines, _save_params = self._handles[_value(handle)]
+    if len(lines) >= page['Height']:
+      raise _error(pygfl.GFL_ERROR_FILE_WRITE, "Toutes les lignes ont été écrites.")
+    lines.append(ctypes.string_at(buf, page['BytesPerLine']))
+
+  def gflSaveBitmapEnd(self, handle):
+    filename, page, lines, save_params = self._pop_handle(handle)
+    page['Data'] = b''.join(lines).ljust(page['BytesPerLine'] * page['Height'], b'\0')
+    self._write(filename, [page], save_params)
+
+  # ==========================
+  # Images
+  # ==========================
+  def gflAllockBitmap(self, _type, width, height, padding, color):
+    return self._alloc(_value(_type), _value(width), _value(height), 8, _value(padding))
+
+  def gflAllockBitmapEx(self, _type, width, height, bits, padding, color):
+    return self._alloc(_value(_type), _value(width), _value(height), _value(bits), _value(padding))
+
+  def gflFreeBitmap(self, p_bitmap):
+    address = ctypes.addressof(p_bitmap.contents)
+    with self._lock:
+      if self._bitmaps.pop(address, None) is None:
+        raise ValueError("Image inconnue ou déjà libérée : {:#x}.".format(address))
+
+  def gflFreeBitmapData(self, p_bitmap):
+    p_bitmap.contents.Data = None
+
+  def gflCloneBitmap(self, p_bitmap):
+    bitmap = p_bitmap.contents
+    p_clone = self._alloc_like(bitmap, bitmap.Width, bitmap.Height)
+    ctypes.memmove(p_clone.contents.Data, bitmap.Data, bitmap.BytesPerLine * bitmap.Height)
+    return p_clone
+
+  def gflBitmapSetComment(self, p_bitmap, comment):
+    pass
+
+  def gflBitmapSetName(self, p_bitmap, name):
+    pass
+
+  def gflGetColorAt(self, p_bitmap, x, y, color):
+    bitmap = p_bitmap.contents
+    if not (0 <= x < bitmap.Width and 0 <= y < bitmap.Height):
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Point ({}, {}) hors de l'image.".format(x, y))
+    step = _step(bitmap)
+    pixel = bytearray(_pixels(bitmap, y)[x * step:(x + 1) * step])
+    color = _target(color)
+    if bitmap.Type == GFL_COLORS and bitmap.ColorMap:
+      colormap = bitmap.ColorMap.contents
+      color.Red, color.Green, color.Blue = (colormap.Red[pixel[0]], colormap.Green[pixel[0]],
+                                            colormap.Blue[pixel[0]])
+    elif bitmap.Type in pygfl._RGBA_ORDER and bitmap.BitsPerComponent == 8:
+      red, green, blue, alpha = pygfl._RGBA_ORDER[bitmap.Type]
+      color.Red, color.Green, color.Blue = pixel[red], pixel[green], pixel[blue]
+      color.Alpha = pixel[alpha] if alpha is not None else 255
+    else:
+      color.Red = color.Green = color.Blue = pixel[0]
+
+  # ==========================
+  # Traitements
+  # ==========================
+  def gflResize(self, p_bitmap, pp_bitmap, width, height, method, flags):
+    "Redimensionnement au plus proche voisin (`method` est ignorée)."
+    src = p_bitmap.contents
+    p_dst = self._alloc_like(src, width, height)
+    dst = p_dst.contents
+    step = _step(src)
+    pick = _picker([x * src.Width // width * step + k for x in range(width) for k in range(step)])
+    previous = pixels = None
+    for y in range(height):
+      sy = y * src.Height // height
+      if sy != previous:
+        pixels = pick(bytearray(_pixels(src, sy)))
+        previous = sy
+      _set_pixels(dst, y, pixels)
+    self._set_out(pp_bitmap, p_dst)
+
+  def gflCrop(self, p_bitmap, pp_bitmap, rect):
+    src = p_bitmap.contents
+    rect = _target(rect)
+    if rect.x < 0 or rect.y < 0 or rect.x + rect.w > src.Width or rect.y + rect.h > src.Height:
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Rectangle hors de l'image.")
+    p_dst = self._alloc_like(src, rect.w, rect.h)
+    dst = p_dst.contents
+    step = _step(src)
+    for y in range(rect.h):
+      _set_pixels(dst, y, _pixels(src, rect.y + y)[rect.x * step:(rect.x + rect.w) * step])
+    self._set_out(pp_bitmap, p_dst)
+
+  def _flip(self, p_bitmap, pp_bitmap, vertical):
+    "Retournement ; en place si `pp_bitmap` est None."
+    src = p_bitmap.contents
+    if pp_bitmap:
+      p_dst = self._alloc_like(src, src.Width, src.Height)
+    else:
+      p_dst = p_bitmap
+    dst = p_dst.contents
+    rows = [_pixels(src, y) for y in range(src.Height)]
+    if vertical:
+      rows.reverse()
+    else:
+      step = _step(src)
+      pick = _picker([(src.Width - 1 - x) * step + k for x in range(src.Width) for k in range(step)])
+      rows = [pick(bytearray(row)) for row in rows]
+    for y, row in enumerate(rows):
+      _set_pixels(dst, y, row)
+    if pp_bitmap:
+      self._set_out(pp_bitmap, p_dst)
+
+  def gflFlipVertical(self, p_bitmap, pp_bitmap):
+    self._flip(p_bitmap, pp_bitmap, True)
+
+  def gflFlipHorizontal(self, p_bitmap, pp_bitmap):
+    self._flip(p_bitmap, pp_bitmap, False)
+
+  def gflRotate(self, p_bitmap, pp_bitmap, angle, color):
+    "Rotation dans le sens trigonométrique, par multiples de 90° uniquement."
+    angle = _value(angle) % 360
+    if angle % 90:
+      raise _error(pygfl.GFL_ERROR_BAD_PARAMETERS, "Rotation de {}° non simulée.".format(angle))
+    src = p_bitmap.contents
+    if angle in (0, 180):
+      p_dst = POINTER(GFL_BITMAP)()
+      if angle:
+        self._flip(p_bitmap, ctypes.byref(p_dst), True)
+        self._flip(p_dst, None, False)
+      else:
+        p_dst = FakeGFL.gflCloneBitmap(self, p_bitmap)
+      self._set_out(pp_bitmap, p_dst)
+      return
+    step = _step(src)
+    whole = bytearray(b''.join(_pixels(src, y) for y in range(src.Height)))
+    stride = len(whole) // src.Height
+    p_dst = self._alloc_like(src, src.Height, src.Width)
+    dst = p_dst.contents
+    for y in range(dst.Height):
+      # 90° : la ligne y est la colonne Width - 1 - y lue de haut en bas ; 270° : la colonne y lue de bas en haut.
+      if angle == 90:
+        column, rows = src.Width - 1 - y, range(src.Height)
+      else:
+        column, rows = y, range(src.Height - 1, -1, -1)
+      pick = _picker([sy * stride + column * step + k for sy in rows for k in range(step)])
+      _set_pixels(dst, y, pick(whole))
+    self._set_out(pp_bitmap, p_dst)
+
+  @staticmethod
+  def _grey_line(bitmap, y):
+    "Ligne `y` en niveaux de gris, un octet par pixel (première composante, octet de poids fort)."
+    pixels = _pixels(bitmap, y)
+    if bitmap.Type == GFL_COLORS and bitmap.ColorMap:
+      colormap = bitmap.ColorMap.contents
+      return pixels[:bitmap.Width].translate(bytes(bytearray(colormap.Red)))
+    step = _step(bitmap)
+    first = bitmap.BitsPerComponent // 8 - 1 if bitmap.BitsPerComponent > 8 else 0
+    if bitmap.Type in pygfl._RGBA_ORDER:
+      first += pygfl._RGBA_ORDER[bitmap.Type][0] * max(1, bitmap.BitsPerComponent // 8)
+    return pixels[first:bitmap.Width * step:step]
+
+  def gflChangeColorDepth(self, p_bitmap, pp_bitmap, mode, params):
+    src = p_bitmap.contents
+    _type, components = _DEPTH_MODES.get(_value(mode), (GFL_GREY, 1))
+    p_dst = self._alloc(_type, src.Width, src.Height, 8)
+    dst = p_dst.contents
+    dst.Xdpi = src.Xdpi
+    dst.Ydpi = src.Ydpi
+    alpha = pygfl._RGBA_ORDER.get(_type, (None,) * 4)[3]
+    for y in range(src.Height):
+      grey = self._grey_line(src, y)
+      if _type == GFL_BINARY:
+        _set_pixels(dst, y, grey.translate(_THRESHOLD))
+        continue
+      if components == 1:
+        _set_line(dst, y, grey)
+        continue
+      line = bytearray(len(grey) * components)
+      for k in range(components):
+        line[k::components] = grey if k != alpha else b'\xff' * len(grey)
+      _set_line(dst, y, bytes(line))
+    self._set_out(pp_bitmap, p_dst)
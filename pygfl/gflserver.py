@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: gflserver.py
+:synopsis: Serveur de conversion d'images (socket Unix) et client associé.
+:author: Stéphane JULIEN
+
+Le serveur garde un pool de processus ayant déjà initialisé la bibliothèque et reçoit
+les demandes (conversion, vignette, informations) sur une socket Unix.
+
+Protocole : chaque message est un objet JSON (UTF-8) précédé de sa taille (4 octets, big-endian).
+ - demande : {"id": n, "op": "convert" | "transcode" | "thumbnail" | "info", "args": {...}}
+ - réponse : {"id": n, "ok": true, "result": ..., "elapsed": s}
+             ou {"id": n, "ok": false, "error": [code, message]}
+Un client peut envoyer plusieurs demandes sans attendre les réponses, qui arrivent dans l'ordre
+de fin d'exécution. Au-delà de `max_inflight` demandes en cours pour une connexion, le serveur cesse
+de lire la socket jusqu'à ce qu'une réponse soit envoyée. Une demande sans résultat après
+`request_timeout` secondes (processus de travail arrêté...) reçoit une réponse d'erreur.
+
+Usage : python gflserver.py /chemin/vers/socket [--processes N] [--max-inflight N] [--timeout S]
+"""
+from __future__ import print_function, unicode_literals
+
+import base64
+import itertools
+import json
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import threading
+
+try:
+  import socketserver
+except ImportError:
+  import SocketServer as socketserver
+try:
+  import queue
+except ImportError:
+  import Queue as queue
+
+import pygfl
+
+_HEADER = struct.Struct('>I')
+
+
+def _send(sock, message):
+  "Envoie un message (objet JSON)."
+  data = json.dumps(message).encode('utf-8')
+  sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+  chunks = []
+  while size:
+    chunk = sock.recv(size)
+    if not chunk:
+      return None
+    chunks.append(chunk)
+    size -= len(chunk)
+  return b''.join(chunks)
+
+
+def _recv(sock):
+  "Reçoit un message ; None si la connexion est fermée."
+  header = _recv_exactly(sock, _HEADER.size)
+  if header is None:
+    return None
+  data = _recv_exactly(sock, _HEADER.unpack(header)[0])
+  if data is None:
+    return None
+  return json.loads(data.decode('utf-8'))
+
+
+def _text(value):
+  return value.decode('utf-8', 'replace') if isinstance(value, bytes) else value
+
+
+# ==========================
+# Travail des processus
+# ==========================
+def _op_convert(gfl, filenames, target, options=None):
+  gfl.convert2img([pygfl._fs_native(name) for name in filenames], pygfl._fs_native(target), **(options or {}))
+
+
+def _op_transcode(gfl, src, dst, **options):
+  gfl.transcode(pygfl._fs_native(src), pygfl._fs_native(dst), **options)
+
+
+def _op_thumbnail(gfl, filename, width, height, page=0, _type="jpeg", quality=85):
+  with gfl.load_thumbnail(pygfl._fs_native(filename), width, height, page) as bitmap:
+    data = gfl.save_bytes(bitmap, _type, quality=quality)
+  return base64.b64encode(data).decode('ascii')
+
+
+def _op_info(gfl, filename):
+  info = gfl.file_info(pygfl._fs_native(filename))
+  return dict((field, _text(value)) for field, value in zip(info._fields, info))
+
+
+_OPERATIONS = {'convert': _op_convert,
+               'transcode': _op_transcode,
+               'thumbnail': _op_thumbnail,
+               'info': _op_info}
+
+
+def _error(ident, code, message):
+  return {'id': ident, 'ok': False, 'error': [code, message]}
+
+
+def _run(request):
+  "Exécute une demande dans un processus du pool ; retourne la réponse."
+  start = pygfl._clock()
+  response = {'id': None}
+  try:
+    if not isinstance(request, dict):
+      raise ValueError("Demande invalide : objet JSON attendu.")
+    response['id'] = request.get('id')
+    operation = _OPERATIONS[request['op']]
+    args = request.get('args', {})
+    if not isinstance(args, dict):
+      raise ValueError("Demande invalide : `args` doit être un objet JSON.")
+    response['result'] = operation(pygfl._batch_worker(), **args)
+    response['ok'] = True
+  except pygfl.GFL_Exception as exc:
+    response['ok'] = False
+    response['error'] = [exc.args[0], _text(exc.args[-1])]
+  except Exception as exc:
+    response['ok'] = False
+    response['error'] = [pygfl.GFL_UNKNOWN_ERROR.value, repr(exc)]
+  response['elapsed'] = pygfl._clock() - start
+  return response
+
+
+# ==========================
+# Serveur
+# ==========================
+class _Handler(socketserver.BaseRequestHandler):
+  """\
+  Connexion d'un client : lecture des demandes, envoi des réponses par un thread dédié.
+
+  Chaque demande acceptée produit exactement une réponse : son résultat, l'erreur du pool
+  (error_callback) ou, passé `request_timeout`, une erreur de délai (le résultat tardif est ignoré).
+  """
+  def handle(self):
+    timeout = self.server.request_timeout
+    slots = threading.Semaphore(self.server.max_inflight)
+    responses = queue.Queue()
+    inflight = {}  # {clé interne: (id de la demande, échéance)}
+    pending = [0]  # Demandes acceptées dont la réponse n'est pas encore envoyée
+    cond = threading.Condition()
+    keys = itertools.count()
+
+    def finish(key, response):
+      "Réponse d'une demande, ignorée si la demande a déjà expiré."
+      with cond:
+        if inflight.pop(key, None) is None:
+          return
+      responses.put(response)
+
+    def expire():
+      now = pygfl._clock()
+      with cond:
+        expired = [(key, ident) for key, (ident, deadline) in inflight.items() if deadline <= now]
+        for key, _ident in expired:
+          del inflight[key]
+      for _key, ident in expired:
+        responses.put(_error(ident, pygfl.GFL_UNKNOWN_ERROR.value,
+                             "Pas de résultat après {} s.".format(timeout)))
+
+    def writer():
+      next_check = pygfl._clock() + 1.0
+      while True:
+        try:
+          response = responses.get(timeout=1.0)
+        except queue.Empty:
+          response = ()
+        if pygfl._clock() >= next_check:
+          expire()
+          next_check = pygfl._clock() + 1.0
+        if response == ():
+          continue
+        if response is None:
+          return
+        try:
+          _send(self.request, response)
+        except socket.error:
+          pass
+        slots.release()
+        with cond:
+          pending[0] -= 1
+          cond.notify_all()
+
+    thread = threading.Thread(target=writer)
+    thread.daemon = True
+    thread.start()
+    try:
+      while True:
+        try:
+          request = _recv(self.request)
+        except (socket.error, ValueError):
+          break
+        if request is None:
+          break
+        # Contre-pression : plus de lecture tant que la connexion a trop de demandes en cours.
+        slots.acquire()
+        key = next(keys)
+        ident = request.get('id') if isinstance(request, dict) else None
+        with cond:
+          pending[0] += 1
+          inflight[key] = (ident, pygfl._clock() + timeout)
+
+        def on_result(response, key=key):
+          finish(key, response)
+
+        def on_error(exc, key=key, ident=ident):
+          finish(key, _error(ident, pygfl.GFL_UNKNOWN_ERROR.value, repr(exc)))
+
+        options = {'error_callback': on_error} if sys.version_info[0] >= 3 else {}
+        self.server.pool.apply_async(_run, (request,), callback=on_result, **options)
+      with cond:
+        while pending[0]:
+          cond.wait()
+    finally:
+      responses.put(None)
+      thread.join()
+
+
+class GFLServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  """\
+  Serveur de conversion : un thread par connexion, un pool de processus (bibliothèque initialisée
+  une fois par processus) partagé par toutes les connexions.
+  """
+  daemon_threads = True
+
+  def __init__(self, path, processes=None, max_inflight=64, request_timeout=300):
+    """\
+    :param basestring path: Chemin de la socket Unix (remplacée si elle existe).
+    :param int processes: Nombre de processus (par défaut : nombre de cœurs).
+    :param int max_inflight: Nombre maximum de demandes en cours par connexion.
+    :param float request_timeout: Délai en secondes au-delà duquel une demande reçoit une erreur.
+    """
+    self.max_inflight = max_inflight
+    self.request_timeout = request_timeout
+    self.pool = multiprocessing.Pool(processes, initializer=pygfl._batch_init)
+    if os.path.exists(path):
+      os.unlink(path)
+    socketserver.UnixStreamServer.__init__(self, path, _Handler)
+
+  def server_close(self):
+    socketserver.UnixStreamServer.server_close(self)
+    self.pool.terminate()
+    self.pool.join()
+    if os.path.exists(self.server_address):
+      os.unlink(self.server_address)
+
+
+# ==========================
+# Client
+# ==========================
+class GFLClient(object):
+  """\
+  Client du serveur de conversion.
+
+  submit() envoie une demande sans attendre ; call() (et les méthodes convert, thumbnail, info)
+  attend la réponse d'une demande, en conservant les réponses des autres demandes en cours.
+  """
+  def __init__(self, path):
+    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self.sock.connect(path)
+    self._next_id = 0
+    self._responses = {}  # Réponses reçues non encore réclamées
+
+  def submit(self, op, **args):
+    """\
+    Envoie une demande.
+
+    :rtype: int
+    :return: Identifiant de la demande.
+    """
+    self._next_id += 1
+    _send(self.sock, {'id': self._next_id, 'op': op, 'args': args})
+    return self._next_id
+
+  def receive(self):
+    "Attend la réponse suivante (dict), quelle que soit la demande."
+    response = _recv(self.sock)
+    if response is None:
+      raise EOFError("Connexion fermée par le serveur.")
+    return response
+
+  def result(self, ident):
+    """\
+    Résultat d'une demande.
+
+    :raises GFL_Exception: si la demande a échoué.
+    """
+    while ident not in self._responses:
+      response = self.receive()
+      self._responses[response['id']] = response
+    response = self._responses.pop(ident)
+    if not response['ok']:
+      raise pygfl.GFL_Exception(*response['error'])
+    return response.get('result')
+
+  def call(self, op, **args):
+    return self.result(self.submit(op, **args))
+
+  def convert(self, filenames, target, **options):
+    "Voir _GFL.convert2img."
+    return self.call('convert', filenames=filenames, target=target, options=options)
+
+  def thumbnail(self, filename, width, height, page=0, _type="jpeg", quality=85):
+    "Vignette encodée (bytes), voir _GFL.load_thumbnail."
+    data = self.call('thumbnail', filename=filename, width=width, height=height, page=page,
+                     _type=_type, quality=quality)
+    return base64.b64decode(data)
+
+  def info(self, filename):
+    "Informations d'en-tête (dict des champs de FILE_INFO)."
+    return self.call('info', filename=filename)
+
+  def close(self):
+    self.sock.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+
+def main():
+  import argparse
+  parser = argparse.ArgumentParser(description="Serveur de conversion d'images GFL.")
+  parser.add_argument('path', help="Chemin de la socket Unix")
+  parser.add_argument('--processes', type=int, default=None, help="Nombre de processus")
+  parser.add_argument('--max-inflight', type=int, default=64, help="Demandes en cours par connexion")
+  parser.add_argument('--timeout', type=float, default=300, help="Délai d'une demande (secondes)")
+  args = parser.parse_args()
+  server = GFLServer(args.path, args.processes, args.max_inflight, args.timeout)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+
+
+if __name__ == '__main__':
+  main()
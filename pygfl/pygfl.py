@@ -12,10 +12,24 @@
 from __future__ import print_function, unicode_literals
 
 from itertools import chain
-from collections import namedtuple
+from contextlib import contextmanager
+from collections import namedtuple, OrderedDict
+import hashlib
+import importlib
+import json
+import struct
 import sys
+import os
+import mmap
+import threading
+import time
+import sqlite3
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import weakref
 
 import ctypes
+import ctypes.util
 
 if sys.platform == 'win32':
   from ctypes import WINFUNCTYPE as GFLAPI
@@ -33,12 +47,24 @@ from ctypes import c_ubyte, c_uint32, c_int32, c_uint16, c_int16, c_uint8,\
 if sys.platform == 'win32':
   from ctypes import  c_wchar_p
 
+numpy = None  # Importé au premier appel de Bitmap.to_array (import coûteux)
+
 
 #  Erreurs :
 class GFL_Exception(Exception):
   pass
 
 
+class GFL_Cancelled(GFL_Exception):
+  "Chargement interrompu : jeton annulé ou délai dépassé (voir CancelToken)."
+  pass
+
+
+class BitmapClosedError(ValueError, AttributeError):
+  "Champ lu sur une image libérée (voir Bitmap) ; AttributeError pour hasattr et getattr(obj, nom, défaut)."
+  pass
+
+
 GFL_UINT8 = c_uint8
 GFL_CTYPE = c_uint16
 
@@ -631,6 +657,204 @@ GFL_FILE_HANDLE = c_void_p
 GFL_EXIF_WANT_MAKERNOTES = 0x0001
 
 
+# =========
+# Instrumentation
+# =========
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Fonctions échangeant des tampons : (position de l'argument taille lue -> bytes_in,
+#  position du pointeur sur la taille produite -> bytes_out,
+#  position de l'argument taille allouée, ajoutée à bytes_out si l'allocation réussit)
+_MEMORY_ARGS = {'gflMemoryAlloc': (None, None, 0),
+                'gflMemoryRealloc': (None, None, 1),
+                'gflGetFileInformationFromMemory': (1, None, None),
+                'gflLoadBitmapFromMemory': (1, None, None),
+                'gflLoadThumbnailFromMemory': (1, None, None),
+                'gflSaveBitmapIntoMemory': (None, 1, None),
+                'gflBitmapGetICCProfile': (None, 2, None),
+                'gflBitmapGetXMP': (None, 2, None),
+               }
+
+
+def _arg_value(arg):
+  "Valeur entière d'un argument (entier, objet ctypes ou byref())."
+  arg = getattr(arg, '_obj', arg)
+  return int(getattr(arg, 'value', arg) or 0)
+
+
+class _Counter(object):
+  __slots__ = ('lock', 'calls', 'total', 'max', 'errors', 'bytes_in', 'bytes_out')
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.calls = 0
+    self.total = 0.0
+    self.max = 0.0
+    self.errors = {}  # {code GFL_ERROR: nombre}
+    self.bytes_in = 0
+    self.bytes_out = 0
+
+
+class CallStats(object):
+  """\
+  Compteurs par fonction de la bibliothèque (mode instrumenté, voir GFL) : nombre d'appels,
+  durées totale et maximale, erreurs par code GFL_ERROR et octets lus / produits par les fonctions
+  travaillant en mémoire (taille allouée pour gflMemoryAlloc / gflMemoryRealloc).
+  """
+  def __init__(self):
+    self._counters = {}  # {nom de fonction: _Counter}
+
+  def wrap(self, name, func):
+    "Retourne `func` entourée des mesures."
+    counter = self._counters.setdefault(name, _Counter())
+    size_in, size_out, allocated = _MEMORY_ARGS.get(name, (None, None, None))
+
+    def call(*args):
+      start = _clock()
+      try:
+        result = func(*args)
+      except GFL_Exception as exc:
+        elapsed = _clock() - start
+        with counter.lock:
+          counter.calls += 1
+          counter.total += elapsed
+          counter.max = max(counter.max, elapsed)
+          counter.errors[exc.args[0]] = counter.errors.get(exc.args[0], 0) + 1
+        raise
+      elapsed = _clock() - start
+      with counter.lock:
+        counter.calls += 1
+        counter.total += elapsed
+        counter.max = max(counter.max, elapsed)
+        if size_in is not None:
+          counter.bytes_in += _arg_value(args[size_in])
+        if size_out is not None:
+          counter.bytes_out += _arg_value(args[size_out])
+        if allocated is not None and result:
+          counter.bytes_out += _arg_value(args[allocated])
+      return result
+
+    call.__name__ = str(name)
+    call.__wrapped__ = func
+    return call
+
+  def snapshot(self):
+    """\
+    État des compteurs des fonctions appelées au moins une fois.
+
+    :rtype: dict
+    :return: {fonction: {'calls', 'total_s', 'max_s', 'errors': {code: nombre}, 'bytes_in', 'bytes_out'}}
+    """
+    data = {}
+    for name, counter in self._counters.items():
+      with counter.lock:
+        if counter.calls:
+          data[name] = {'calls': counter.calls, 'total_s': counter.total, 'max_s': counter.max,
+                        'errors': dict(counter.errors),
+                        'bytes_in': counter.bytes_in, 'bytes_out': counter.bytes_out}
+    return data
+
+  def reset(self):
+    for counter in self._counters.values():
+      with counter.lock:
+        counter.calls = counter.bytes_in = counter.bytes_out = 0
+        counter.total = counter.max = 0.0
+        counter.errors = {}
+
+  def prometheus(self, prefix='pygfl'):
+    """\
+    Compteurs au format texte Prometheus.
+
+    :rtype: str
+    """
+    snapshot = sorted(self.snapshot().items())
+    metrics = [('calls_total', 'counter', "Nombre d'appels.", 'calls'),
+               ('call_seconds_total', 'counter', "Durée cumulée des appels.", 'total_s'),
+               ('call_seconds_max', 'gauge', "Durée maximale d'un appel.", 'max_s'),
+               ('bytes_in_total', 'counter', "Octets lus en mémoire.", 'bytes_in'),
+               ('bytes_out_total', 'counter', "Octets produits en mémoire.", 'bytes_out')]
+    lines = []
+    for suffix, kind, text, key in metrics:
+      name = '{}_{}'.format(prefix, suffix)
+      lines.append('# HELP {} {}'.format(name, text))
+      lines.append('# TYPE {} {}'.format(name, kind))
+      lines.extend('{}{{function="{}"}} {}'.format(name, function, values[key])
+                   for function, values in snapshot
+                   if values[key] or key in ('calls', 'total_s', 'max_s'))
+    name = '{}_errors_total'.format(prefix)
+    lines.append('# HELP {} Erreurs par code GFL_ERROR.'.format(name))
+    lines.append('# TYPE {} counter'.format(name))
+    lines.extend('{}{{function="{}",code="{}"}} {}'.format(name, function, code, count)
+                 for function, values in snapshot for code, count in sorted(values['errors'].items()))
+    return '\n'.join(lines) + '\n'
+
+
+# =========
+# Chargement de la bibliothèque
+# =========
+LIBRARY_ENV = 'PYGFL_LIBRARY'  # Chemins ou noms de la bibliothèque (séparés par os.pathsep)
+BACKEND_ENV = 'PYGFL_BACKEND'  # Implémentation par défaut (voir BACKENDS)
+
+# Noms de la bibliothèque native par plate-forme, du plus précis au plus générique
+if sys.platform == 'win32':
+  _LIBRARY_NAMES = ('libgfl340.dll', 'libgfl.dll')
+elif sys.platform == 'darwin':
+  _LIBRARY_NAMES = ('libgfl.3.40.dylib', 'libgfl.340.dylib', 'libgfl.3.dylib', 'libgfl.dylib')
+else:
+  _LIBRARY_NAMES = ('libgfl.so.3.40', 'libgfl.so.340', 'libgfl.so.3', 'libgfl340.so', 'libgfl.so')
+
+# Répertoires où la bibliothèque peut être livrée avec le module
+_BUNDLE_DIRS = tuple(os.path.join(os.path.dirname(os.path.abspath(__file__)), subdir)
+                     for subdir in ('', 'lib', 'libs'))
+
+
+def library_candidates():
+  """\
+  Chemins et noms à essayer pour charger la bibliothèque native, dans l'ordre :
+   - ceux de la variable d'environnement PYGFL_LIBRARY, exclusivement si elle est définie ;
+   - les fichiers livrés avec le module (répertoire du module, sous-répertoires lib et libs) ;
+   - les noms versionnés, résolus par le chargeur du système (LD_LIBRARY_PATH, ldconfig...) ;
+   - les noms trouvés par ctypes.util.find_library (coûteux sous Linux, essayé en dernier).
+
+  :rtype: iterator(str)
+  """
+  override = os.environ.get(LIBRARY_ENV)
+  if override:
+    for candidate in override.split(os.pathsep):
+      if candidate:
+        yield candidate
+    return
+  for directory in _BUNDLE_DIRS:
+    for name in _LIBRARY_NAMES:
+      path = os.path.join(directory, name)
+      if os.path.isfile(path):
+        yield path
+  for name in _LIBRARY_NAMES:
+    yield name
+  for name in ('gfl340', 'gfl', 'libgfl'):
+    found = ctypes.util.find_library(name)
+    if found:
+      yield found
+
+
+def load_library(libname=None):
+  """\
+  Charge la bibliothèque native.
+
+  :param basestring libname: Nom ou chemin ; sinon les candidats de library_candidates() sont essayés.
+  :raises OSError: si aucun candidat ne peut être chargé (le message détaille chaque essai).
+  """
+  loader = ctypes.windll if sys.platform == 'win32' else ctypes.cdll
+  errors = []
+  for candidate in ([libname] if libname else library_candidates()):
+    try:
+      return loader.LoadLibrary(candidate)
+    except OSError as exc:
+      errors.append("{} : {}".format(candidate, exc))
+  raise OSError("Bibliothèque GFL introuvable (variable {} pour l'indiquer) :\n  {}".format(
+                LIBRARY_ENV, '\n  '.join(errors)))
+
+
 # =========
 # Functions
 # =========
@@ -644,7 +868,7 @@ class GFL(object):
     return error
 
   lfn = [
-    ('gflMemoryAlloc.argtypes', [GFL_UINT32], c_void_p),
+    ('gflMemoryAlloc', [GFL_UINT32], c_void_p),
     ('gflMemoryRealloc', [c_void_p, GFL_UINT32], c_void_p),
     ('gflMemoryFree', [c_void_p], None),
     ('gflGetVersion', [], c_char_p),
@@ -668,7 +892,7 @@ class GFL(object):
     ('gflGetFormatDescriptionByName', [c_char_p], c_char_p),
     ('gflGetFormatInformationByIndex', [GFL_INT32, POINTER(GFL_FORMAT_INFORMATION)], GFL_ERROR, F_GFL_ERROR),
     ('gflGetFormatInformationByName', [c_char_p, POINTER(GFL_FORMAT_INFORMATION)], GFL_ERROR, F_GFL_ERROR),
-    ('gflSaveParamsIsSupportedByIndex.argtypes', [GFL_INT32, GFL_SAVE_PARAMS_TYPE], GFL_BOOL),
+    ('gflSaveParamsIsSupportedByIndex', [GFL_INT32, GFL_SAVE_PARAMS_TYPE], GFL_BOOL),
     ('gflSaveParamsIsSupportedByName', [c_char_p, GFL_SAVE_PARAMS_TYPE], GFL_BOOL),
     ('gflCompressionIsSupportedByIndex', [GFL_INT32, GFL_COMPRESSION], GFL_BOOL),
     ('gflCompressionIsSupportedByName', [c_char_p, GFL_COMPRESSION], GFL_BOOL),
@@ -714,7 +938,7 @@ class GFL(object):
     ('gflFileCreate', [POINTER(GFL_FILE_HANDLE), c_char_p, GFL_UINT32, POINTER(GFL_SAVE_PARAMS)], GFL_ERROR, F_GFL_ERROR),
     ('gflFileAddPicture', [GFL_FILE_HANDLE, POINTER(GFL_BITMAP)], GFL_ERROR, F_GFL_ERROR),
     ('gflFileClose', [GFL_FILE_HANDLE], None),
-    ('gflAllockBitmap', [GFL_BITMAP_TYPE, GFL_INT32, GFL_UINT32, POINTER(GFL_COLOR)], POINTER(GFL_BITMAP)),
+    ('gflAllockBitmap', [GFL_BITMAP_TYPE, GFL_INT32, GFL_INT32, GFL_UINT32, POINTER(GFL_COLOR)], POINTER(GFL_BITMAP)),
     ('gflAllockBitmapEx', [GFL_BITMAP_TYPE, GFL_INT32, GFL_INT32, GFL_UINT16,
                                          GFL_UINT32, POINTER(GFL_COLOR)], POINTER(GFL_BITMAP)),
     ('gflFreeBitmap', [POINTER(GFL_BITMAP)], None),
@@ -738,8 +962,8 @@ class GFL(object):
     ('gflGetEXIFDPI', [POINTER(GFL_BITMAP), POINTER(GFL_INT32), POINTER(GFL_INT32)], GFL_BOOL),
     ('gflLoadEXIF', [c_char_p, GFL_UINT32], POINTER(GFL_EXIF_DATA)),
     ('gflHasEXIF', [c_char_p], GFL_BOOL),
-    ('gflLoadEXIF2', [c_char_p, GFL_UINT32], POINTER(GFL_EXIF_DATAEX),
-    ('gflHasIPTC', [c_char_p], GFL_BOOL),),
+    ('gflLoadEXIF2', [c_char_p, GFL_UINT32], POINTER(GFL_EXIF_DATAEX)),
+    ('gflHasIPTC', [c_char_p], GFL_BOOL),
     ('gflHasICCProfile', [c_char_p], GFL_BOOL),
     ('gflBitmapGetIPTC', [POINTER(GFL_BITMAP)], POINTER(GFL_IPTC_DATA)),
     ('gflBitmapGetIPTCValue', [POINTER(GFL_BITMAP), GFL_UINT32, c_char_p, GFL_INT32], GFL_ERROR, F_GFL_ERROR),
@@ -829,32 +1053,1220 @@ class GFL(object):
             ('gflLoadPreviewFromHandle', 'gflLoadThumbnailFromHandle'),
            ]
 
-  def __init__(self):
+  _signatures = None  # {nom: (symbole, argtypes, restype, errcheck)}, construit au premier accès
+
+  def __init__(self, libname=None, stats=None):
+    """\
+    Charge la bibliothèque. Les fonctions de `lfn` sont liées au premier accès (voir __getattr__).
+
+    :param basestring libname: Nom ou chemin de la bibliothèque (par défaut : recherche par
+                               load_library), par exemple une bibliothèque de substitution.
+    :param CallStats stats: Active le mode instrumenté : chaque fonction liée alimente ces compteurs.
+    :raises OSError: si la bibliothèque est introuvable.
+    """
+    self.stats = stats
+    self.libgfl = load_library(libname)
+
+  @classmethod
+  def signatures(cls):
+    """\
+    Prototypes des fonctions de la bibliothèque (`lfn` et alias de `lalias`).
+
+    :rtype: dict
+    :return: {nom: (symbole, argtypes, restype, errcheck)}
+    """
+    if cls._signatures is None:
+      signatures = dict((arg[0], (arg[0],) + tuple(arg[1:]) + (None,) * (4 - len(arg))) for arg in cls.lfn)
+      for alias, name in cls.lalias:
+        signatures[alias] = signatures[name]
+      cls._signatures = signatures
+    return cls._signatures
+
+  def __getattr__(self, name):
+    """\
+    Lie une fonction de la bibliothèque au premier accès ; elle est ensuite un simple attribut.
+
+    :raises AttributeError: si la fonction est inconnue ou absente de la bibliothèque chargée.
+    """
+    signature = GFL.signatures().get(name) if name.startswith('gfl') else None
+    if signature is None:
+      raise AttributeError(name)
+    symbol, argtypes, restype, errcheck = signature
+    return self.append_libgfl(name, argtypes, restype, errcheck, symbol)
+
+  def append_libgfl(self, fn, argtypes, restype, errcheck=None, symbol=None):
+    """\
+    Lie la fonction `symbol` (par défaut `fn`) de la bibliothèque sous le nom `fn`.
+
+    :return: Fonction liée.
+    """
+    f = getattr(self.libgfl, symbol or fn)
+    f.argtypes = argtypes
+    f.restype = restype
+    if errcheck:
+      f.errcheck = getattr(self, errcheck.__name__)
+    if self.stats is not None:
+      f = self.stats.wrap(fn, f)
+    setattr(self, fn, f)
+    return f
+
+  def bind_all(self):
+    """\
+    Lie toutes les fonctions connues (vérification d'une version de la bibliothèque).
+
+    :rtype: list(str)
+    :return: Fonctions absentes de la bibliothèque chargée.
+    """
+    missing = []
+    for name in GFL.signatures():
+      try:
+        getattr(self, name)
+      except AttributeError:
+        missing.append(name)
+    return sorted(missing)
+
+  def close(self):
+    "Frees resources"
+    self.libgfl.gflLibraryExit()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+
+# Implémentations de la bibliothèque : {nom: classe ou "module:classe" (importé au premier usage)}.
+# Une implémentation s'instancie comme GFL (libname, stats) et fournit les mêmes fonctions gfl*.
+BACKENDS = {'native': GFL,
+            'fake': 'fakegfl:FakeGFL'}
+
+
+def open_backend(name=None, libname=None, stats=None):
+  """\
+  Instancie une implémentation de la bibliothèque.
+
+  :param str name: Nom dans BACKENDS (par défaut : variable d'environnement PYGFL_BACKEND, sinon 'native').
+  :param basestring libname: Bibliothèque native à charger (voir load_library).
+  :param CallStats stats: Active le mode instrumenté.
+  :raises ValueError: si l'implémentation est inconnue.
+  """
+  name = name or os.environ.get(BACKEND_ENV) or 'native'
+  try:
+    factory = BACKENDS[name]
+  except KeyError:
+    raise ValueError("Implémentation {!r} inconnue ({}).".format(name, ', '.join(sorted(BACKENDS))))
+  if not callable(factory):
+    module, _, attr = factory.partition(':')
+    factory = BACKENDS[name] = getattr(importlib.import_module(module), attr)
+  return factory(libname, stats)
+
+
+# ==========================
+# Images
+# ==========================
+def _bitmap_buffer(bitmap):
+  "Tableau ctypes couvrant les pixels de l'image (sans copie)."
+  if not bitmap.Data:
+    raise GFL_Exception(GFL_ERROR_BAD_BITMAP.value, "Image sans données.")
+  size = bitmap.BytesPerLine * bitmap.Height
+  return (GFL_UINT8 * size).from_address(ctypes.addressof(bitmap.Data.contents))
+
+
+# Position des composantes rouge, verte, bleue et alpha dans un pixel
+_RGBA_ORDER = {GFL_RGB: (0, 1, 2, None), GFL_BGR: (2, 1, 0, None),
+               GFL_RGBA: (0, 1, 2, 3), GFL_ABGR: (3, 2, 1, 0),
+               GFL_BGRA: (2, 1, 0, 3), GFL_ARGB: (1, 2, 3, 0)}
+
+# Valeurs (0 ou 1) des 8 pixels d'un octet d'une image GFL_BINARY
+_BITS_TO_INDEX = [bytes(bytearray(1 if value & (0x80 >> k) else 0 for k in range(8))) for value in range(256)]
+_BINARY_TO_GREY = bytes(bytearray([0, 255] + [0] * 254))
+
+
+class Bitmap(object):
+  """\
+  Image GFL dont la mémoire est libérée par gflFreeBitmap en sortie de bloc `with`,
+  lors de l'appel à close() ou à défaut lors de la destruction de l'objet.
+
+  L'objet peut être passé directement aux fonctions attendant un POINTER(GFL_BITMAP)
+  et les champs de GFL_BITMAP sont accessibles comme attributs (bitmap.Width, ...).
+  Les pixels sont exposés sans copie par memoryview() (et le protocole buffer en python >= 3.12) ;
+  tant qu'une vue existe, la libération est différée jusqu'à la disparition de la dernière vue.
+  """
+  def __init__(self, p_bitmap):
+    self._p_bitmap = p_bitmap
+    self._closed = False
+    self._exports = []  # weakref vers les tampons exposés
+
+  @property
+  def _as_parameter_(self):
+    "Conversion implicite en POINTER(GFL_BITMAP) lors des appels ctypes."
+    return self.pointer
+
+  @property
+  def pointer(self):
+    if self.closed:
+      raise ValueError("Image libérée.")
+    return self._p_bitmap
+
+  @property
+  def closed(self):
+    return self._closed or not self._p_bitmap
+
+  def __getattr__(self, name):
+    if name.startswith('_'):
+      raise AttributeError(name)
+    if self.closed:
+      raise BitmapClosedError("Image libérée ({}).".format(name))
+    return getattr(self.pointer.contents, name)
+
+  def _exported(self):
+    self._exports = [ref for ref in self._exports if ref() is not None]
+    return bool(self._exports)
+
+  def _free(self):
+    p_bitmap, self._p_bitmap = self._p_bitmap, None
+    if p_bitmap:
+      libgfl.gflFreeBitmap(p_bitmap)
+
+  def detach(self):
+    """\
+    Rend la propriété de l'image à l'appelant, qui devra la libérer.
+
+    :rtype: POINTER(GFL_BITMAP)
+    """
+    if self._exported():
+      raise BufferError("Des vues sur les pixels existent encore.")
+    p_bitmap, self._p_bitmap = self.pointer, None
+    self._closed = True
+    return p_bitmap
+
+  def close(self):
+    "Libère l'image. Sans effet si elle est déjà libérée."
+    self._closed = True
+    if not self._exported():
+      self._free()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+  def __del__(self):
+    if getattr(self, '_p_bitmap', None):
+      self._free()
+
+  def buffer(self):
+    """\
+    Tableau ctypes (GFL_UINT8 * BytesPerLine * Height) sur les pixels, sans copie.
+
+    Le tableau maintient l'image en vie.
+    """
+    buf = _bitmap_buffer(self.pointer.contents)
+    buf._bitmap = self
+    self_ref = weakref.ref(self)  # Pas de cycle : __del__ doit rester appelable.
+
+    def released(_ref):
+      bitmap = self_ref()
+      if bitmap is not None and bitmap._closed and not bitmap._exported():
+        bitmap._free()
+
+    self._exports.append(weakref.ref(buf, released))
+    return buf
+
+  def memoryview(self):
+    "Vue en lecture/écriture sur les pixels (lignes de BytesPerLine octets), sans copie."
+    return memoryview(self.buffer())
+
+  def __buffer__(self, _flags):
+    return self.memoryview()
+
+  def to_array(self):
+    """\
+    Retourne une vue numpy (sans copie) sur les pixels.
+
+    Formes retournées :
+     - 1 bit par composante : (Height, (Width + 7) // 8) en uint8, pixels compactés (MSB en premier) ;
+     - 8 bits : (Height, Width) ou (Height, Width, ComponentsPerPixel) en uint8 ;
+     - 16 bits : idem en uint16 (ordre des octets natif).
+
+    :rtype: numpy.ndarray
+    """
+    global numpy
+    if numpy is None:
+      try:
+        import numpy
+      except ImportError:
+        raise ImportError("numpy est nécessaire pour Bitmap.to_array.")
+
+    bitmap = self.pointer.contents
+    bpc = bitmap.BitsPerComponent
+    components = bitmap.ComponentsPerPixel
+    if bpc == 1 and components == 1:
+      dtype = numpy.uint8
+      shape = (bitmap.Height, (bitmap.Width + 7) // 8)
+      strides = (bitmap.BytesPerLine, 1)
+    elif bpc in (8, 16):
+      dtype = numpy.uint8 if bpc == 8 else numpy.uint16
+      item = bpc // 8
+      bytes_per_pixel = bitmap.BytesPerPixel or components * item
+      if components == 1:
+        shape = (bitmap.Height, bitmap.Width)
+        strides = (bitmap.BytesPerLine, bytes_per_pixel)
+      else:
+        shape = (bitmap.Height, bitmap.Width, components)
+        strides = (bitmap.BytesPerLine, bytes_per_pixel, item)
+    else:
+      raise GFL_Exception(GFL_ERROR_BAD_BITMAP.value,
+                          "{} bits par composante non gérés.".format(bpc))
+
+    # Le tampon référence l'image : elle vit aussi longtemps que le tableau numpy.
+    return numpy.ndarray(shape, dtype, buffer=self.buffer(), strides=strides)
+
+  # Accès aux pixels par rectangles
+  def _rect(self, rect):
+    "Rectangle (x, y, w, h) vérifié ; toute l'image si `rect` vaut None."
+    bitmap = self.pointer.contents
+    if rect is None:
+      return 0, 0, bitmap.Width, bitmap.Height
+    if isinstance(rect, GFL_RECT):
+      rect = (rect.x, rect.y, rect.w, rect.h)
+    x, y, w, h = rect
+    if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > bitmap.Width or y + h > bitmap.Height:
+      raise GFL_Exception(GFL_ERROR_BAD_PARAMETERS.value, "Rectangle {} hors de l'image.".format(tuple(rect)))
+    return x, y, w, h
+
+  def _bits_per_pixel(self):
+    return self.BitsPerComponent * self.ComponentsPerPixel
+
+  def get_pixels(self, rect=None, rgba=False):
+    """\
+    Copie les pixels d'un rectangle (une copie mémoire par ligne).
+
+    :param rect: Rectangle à lire (par défaut : toute l'image).
+    :type  rect: GFL_RECT ou tuple(x, y, w, h)
+    :param bool rgba: Conversion en RGBA 8 bits (palette appliquée, composantes réordonnées,
+                      octet de poids fort des composantes 16 bits).
+    :rtype: bytearray
+    :return: Lignes de w pixels, sans remplissage, dans le format de l'image
+             ((w * bits par pixel + 7) // 8 octets par ligne) ou en RGBA (4 * w octets par ligne).
+    """
+    x, y, w, h = self._rect(rect)
+    bitmap = self.pointer.contents
+    row_size = (w * self._bits_per_pixel() + 7) // 8
+    data = bytearray(row_size * h)
+    dest = (c_char * len(data)).from_buffer(data)
+    copy = _column_copier(bitmap)
+    source = ctypes.addressof(bitmap.Data.contents) + y * bitmap.BytesPerLine
+    for k in range(h):
+      copy(source + k * bitmap.BytesPerLine, ctypes.addressof(dest) + k * row_size, x, w)
+    del dest
+    return self._to_rgba(data, w, h) if rgba else data
+
+  def _to_rgba(self, data, w, h):
+    "Conversion de pixels (format de l'image, lignes sans remplissage) en RGBA 8 bits."
+    bitmap = self.pointer.contents
+    out = bytearray(b'\xff') * (4 * w * h)
+    bpc = bitmap.BitsPerComponent
+
+    if bpc == 1:
+      # Un octet (0 ou 1) par pixel, puis traitement comme une palette.
+      row_size = (w + 7) // 8
+      data = b''.join(b''.join(map(_BITS_TO_INDEX.__getitem__, data[k * row_size:(k + 1) * row_size]))[:w]
+                      for k in range(h))
+      bpc = 8
+
+    if bpc != 8 and bpc != 16:
+      raise GFL_Exception(GFL_ERROR_BAD_BITMAP.value, "{} bits par composante non gérés.".format(bpc))
+    item = bpc // 8
+    high = item - 1 if sys.byteorder == 'little' else 0  # Octet de poids fort d'une composante
+    data = bytes(data)
+
+    if bitmap.ComponentsPerPixel == 1:
+      values = data[high::item]
+      if bitmap.ColorMap and bpc == 8:
+        colormap = bitmap.ColorMap.contents
+        out[0::4] = values.translate(bytes(bytearray(colormap.Red)))
+        out[1::4] = values.translate(bytes(bytearray(colormap.Green)))
+        out[2::4] = values.translate(bytes(bytearray(colormap.Blue)))
+      else:
+        if bitmap.BitsPerComponent == 1:
+          values = values.translate(_BINARY_TO_GREY)
+        out[0::4] = out[1::4] = out[2::4] = values
+      return out
+
+    order = _RGBA_ORDER.get(bitmap.Type)
+    if order is None:
+      raise GFL_Exception(GFL_ERROR_BAD_BITMAP.value, "Type d'image {} non géré.".format(bitmap.Type))
+    step = item * bitmap.ComponentsPerPixel
+    for channel, component in enumerate(order):
+      if component is not None:
+        out[channel::4] = data[component * item + high::step]
+    return out
+
+  def set_pixels(self, rect, data):
+    """\
+    Écrit les pixels d'un rectangle (une copie mémoire par ligne).
+
+    :param rect: Rectangle à écrire (None : toute l'image) ; pour les images de moins d'un octet par pixel,
+                 x doit correspondre à un début d'octet.
+    :type  rect: GFL_RECT ou tuple(x, y, w, h)
+    :param data: Objet supportant le protocole buffer : lignes de w pixels dans le format de l'image,
+                 sans remplissage (voir get_pixels).
+    """
+    x, y, w, h = self._rect(rect)
+    bitmap = self.pointer.contents
+    bits = self._bits_per_pixel()
+    if (x * bits) % 8:
+      raise GFL_Exception(GFL_ERROR_BAD_PARAMETERS.value, "La colonne {} ne commence pas un octet.".format(x))
+    row_size = (w * bits + 7) // 8
+    keep, address, size = _buffer_address(data)
+    if size != row_size * h:
+      raise ValueError("{} octets attendus, {} fournis.".format(row_size * h, size))
+
+    rest = (w * bits) % 8
+    base = ctypes.addressof(bitmap.Data.contents) + y * bitmap.BytesPerLine + (x * bits) // 8
+    for k in range(h):
+      destination = base + k * bitmap.BytesPerLine
+      if not rest:
+        ctypes.memmove(destination, address + k * row_size, row_size)
+        continue
+      # Dernier octet partiel : les pixels hors du rectangle sont conservés.
+      ctypes.memmove(destination, address + k * row_size, row_size - 1)
+      mask = (0xFF << (8 - rest)) & 0xFF
+      last = GFL_UINT8.from_address(destination + row_size - 1)
+      last.value = (last.value & ~mask & 0xFF) | (GFL_UINT8.from_address(address + (k + 1) * row_size - 1).value & mask)
+    del keep
+
+  def _pixel(self, color):
+    "Représentation d'une couleur dans le format de l'image (octets, ou valeur du bit pour GFL_BINARY)."
+    bitmap = self.pointer.contents
+    if isinstance(color, GFL_COLOR):
+      color = (color.Red, color.Green, color.Blue, color.Alpha)
+    bpc = bitmap.BitsPerComponent
+    maximum = (1 << bpc) - 1
+
+    if bitmap.ComponentsPerPixel == 1:
+      if isinstance(color, tuple):
+        if bitmap.ColorMap and bpc <= 8:
+          # Entrée la plus proche de la palette.
+          colormap = bitmap.ColorMap.contents
+          used = bitmap.ColorUsed or (1 << bpc)
+          color = min(range(used), key=lambda i: (colormap.Red[i] - color[0]) ** 2 +
+                                                 (colormap.Green[i] - color[1]) ** 2 +
+                                                 (colormap.Blue[i] - color[2]) ** 2)
+        else:
+          color = (color[0] * 299 + color[1] * 587 + color[2] * 114) // 1000
+          if bpc == 1:
+            color = 1 if color >= 128 else 0
+      if bpc == 1:
+        return color & 1
+      return struct.pack('=H', color) if bpc == 16 else bytes(bytearray([color]))
+
+    order = _RGBA_ORDER.get(bitmap.Type)
+    if order is None or bpc not in (8, 16):
+      raise GFL_Exception(GFL_ERROR_BAD_BITMAP.value, "Type d'image {} non géré.".format(bitmap.Type))
+    if len(color) == 3:
+      color = tuple(color) + (maximum,)
+    components = [0] * bitmap.ComponentsPerPixel
+    for channel, component in enumerate(order):
+      if component is not None:
+        components[component] = color[channel]
+    return struct.pack('={}{}'.format(len(components), 'H' if bpc == 16 else 'B'), *components)
+
+  def fill(self, rect, color):
+    """\
+    Remplit un rectangle d'une couleur (une copie mémoire par ligne).
+
+    :param rect: Rectangle à remplir (None : toute l'image).
+    :type  rect: GFL_RECT ou tuple(x, y, w, h)
+    :param color: Couleur : tuple (r, g, b[, a]) ou GFL_COLOR, dans l'échelle des composantes de l'image
+                  (0-255 ou 0-65535), ou valeur directe (niveau de gris, index de palette, bit).
+    """
+    x, y, w, h = self._rect(rect)
+    bitmap = self.pointer.contents
+    pixel = self._pixel(color)
+    base = ctypes.addressof(bitmap.Data.contents) + y * bitmap.BytesPerLine
+
+    if bitmap.BitsPerComponent >= 8:
+      row = pixel * w
+      for k in range(h):
+        ctypes.memmove(base + k * bitmap.BytesPerLine + x * len(pixel), row, len(row))
+      return
+
+    first, last = x // 8, (x + w - 1) // 8
+    head = (0xFF >> (x % 8)) & 0xFF
+    tail = (0xFF << (7 - (x + w - 1) % 8)) & 0xFF
+    value = 0xFF if pixel else 0
+    edges = [(first, head & tail)] if first == last else [(first, head), (last, tail)]
+    for k in range(h):
+      row = base + k * bitmap.BytesPerLine
+      for index, mask in edges:
+        byte = GFL_UINT8.from_address(row + index)
+        byte.value = (byte.value & ~mask & 0xFF) | (value & mask)
+      if last - first > 1:
+        ctypes.memset(row + first + 1, value, last - first - 1)
+
+
+def bitmap_to_array(p_bitmap, steal=False):
+  """\
+  Retourne une vue numpy (sans copie) sur les pixels d'une image (voir Bitmap.to_array).
+
+  Un Bitmap reste propriétaire de l'image, le tableau le garde seulement en vie.
+  Un POINTER(GFL_BITMAP) n'est accepté qu'avec `steal` : le tableau devient propriétaire de l'image,
+  libérée par gflFreeBitmap lorsque le tableau (et toutes les vues qui en dérivent) n'est plus
+  référencé. L'appelant ne doit alors plus libérer ce pointeur ni le transmettre à nouveau.
+
+  :param p_bitmap: Image à exposer.
+  :type  p_bitmap: Bitmap ou POINTER(GFL_BITMAP)
+  :param bool steal: Prendre possession d'un POINTER(GFL_BITMAP).
+  :rtype: numpy.ndarray
+  """
+  if not isinstance(p_bitmap, Bitmap):
+    if not steal:
+      raise TypeError("bitmap_to_array : Bitmap attendu (steal=True pour prendre possession "
+                      "d'un POINTER(GFL_BITMAP)).")
+    p_bitmap = Bitmap(p_bitmap)
+  return p_bitmap.to_array()
+
+
+def _address(address):
+  "Pointeur GFL_UINT8 vers une adresse mémoire."
+  return ctypes.cast(address, POINTER(GFL_UINT8))
+
+
+def _buffer_address(data):
+  """\
+  Adresse et taille des octets d'un objet supportant le protocole buffer.
+
+  Les bytes et les tampons modifiables contigus dans l'ordre C sont utilisés sans copie, les autres
+  (tampons en lecture seule, découpés, ordre Fortran comme un tableau numpy transposé) sont copiés.
+
+  :return: (objet à conserver tant que l'adresse est utilisée, adresse, taille)
+  """
+  if isinstance(data, bytes):
+    return data, ctypes.cast(c_char_p(data), c_void_p).value or 0, len(data)
+  view = memoryview(data)
+  size = view.nbytes
+  if not view.readonly and view.c_contiguous:
+    buf = (c_char * size).from_buffer(view)
+  else:
+    buf = (c_char * size).from_buffer_copy(view.tobytes())
+  return buf, ctypes.addressof(buf), size
+
+
+# Nombre de composantes par pixel des types d'image
+_COMPONENTS = {GFL_BINARY: 1, GFL_GREY: 1, GFL_COLORS: 1,
+               GFL_RGB: 3, GFL_BGR: 3,
+               GFL_RGBA: 4, GFL_ABGR: 4, GFL_BGRA: 4, GFL_ARGB: 4, GFL_CMYK: 4}
+
+
+def bitmap_header(_type, width, height, bits=8, colormap=None, dpi=None):
+  """\
+  Construit la description (sans pixels) d'une image, pour LineWriter.
+
+  :param GFL_BITMAP_TYPE _type: GFL_BINARY, GFL_GREY, GFL_COLORS, GFL_RGB...
+  :param int bits: Nombre de bits par composante (8 ou 16 ; 1 pour GFL_BINARY).
+  :param GFL_COLORMAP colormap: Palette (GFL_COLORS).
+  :rtype: GFL_BITMAP
+  """
+  if _type == GFL_BINARY:
+    bits = 1
+  components = _COMPONENTS[_type]
+  header = GFL_BITMAP()
+  header.Type = _type
+  header.Origin = GFL_TOP_LEFT
+  header.Width = width
+  header.Height = height
+  header.BitsPerComponent = bits
+  header.ComponentsPerPixel = components
+  header.BytesPerPixel = (bits * components) // 8
+  header.BytesPerLine = (width * bits * components + 7) // 8
+  header.LinePadding = 1
+  header.TransparentIndex = -1
+  if dpi:
+    header.Xdpi = header.Ydpi = dpi
+  if colormap is not None:
+    header.ColorMap = pointer(colormap)
+    header.ColorUsed = 256
+  return header
+
+
+def _column_copier(header):
+  """\
+  Fonction copy(source, destination, x, w) copiant les colonnes [x, x + w[ d'une ligne
+  (adresse `source`) au début d'une autre ligne (adresse `destination`).
+  """
+  if header.BitsPerComponent >= 8:
+    bytes_per_pixel = header.BytesPerPixel
+
+    def copy(source, destination, x, w):
+      ctypes.memmove(destination, source + x * bytes_per_pixel, w * bytes_per_pixel)
+    return copy
+
+  # Moins d'un octet par pixel : hors alignement sur un octet, le recadrage d'une image
+  # d'une ligne est confié à la bibliothèque.
+  bits = header.BitsPerComponent * header.ComponentsPerPixel
+  row = GFL_BITMAP.from_buffer_copy(header)
+  row.Height = 1
+
+  def copy(source, destination, x, w):
+    size = (w * bits + 7) // 8
+    if not (x * bits) % 8:
+      ctypes.memmove(destination, source + (x * bits) // 8, size)
+      rest = (w * bits) % 8
+      if rest:
+        # Efface les pixels situés au-delà du rectangle dans le dernier octet.
+        GFL_UINT8.from_address(destination + size - 1).value &= (0xFF << (8 - rest)) & 0xFF
+      return
+    row.Data = _address(source)
+    p_piece = POINTER(GFL_BITMAP)()
+    libgfl.gflCrop(pointer(row), byref(p_piece), byref(GFL_RECT(x, 0, w, 1)))
+    with Bitmap(p_piece) as piece:
+      ctypes.memmove(destination, piece.Data, size)
+  return copy
+
+
+class LineReader(object):
+  """\
+  Lecture d'une image ligne par ligne (gflLoadBitmapBegin / gflLoadBitmapReadLine / gflLoadBitmapEnd).
+
+  Seule une ligne (ou un bloc de lignes) est en mémoire à la fois.
+  Les attributs de l'image (Width, Height, BytesPerLine, Type...) sont ceux de `bitmap`.
+  Le jeton d'annulation éventuel est vérifié avant chaque ligne (ou bloc de lignes) : la lecture
+  lève alors GFL_Cancelled.
+  """
+  def __init__(self, filename, load_params, token=None):
+    """\
+    :param basestring filename: Fichier à lire.
+    :param GFL_LOAD_PARAMS load_params: Options de lecture (ImageWanted : page à lire).
+    :param CancelToken token: Jeton d'annulation / délai de la lecture.
+    """
+    self.token = token
+    if token is not None:
+      token.check()
+    self._handle = c_void_p()
+    self.file_info = GFL_FILE_INFORMATION()
+    p_bitmap = POINTER(GFL_BITMAP)()
+    libgfl.gflLoadBitmapBegin(byref(self._handle), filename, byref(p_bitmap),
+                              byref(load_params), byref(self.file_info))
+    self.bitmap = Bitmap(p_bitmap)  # Description de l'image (sans les pixels)
+    self.line = 0  # Prochaine ligne à lire
+
+  @property
+  def width(self):
+    return self.bitmap.Width
+
+  @property
+  def height(self):
+    return self.bitmap.Height
+
+  @property
+  def bytes_per_line(self):
+    return self.bitmap.BytesPerLine
+
+  def read_line(self, buf=None):
+    """\
+    Lit la ligne suivante.
+
+    :param buf: Tampon modifiable d'au moins BytesPerLine octets (alloué si absent).
+    :return: Le tampon contenant la ligne.
+    """
+    if self.line >= self.height:
+      raise EOFError("Toutes les lignes ont été lues.")
+    if self.token is not None:
+      self.token.check()
+    if buf is None:
+      buf = (GFL_UINT8 * self.bytes_per_line)()
+    dest = (GFL_UINT8 * self.bytes_per_line).from_buffer(buf)
+    libgfl.gflLoadBitmapReadLine(self._handle, dest)
+    self.line += 1
+    return buf
+
+  def skip(self, count):
+    "Lit et ignore les `count` lignes suivantes."
+    buf = (GFL_UINT8 * self.bytes_per_line)()
+    for _ in range(min(count, self.height - self.line)):
+      self.read_line(buf)
+
+  def iter_rows(self, rows=1):
+    """\
+    Parcourt les lignes restantes par blocs de `rows` lignes.
+
+    Le même tampon est réutilisé à chaque bloc : son contenu doit être consommé (ou copié)
+    avant de demander le bloc suivant. Le dernier bloc peut être plus court.
+
+    :rtype: iterator(memoryview)
+    :return: Blocs de n * BytesPerLine octets.
+    """
+    bpl = self.bytes_per_line
+    buf = (GFL_UINT8 * (bpl * rows))()
+    view = memoryview(buf)
+    base = ctypes.addressof(buf)
+    while self.line < self.height:
+      if self.token is not None:
+        self.token.check()
+      count = min(rows, self.height - self.line)
+      for k in range(count):
+        libgfl.gflLoadBitmapReadLine(self._handle, _address(base + k * bpl))
+        self.line += 1
+      yield view[:count * bpl]
+
+  def __iter__(self):
+    return self.iter_rows(1)
+
+  def close(self):
+    "Termine la lecture et libère les ressources."
+    if self._handle:
+      handle, self._handle = self._handle, c_void_p()
+      try:
+        libgfl.gflLoadBitmapEnd(handle)
+      finally:
+        self.bitmap.close()
+        libgfl.gflFreeFileInformation(byref(self.file_info))
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+
+class LineWriter(object):
+  """\
+  Écriture d'une image ligne par ligne (gflSaveBitmapBegin / gflSaveBitmapWriteLine / gflSaveBitmapEnd).
+
+  L'image complète n'est jamais allouée : les lignes sont encodées au fur et à mesure.
+  """
+  def __init__(self, filename, bitmap, save_params):
+    """\
+    :param basestring filename: Fichier à créer.
+    :param bitmap: Description de l'image (dimensions, type, palette) ; les pixels sont ignorés.
+    :type  bitmap: GFL_BITMAP, POINTER(GFL_BITMAP) ou Bitmap (voir bitmap_header)
+    :param GFL_SAVE_PARAMS save_params: Options d'enregistrement.
+    """
+    if not isinstance(bitmap, GFL_BITMAP):
+      bitmap = getattr(bitmap, 'pointer', bitmap).contents
+    self.bitmap = GFL_BITMAP.from_buffer_copy(bitmap)
+    self.bitmap.Data = None
+    if bitmap.ColorMap:
+      # Copie de la palette : l'image d'origine peut être libérée avant la fin de l'écriture.
+      self._colormap = GFL_COLORMAP.from_buffer_copy(bitmap.ColorMap.contents)
+      self.bitmap.ColorMap = pointer(self._colormap)
+    self._handle = c_void_p()
+    libgfl.gflSaveBitmapBegin(byref(self._handle), filename, byref(self.bitmap), byref(save_params))
+    self.line = 0  # Prochaine ligne à écrire
+
+  @property
+  def bytes_per_line(self):
+    return self.bitmap.BytesPerLine
+
+  def write_line(self, data):
+    """\
+    Écrit la ligne suivante.
+
+    :param data: Objet supportant le protocole buffer (au moins BytesPerLine octets).
+    """
+    self.write_rows(data, 1)
+
+  def write_rows(self, data, count=None):
+    """\
+    Écrit des lignes consécutives.
+
+    :param data: Objet supportant le protocole buffer contenant des lignes de BytesPerLine octets
+                 (bytes, bytearray, memoryview, mmap, numpy.ndarray...).
+    :param int count: Nombre de lignes à écrire (par défaut : toutes celles contenues dans `data`).
+    """
+    bpl = self.bytes_per_line
+    keep, address, size = _buffer_address(data)
+    if count is None:
+      if size % bpl:
+        raise ValueError("La taille des données ({}) n'est pas un multiple de {} octets.".format(size, bpl))
+      count = size // bpl
+    elif count * bpl > size:
+      raise ValueError("Données insuffisantes pour {} lignes.".format(count))
+    if self.line + count > self.bitmap.Height:
+      raise ValueError("L'image ne contient que {} lignes.".format(self.bitmap.Height))
+    for k in range(count):
+      libgfl.gflSaveBitmapWriteLine(self._handle, _address(address + k * bpl))
+      self.line += 1
+    del keep
+
+  def close(self):
+    "Termine l'écriture du fichier."
+    if self._handle:
+      handle, self._handle = self._handle, c_void_p()
+      libgfl.gflSaveBitmapEnd(handle)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+
+class HandleSource(object):
+  """\
+  Source de données pour gflLoadBitmapFromHandle : les fonctions Read/Tell/Seek de
+  GFL_LOAD_CALLBACKS lisent un tampon en mémoire (bytes, mmap...) ou un objet fichier.
+
+  Pour un tampon, une lecture est une simple copie mémoire (memmove) : avec from_path, le fichier
+  est projeté en mémoire (mmap) et seules les pages effectivement lues sont chargées par le système.
+  Les objets fichiers (membres d'archives, flux réseau...) doivent permettre seek() et tell().
+
+  Note : l'interface de la bibliothèque limite les positions à 32 bits.
+  """
+  def __init__(self, source):
+    """\
+    :param source: Objet supportant le protocole buffer ou objet fichier (read, seek, tell).
+    """
+    self._mapping = None
+    if hasattr(source, 'read'):
+      self._file = source
+      self._keep, self._address, self._size = None, None, None
+    else:
+      self._file = None
+      self._keep, self._address, self._size = _buffer_address(source)
+    self._position = 0
+    self.error = None  # Exception levée dans une fonction de rappel
+    # Les fonctions de rappel doivent rester en vie pendant le chargement.
+    self._callbacks = (GFL_READ_CALLBACK(self._read),
+                       GFL_TELL_CALLBACK(self._tell),
+                       GFL_SEEK_CALLBACK(self._seek))
+
+  @classmethod
+  def from_path(cls, filename):
+    "Source projetant le fichier en mémoire (mmap)."
+    with open(filename, 'rb') as fp:
+      if not os.fstat(fp.fileno()).st_size:
+        return cls(b'')
+      # ACCESS_COPY : projection privée, accessible en écriture donc adressable par ctypes.
+      mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_COPY)
+    source = cls(mapping)
+    source._mapping = mapping
+    return source
+
+  def install(self, load_params):
+    "Renseigne les fonctions Read/Tell/Seek dans les options de lecture."
+    load_params.Callbacks.Read, load_params.Callbacks.Tell, load_params.Callbacks.Seek = self._callbacks
+
+  def _read(self, _handle, buffer, size):
+    try:
+      if self._file is None:
+        count = max(0, min(size, self._size - self._position))
+        ctypes.memmove(buffer, self._address + self._position, count)
+        self._position += count
+        return count
+      dest = (c_char * size).from_address(buffer)
+      if hasattr(self._file, 'readinto'):
+        return self._file.readinto(dest) or 0
+      data = self._file.read(size)
+      ctypes.memmove(dest, data, len(data))
+      return len(data)
+    except Exception as exc:
+      self.error = exc
+      return 0
+
+  def _tell(self, _handle):
+    if self._file is None:
+      return self._position
+    try:
+      return self._file.tell()
+    except Exception as exc:
+      self.error = exc
+      return 0
+
+  def _seek(self, _handle, offset, origin):
+    try:
+      if self._file is None:
+        base = (0, self._position, self._size)[origin]
+        self._position = min(max(0, base + offset), self._size)
+      else:
+        self._file.seek(offset, origin)
+      return 0
+    except Exception as exc:
+      self.error = exc
+      return 1
+
+  def close(self):
+    "Libère la projection mémoire éventuelle (l'objet fichier reste ouvert)."
+    self._keep = None
+    if self._mapping is not None:
+      self._mapping.close()
+      self._mapping = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, _exc_type, _exc_value, _traceback):
+    self.close()
+
+
+# ==========================
+# Allocateurs mémoire
+# ==========================
+_libc = None
+
+
+def _get_libc():
+  "Bibliothèque C (malloc, realloc, free)."
+  global _libc
+  if _libc is None:
     if sys.platform == 'win32':
-      self.libgfl = ctypes.windll.LoadLibrary('libgfl340.dll')
+      libc = ctypes.cdll.msvcrt
+    else:
+      libc = ctypes.CDLL(ctypes.util.find_library('c'))
+    libc.malloc.argtypes = [c_size_t]
+    libc.malloc.restype = c_void_p
+    libc.realloc.argtypes = [c_void_p, c_size_t]
+    libc.realloc.restype = c_void_p
+    libc.free.argtypes = [c_void_p]
+    libc.free.restype = None
+    _libc = libc
+  return _libc
+
+
+class CountingAllocator(object):
+  """\
+  Allocateur de la bibliothèque (gflLibraryInitEx) reposant sur malloc/realloc/free,
+  qui compte la mémoire utilisée et peut imposer un plafond.
+
+  Au-delà du plafond, l'allocation échoue et la bibliothèque retourne GFL_ERROR_NO_MEMORY.
+  Un bloc inconnu (non alloué par cet allocateur) est passé tel quel à realloc/free.
+  """
+  def __init__(self, limit=None):
+    """\
+    :param int limit: Nombre maximum d'octets alloués simultanément (None : pas de limite).
+    """
+    self.limit = limit
+    self.live = 0  # Octets alloués
+    self.peak = 0  # Maximum atteint par live
+    self.allocations = 0
+    self.failures = 0  # Allocations refusées (plafond) ou en échec
+    self._sizes = {}  # {adresse: taille du bloc}
+    self._lock = threading.Lock()
+    # Les fonctions de rappel doivent rester en vie tant que la bibliothèque est initialisée.
+    self.callbacks = (GFL_ALLOC_CALLBACK(self._alloc),
+                      GFL_REALLOC_CALLBACK(self._realloc),
+                      GFL_FREE_CALLBACK(self._free))
+
+  # Gestion des blocs, redéfinie par les sous-classes :
+  def _block_size(self, size):
+    return size
+
+  def _malloc(self, size):
+    return _get_libc().malloc(size)
+
+  def _resize(self, ptr, _old_size, size):
+    return _get_libc().realloc(ptr, size)
+
+  def _release(self, ptr, _size):
+    _get_libc().free(ptr)
+
+  def _allowed(self, delta):
+    if self.limit is not None and self.live + delta > self.limit:
+      self.failures += 1
+      return False
+    return True
+
+  def _account(self, delta):
+    self.live += delta
+    self.peak = max(self.peak, self.live)
+
+  def _alloc(self, size, _user_params):
+    size = self._block_size(max(1, size))
+    with self._lock:
+      if not self._allowed(size):
+        return None
+      ptr = self._malloc(size)
+      if not ptr:
+        self.failures += 1
+        return None
+      self._sizes[ptr] = size
+      self.allocations += 1
+      self._account(size)
+      return ptr
+
+  def _realloc(self, ptr, size, user_params):
+    if not ptr:
+      return self._alloc(size, user_params)
+    size = self._block_size(max(1, size))
+    with self._lock:
+      old_size = self._sizes.get(ptr)
+      if old_size is None:
+        return _get_libc().realloc(ptr, size)
+      if not self._allowed(size - old_size):
+        return None
+      new_ptr = self._resize(ptr, old_size, size)
+      if not new_ptr:
+        self.failures += 1
+        return None
+      del self._sizes[ptr]
+      self._sizes[new_ptr] = size
+      self._account(size - old_size)
+      return new_ptr
+
+  def _free(self, ptr, _user_params):
+    if not ptr:
+      return
+    with self._lock:
+      size = self._sizes.pop(ptr, None)
+      if size is None:
+        _get_libc().free(ptr)
+        return
+      self.live -= size
+      self._release(ptr, size)
+
+  def _after_fork(self):
+    "Processus fils (voir get_library)."
+    self._lock = threading.Lock()
+
+  def stats(self):
+    "Statistiques d'utilisation de la mémoire."
+    with self._lock:
+      return {'live_bytes': self.live, 'peak_bytes': self.peak,
+              'allocations': self.allocations, 'failures': self.failures,
+              'limit': self.limit}
+
+
+class PoolingAllocator(CountingAllocator):
+  """\
+  CountingAllocator réutilisant les gros blocs (pixels des images) d'un chargement à l'autre.
+
+  Les demandes d'au moins `min_size` octets sont arrondies à la puissance de 2 supérieure ;
+  les blocs libérés sont conservés par taille, dans la limite de `max_pooled` octets.
+  Les blocs conservés comptent dans le plafond `limit` : une allocation qui le dépasserait
+  rend d'abord des blocs conservés à la bibliothèque C.
+  """
+  def __init__(self, limit=None, min_size=64 * 1024, max_pooled=256 * 1024 * 1024):
+    CountingAllocator.__init__(self, limit)
+    self.min_size = min_size
+    self.max_pooled = max_pooled
+    self.pooled = 0  # Octets conservés pour réutilisation
+    self.hits = 0
+    self.misses = 0
+    self._pool = {}  # {taille: [adresses]}
+
+  def _block_size(self, size):
+    if size < self.min_size:
+      return size
+    return 1 << (size - 1).bit_length()
+
+  def _malloc(self, size):
+    blocks = self._pool.get(size)
+    if blocks:
+      self.hits += 1
+      self.pooled -= size
+      return blocks.pop()
+    if size >= self.min_size:
+      self.misses += 1
+    return CountingAllocator._malloc(self, size)
+
+  def _resize(self, ptr, old_size, size):
+    if size == old_size:
+      return ptr
+    if old_size < self.min_size and size < self.min_size:
+      return CountingAllocator._resize(self, ptr, old_size, size)
+    new_ptr = self._malloc(size)
+    if new_ptr:
+      ctypes.memmove(new_ptr, ptr, min(old_size, size))
+      self._release(ptr, old_size)
+    return new_ptr
+
+  def _release(self, ptr, size):
+    if size >= self.min_size and self.pooled + size <= self.max_pooled:
+      self._pool.setdefault(size, []).append(ptr)
+      self.pooled += size
     else:
-      self.libgfl = ctypes.cdll.LoadLibrary('libgfl.3.40.dylib')
+      CountingAllocator._release(self, ptr, size)
+
+  def _allowed(self, delta):
+    if self.limit is not None:
+      self._drop(self.live + self.pooled + delta - self.limit)
+    return CountingAllocator._allowed(self, delta)
+
+  def _drop(self, excess):
+    "Rend à la bibliothèque C des blocs conservés (les plus gros d'abord), pour `excess` octets."
+    for size in sorted(self._pool, reverse=True):
+      if excess <= 0:
+        break
+      blocks = self._pool[size]
+      while blocks and excess > 0:
+        CountingAllocator._release(self, blocks.pop(), size)
+        self.pooled -= size
+        excess -= size
+      if not blocks:
+        del self._pool[size]
+
+  def trim(self):
+    "Rend à la bibliothèque C les blocs conservés."
+    with self._lock:
+      self._drop(self.pooled)
+
+  def stats(self):
+    data = CountingAllocator.stats(self)
+    with self._lock:
+      data.update(pooled_bytes=self.pooled, pool_hits=self.hits, pool_misses=self.misses)
+    return data
+
+
+# ==========================
+# Informations sur les fichiers
+# ==========================
+FILE_INFO = namedtuple('FILE_INFO', ['FormatIndex', 'FormatName', 'Width', 'Height', 'NumberOfImages',
+                                     'Compression', 'Xdpi', 'Ydpi', 'BitsPerComponent',
+                                     'ComponentsPerPixel', 'ColorModel', 'FileSize'])
+
+
+def _fs_text(filename):
+  "Chemin absolu en texte (clé du cache)."
+  if isinstance(filename, bytes) and str is not bytes:
+    filename = filename.decode(sys.getfilesystemencoding(), 'surrogateescape')
+  return os.path.abspath(filename)
+
 
-    for arg in GFL.lfn:
-      self.append_libgfl(*arg)
+def _fs_native(filename):
+  "Chemin dans le type attendu par les fonctions de la bibliothèque (c_char_p)."
+  if not isinstance(filename, bytes):
+    filename = filename.encode(sys.getfilesystemencoding(), 'surrogateescape')
+  return filename
 
-    for alias, f in GFL.lalias:
-      setattr(self.libgfl, alias, getattr(self.libgfl, f))
 
-  def append_libgfl(self, fn, argtypes, restype, errcheck=None):
+def _stat_key(filename):
+  "(taille, date de modification en ns) d'un fichier."
+  st = os.stat(filename)
+  return st.st_size, getattr(st, 'st_mtime_ns', int(st.st_mtime * 1e9))
+
+
+def _replace_file(src, dst):
+  "Remplace `dst` par `src` (os.replace ; Python 2 sous Windows : suppression puis os.rename)."
+  replace = getattr(os, 'replace', None)
+  if replace is not None:
+    replace(src, dst)
+    return
+  if sys.platform == 'win32' and os.path.exists(dst):
+    os.remove(dst)
+  os.rename(src, dst)
+
+
+class FileInfoCache(object):
+  """\
+  Cache persistant (SQLite) des informations d'en-tête des fichiers (gflGetFileInformation).
+
+  Une entrée est valable tant que la taille et la date de modification du fichier sont inchangées.
+  Les dernières entrées utilisées sont aussi conservées en mémoire (LRU limité en nombre d'entrées).
+  """
+  def __init__(self, gfl, path=':memory:', max_entries=10000):
+    """\
+    :param _GFL gfl: Instance utilisée pour lire les en-têtes.
+    :param basestring path: Base SQLite (créée si besoin).
+    :param int max_entries: Nombre maximum d'entrées conservées en mémoire.
+    """
+    self.gfl = gfl
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._memo = OrderedDict()  # {chemin: ((taille, date), FILE_INFO)}
+    self._db = sqlite3.connect(path, check_same_thread=False)
+    self._db.execute('CREATE TABLE IF NOT EXISTS file_info ('
+                     'path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, {})'
+                     .format(', '.join(FILE_INFO._fields)))
+    self._db.commit()
+
+  def _remember(self, key, stat, info):
+    with self._lock:
+      self._memo.pop(key, None)
+      self._memo[key] = (stat, info)
+      while len(self._memo) > self.max_entries:
+        self._memo.popitem(last=False)
+
+  def _lookup(self, key, stat):
+    with self._lock:
+      entry = self._memo.get(key)
+      if entry is not None and entry[0] == stat:
+        self._memo[key] = self._memo.pop(key)  # Plus récemment utilisée
+        return entry[1]
+      row = self._db.execute('SELECT * FROM file_info WHERE path = ?', (key,)).fetchone()
+    if row is None or tuple(row[1:3]) != stat:
+      return None
+    info = FILE_INFO(*row[3:])
+    self._remember(key, stat, info)
+    return info
+
+  def _store(self, entries):
+    "Enregistre une liste de (chemin, (taille, date), FILE_INFO)."
+    with self._lock:
+      self._db.executemany('INSERT OR REPLACE INTO file_info VALUES ({})'
+                           .format(', '.join('?' * (3 + len(FILE_INFO._fields)))),
+                           [(key,) + stat + tuple(info) for key, stat, info in entries])
+      self._db.commit()
+    for key, stat, info in entries:
+      self._remember(key, stat, info)
+
+  def get(self, filename):
+    """\
+    Informations d'en-tête d'un fichier, lues si besoin.
+
+    :rtype: FILE_INFO
+    """
+    key = _fs_text(filename)
+    stat = _stat_key(filename)
+    info = self._lookup(key, stat)
+    if info is None:
+      info = self.gfl._read_file_info(filename)
+      self._store([(key, stat, info)])
+    return info
+
+  def scan(self, directory, threads=8, extensions=None):
+    """\
+    Remplit le cache pour les fichiers d'une arborescence.
+
+    Les en-têtes sont lus en parallèle : les appels à la bibliothèque libèrent le GIL.
+
+    :param basestring directory: Répertoire à parcourir.
+    :param int threads: Nombre de lectures simultanées.
+    :param extensions: Extensions (en minuscule, sans le point) des fichiers à lire (par défaut : tous),
+                       par exemple gfl.formats.readable_extensions.
+    :type  extensions: set(basestring)
+    :rtype: tuple(int, int, int)
+    :return: (nombre de fichiers à jour, lus, en erreur)
+    """
+    todo = []
+    fresh = 0
+    for root, _dirs, files in os.walk(directory):
+      for name in files:
+        if extensions is not None and os.path.splitext(name)[1][1:].lower() not in extensions:
+          continue
+        filename = os.path.join(root, name)
+        key = _fs_text(filename)
+        try:
+          stat = _stat_key(filename)
+        except OSError:
+          continue
+        if self._lookup(key, stat) is None:
+          todo.append((filename, key, stat))
+        else:
+          fresh += 1
+
+    def read(item):
+      filename, key, stat = item
+      try:
+        return key, stat, self.gfl._read_file_info(_fs_native(filename))
+      except GFL_Exception:
+        return None
+
+    pool = ThreadPool(threads)
     try:
-      f = getattr(self.libgfl, fn)
-      f.argtypes = argtypes
-      f.restype = restype
-      if errcheck:
-        f.errcheck = getattr(self, errcheck)
-      setattr(self, fn, f)
-    except Exception:
-      raise
+      results = pool.map(read, todo)
+    finally:
+      pool.close()
+      pool.join()
+    entries = [result for result in results if result is not None]
+    self._store(entries)
+    return fresh, len(entries), len(todo) - len(entries)
 
   def close(self):
-    "Frees resources"
-    self.libgfl.gflLibraryExit()
+    self._db.close()
 
   def __enter__(self):
     return self
@@ -863,24 +2275,744 @@ class GFL(object):
     self.close()
 
 
+# ==========================
+# Vignettes
+# ==========================
+class ThumbnailCache(object):
+  """\
+  Production de vignettes encodées par (fichier, page, rectangle), avec un cache en mémoire
+  (LRU limité en octets) et un cache optionnel sur disque, éventuellement limité en octets :
+  au-delà de `max_disk_bytes`, les vignettes les moins récemment utilisées sont supprimées
+  jusqu'à revenir à 90 % de la limite (voir trim_disk).
+
+  La vignette EXIF du fichier est utilisée si elle est assez grande pour le rectangle demandé ;
+  sinon l'image est décodée (GFL_LOAD_HIGH_QUALITY_THUMBNAIL).
+  """
+  def __init__(self, gfl, max_bytes=64 * 1024 * 1024, directory=None, _type="jpeg", quality=85,
+               embedded_ratio=1.0, max_disk_bytes=None):
+    """\
+    :param _GFL gfl: Instance utilisée pour charger et encoder les vignettes.
+    :param int max_bytes: Taille maximum du cache en mémoire.
+    :param basestring directory: Répertoire du cache sur disque (None : pas de cache sur disque).
+    :param basestring _type: Format des vignettes encodées.
+    :param int quality: Qualité d'encodage.
+    :param float embedded_ratio: Proportion minimum du rectangle que la vignette EXIF doit couvrir
+                                 (en largeur ou en hauteur) pour être utilisée.
+    :param int max_disk_bytes: Taille maximum du cache sur disque (None : pas de limite).
+    """
+    self.gfl = gfl
+    self.max_bytes = max_bytes
+    self.max_disk_bytes = max_disk_bytes
+    self.directory = directory
+    self.type = _type
+    self.quality = quality
+    self.embedded_ratio = embedded_ratio
+    self.size = 0  # Octets en mémoire
+    self.disk_size = 0  # Octets sur disque (estimation, recalculée par trim_disk)
+    self.hits = self.disk_hits = self.misses = 0
+    self._lru = OrderedDict()  # {clé: bytes}
+    self._lock = threading.Lock()
+    if directory is not None:
+      if not os.path.isdir(directory):
+        os.makedirs(directory)
+      if max_disk_bytes is not None:
+        self.trim_disk()
+
+  def _key(self, filename, page, width, height):
+    size, mtime = _stat_key(filename)
+    return '\0'.join(str(part) for part in (_fs_text(filename), size, mtime, page, width, height,
+                                              self.type, self.quality))
+
+  def _disk_path(self, key):
+    return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+  def _remember(self, key, data):
+    with self._lock:
+      if key in self._lru:
+        self.size -= len(self._lru.pop(key))
+      if len(data) > self.max_bytes:
+        return
+      self._lru[key] = data
+      self.size += len(data)
+      while self.size > self.max_bytes:
+        self.size -= len(self._lru.popitem(last=False)[1])
+
+  def render(self, filename, width, height, page=0):
+    """\
+    Produit la vignette sans passer par les caches.
+
+    :rtype: Bitmap
+    """
+    try:
+      bitmap = self.gfl.load_thumbnail(filename, width, height, page, GFL_LOAD_EMBEDDED_THUMBNAIL)
+    except GFL_Exception:
+      bitmap = None
+    if bitmap is not None:
+      if (bitmap.Width >= width * self.embedded_ratio or
+          bitmap.Height >= height * self.embedded_ratio):
+        return bitmap
+      bitmap.close()
+    return self.gfl.load_thumbnail(filename, width, height, page, GFL_LOAD_HIGH_QUALITY_THUMBNAIL)
+
+  def get(self, filename, width, height, page=0):
+    """\
+    Vignette encodée d'une page, tenant dans un rectangle de `width` x `height` pixels.
+
+    :rtype: bytes
+    """
+    key = self._key(filename, page, width, height)
+    with self._lock:
+      data = self._lru.get(key)
+      if data is not None:
+        self._lru[key] = self._lru.pop(key)  # Plus récemment utilisée
+        self.hits += 1
+        return data
+
+    if self.directory is not None:
+      path = self._disk_path(key)
+      try:
+        with open(path, 'rb') as fp:
+          data = fp.read()
+      except (IOError, OSError):
+        pass
+      else:
+        if self.max_disk_bytes is not None:
+          try:
+            os.utime(path, None)  # Date d'utilisation, pour trim_disk
+          except OSError:
+            pass
+        with self._lock:
+          self.disk_hits += 1
+        self._remember(key, data)
+        return data
+
+    with self._lock:
+      self.misses += 1
+    with self.render(filename, width, height, page) as bitmap:
+      data = self.gfl.save_bytes(bitmap, self.type, quality=self.quality)
+    if self.directory is not None:
+      self._write_disk(key, data)
+    self._remember(key, data)
+    return data
+
+  def _write_disk(self, key, data):
+    path = self._disk_path(key)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as fp:
+      fp.write(data)
+    try:
+      _replace_file(tmp, path)
+    except OSError:
+      # Windows : la vignette est ouverte par un autre processus.
+      os.remove(tmp)
+      return
+    if self.max_disk_bytes is not None:
+      with self._lock:
+        self.disk_size += len(data)
+        over = self.disk_size > self.max_disk_bytes
+      if over:
+        self.trim_disk(self.max_disk_bytes * 9 // 10)
+
+  def trim_disk(self, max_bytes=None):
+    """\
+    Supprime du cache sur disque les vignettes les moins récemment utilisées (date de modification),
+    jusqu'à ce qu'il occupe au plus `max_bytes` octets.
+
+    :param int max_bytes: Taille à atteindre (par défaut : max_disk_bytes, None : aucune suppression).
+    :rtype: int
+    :return: Nombre de vignettes supprimées.
+    """
+    if max_bytes is None:
+      max_bytes = self.max_disk_bytes
+    entries = []
+    for name in os.listdir(self.directory):
+      if name.endswith('.tmp'):
+        continue
+      path = os.path.join(self.directory, name)
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _mtime, size, _path in entries)
+    removed = 0
+    if max_bytes is not None:
+      for _mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+          break
+        try:
+          os.remove(path)
+        except OSError:
+          continue
+        total -= size
+        removed += 1
+    with self._lock:
+      self.disk_size = total
+    return removed
+
+  def clear(self):
+    "Vide le cache en mémoire."
+    with self._lock:
+      self._lru.clear()
+      self.size = 0
+
+
+# ==========================
+# Chaînes de transformations
+# ==========================
+class Pipeline(object):
+  """\
+  Chaîne de transformations évaluée à la demande : chargement -> transformations -> enregistrement.
+
+  Les opérations sont enregistrées puis optimisées au moment de l'exécution, une fois les dimensions
+  de l'image connues :
+   - les opérations sans effet sont supprimées (rotation de 0°, redimensionnement ou recadrage
+     aux dimensions courantes, double retournement) ;
+   - les redimensionnements consécutifs sont fusionnés, ainsi que les rotations multiples de 90° ;
+   - les recadrages sont effectués avant les redimensionnements et les changements du nombre de
+     couleurs sans tramage qui les précèdent (sauf vers une palette calculée, GFL_MODE_TO_xxxCOLORS),
+     pour travailler sur moins de pixels.
+  Chaque image intermédiaire est libérée dès que la suivante existe.
+
+  Exemple : gfl.pipeline('scan.tif').resize(1000, 1400).crop(0, 0, 1000, 200).save('entete.png', 'png')
+  """
+  def __init__(self, gfl, source, page=0):
+    """\
+    :param _GFL gfl: Instance utilisée pour charger et enregistrer.
+    :param source: Fichier à charger ou image (non libérée par la chaîne).
+    :type  source: basestring ou Bitmap
+    :param int page: Page à charger.
+    """
+    self.gfl = gfl
+    self.source = source
+    self.page = page
+    self.ops = []
+
+  def crop(self, x, y, w, h):
+    self.ops.append(('crop', (x, y, w, h)))
+    return self
+
+  def resize(self, width, height, method=GFL_RESIZE_BILINEAR):
+    self.ops.append(('resize', (width, height, method)))
+    return self
+
+  def rotate(self, angle, color=None):
+    """\
+    :param int angle: Angle en degrés.
+    :param GFL_COLOR color: Couleur de fond (angles non multiples de 90°).
+    """
+    self.ops.append(('rotate', (angle % 360, color)))
+    return self
+
+  def change_color_depth(self, mode, params=GFL_MODE_NO_DITHER):
+    self.ops.append(('depth', (mode, params)))
+    return self
+
+  def flip_vertical(self):
+    self.ops.append(('flip_vertical', ()))
+    return self
+
+  def flip_horizontal(self):
+    self.ops.append(('flip_horizontal', ()))
+    return self
+
+  @staticmethod
+  def _size_after(op, size):
+    "Dimensions de l'image après une opération (None si inconnues)."
+    name, args = op
+    if name == 'crop':
+      return args[2], args[3]
+    if name == 'resize':
+      return args[0], args[1]
+    if size is None:
+      return None
+    if name == 'rotate':
+      if args[0] % 180 == 90:
+        return size[1], size[0]
+      if args[0] % 90:
+        return None
+    return size
+
+  def plan(self, width, height):
+    """\
+    Opérations effectivement exécutées pour une image source de `width` x `height` pixels.
+
+    :rtype: list((str, tuple))
+    """
+    stack = []  # [(opération, dimensions avant l'opération)]
+
+    def size():
+      return self._size_after(*stack[-1]) if stack else (width, height)
+
+    def push(op):
+      name, args = op
+      current = size()
+      top = stack[-1][0] if stack else (None, None)
+
+      if name == 'crop':
+        if current is not None and args == (0, 0) + tuple(current):
+          return
+        if top[0] == 'resize' and stack[-1][1] is not None:
+          # Recadrage de l'image d'origine, puis redimensionnement du rectangle seul.
+          src_w, src_h = stack.pop()[1]
+          x, y, w, h = args
+          rw, rh = float(src_w) / top[1][0], float(src_h) / top[1][1]
+          sx, sy = int(round(x * rw)), int(round(y * rh))
+          sw = max(1, min(src_w - sx, int(round(w * rw))))
+          sh = max(1, min(src_h - sy, int(round(h * rh))))
+          push(('crop', (sx, sy, sw, sh)))
+          push(('resize', (w, h, top[1][2])))
+          return
+        if (top[0] == 'depth' and top[1][1] == GFL_MODE_NO_DITHER
+            and not GFL_MODE_TO_8COLORS <= top[1][0] <= GFL_MODE_TO_256COLORS):
+          # Sans tramage, le changement du nombre de couleurs est indépendant d'un pixel à l'autre,
+          # sauf vers une palette calculée d'après le contenu de l'image (GFL_MODE_TO_xxxCOLORS).
+          depth = stack.pop()[0]
+          push(op)
+          push(depth)
+          return
+      elif name == 'resize':
+        if top[0] == 'resize':
+          stack.pop()
+          push(op)
+          return
+        if current is not None and tuple(args[:2]) == tuple(current):
+          return
+      elif name == 'rotate':
+        if args[0] == 0:
+          return
+        if top[0] == 'rotate' and not (args[0] % 90 or top[1][0] % 90):
+          stack.pop()
+          push(('rotate', ((top[1][0] + args[0]) % 360, top[1][1])))
+          return
+      elif name in ('flip_vertical', 'flip_horizontal'):
+        if top[0] == name:
+          stack.pop()
+          return
+      stack.append((op, current))
+
+    for op in self.ops:
+      push(op)
+    return [op for op, _size in stack]
+
+  def _apply(self, bitmap, op):
+    "Exécute une opération ; retourne la nouvelle image (ou `bitmap` pour une opération en place)."
+    name, args = op
+    p_bitmap = POINTER(GFL_BITMAP)()
+    if name == 'crop':
+      libgfl.gflCrop(bitmap, byref(p_bitmap), byref(GFL_RECT(*args)))
+    elif name == 'resize':
+      libgfl.gflResize(bitmap, byref(p_bitmap), args[0], args[1], args[2], 0)
+    elif name == 'rotate':
+      angle, color = args
+      libgfl.gflRotate(bitmap, byref(p_bitmap), angle, byref(color) if color is not None else None)
+    elif name == 'depth':
+      libgfl.gflChangeColorDepth(bitmap, byref(p_bitmap), args[0], args[1])
+    elif name in ('flip_vertical', 'flip_horizontal'):
+      flip = libgfl.gflFlipVertical if name == 'flip_vertical' else libgfl.gflFlipHorizontal
+      if bitmap is not self.source:
+        # Image intermédiaire : retournement en place, sans allocation.
+        flip(bitmap, None)
+        return bitmap
+      flip(bitmap, byref(p_bitmap))
+    return Bitmap(p_bitmap)
+
+  def execute(self):
+    """\
+    Charge l'image et exécute les opérations.
+
+    :rtype: Bitmap
+    :return: Image résultante (à libérer par l'appelant ; peut être la source si aucune opération).
+    """
+    if isinstance(self.source, Bitmap):
+      bitmap = self.source
+    else:
+      bitmap = self.gfl.load_bitmap(self.source, self.page)
+    try:
+      for op in self.plan(bitmap.Width, bitmap.Height):
+        result = self._apply(bitmap, op)
+        if bitmap is not result and bitmap is not self.source:
+          bitmap.close()
+        bitmap = result
+    except Exception:
+      if bitmap is not self.source:
+        bitmap.close()
+      raise
+    return bitmap
+
+  def _close_result(self, bitmap):
+    if bitmap is not self.source:
+      bitmap.close()
+
+  def save(self, filename, _type="tiff", compression=GFL_LZW):
+    "Exécute la chaîne et enregistre le résultat."
+    save_params = self.gfl.new_save_params(_type, compression)
+    bitmap = self.execute()
+    try:
+      libgfl.gflSaveBitmap(filename, bitmap, byref(save_params))
+    finally:
+      self._close_result(bitmap)
+
+  def to_bytes(self, _type="png", compression=None, quality=None):
+    "Exécute la chaîne et retourne le résultat encodé (voir _GFL.save_bytes)."
+    bitmap = self.execute()
+    try:
+      return self.gfl.save_bytes(bitmap, _type, compression, quality)
+    finally:
+      self._close_result(bitmap)
+
+
+FORMAT = namedtuple('FORMAT', ['Index', 'Name', 'Description', 'Readable', 'Writable',
+                               'Extensions', 'Compressions', 'BitmapTypes', 'Status'])
+
+
+def _lib_text(value):
+  "Chaîne retournée par la bibliothèque (nom de format, extension...) en texte."
+  return value.decode('latin-1') if isinstance(value, bytes) else value
+
+
+class FormatRegistry(object):
+  """\
+  Index des formats de la bibliothèque : lecture, écriture, compressions et types d'image gérés,
+  format associé à une extension. Toutes les recherches sont de simples accès à un dictionnaire.
+
+  L'index est construit une fois par version de la bibliothèque (FormatRegistry.get) et peut être
+  enregistré sur disque (JSON) pour que les nouveaux processus n'interrogent pas la bibliothèque.
+  """
+  # Types d'image testés à l'écriture (gflBitmapTypeIsSupportedByIndex) : (type, bits par composante)
+  BITMAP_TYPES = ((GFL_BINARY, 1), (GFL_GREY, 8), (GFL_GREY, 16), (GFL_COLORS, 8),
+                  (GFL_RGB, 8), (GFL_RGB, 16), (GFL_BGR, 8), (GFL_RGBA, 8), (GFL_RGBA, 16),
+                  (GFL_ABGR, 8), (GFL_BGRA, 8), (GFL_ARGB, 8), (GFL_CMYK, 8), (GFL_CMYK, 16))
+  COMPRESSIONS = tuple(range(GFL_NO_COMPRESSION.value, GFL_LZW_PREDICTOR.value + 1))
+
+  _registries = {}  # {version: FormatRegistry}
+  _version = None  # (bibliothèque, version) : gflGetVersion n'est appelée qu'une fois par processus
+  _lock = threading.Lock()
+
+  def __init__(self, version, formats):
+    """\
+    :param basestring version: Version de la bibliothèque.
+    :param formats: Formats, par index croissant.
+    :type  formats: list(FORMAT)
+    """
+    self.version = version
+    self.formats = OrderedDict((fmt.Name, fmt) for fmt in formats)
+    self._by_index = dict((fmt.Index, fmt) for fmt in formats)
+    self._by_ext = {}  # {extension: premier format lisible (sinon premier format) associé}
+    for fmt in sorted(formats, key=lambda fmt: not fmt.Readable):
+      for ext in fmt.Extensions:
+        self._by_ext.setdefault(ext, fmt)
+    self.readable_extensions = frozenset(ext for ext, fmt in self._by_ext.items() if fmt.Readable)
+    self.writable_extensions = frozenset(ext for fmt in formats if fmt.Writable for ext in fmt.Extensions)
+
+  @classmethod
+  def library_version(cls):
+    cached = cls._version
+    if cached is None or cached[0] is not libgfl:
+      cached = cls._version = (libgfl, _lib_text(libgfl.gflGetVersion()))
+    return cached[1]
+
+  @classmethod
+  def query(cls):
+    "Construit l'index en interrogeant la bibliothèque."
+    formats = []
+    fmt_info = GFL_FORMAT_INFORMATION()
+    for index in range(libgfl.gflGetNumberOfFormat()):
+      libgfl.gflGetFormatInformationByIndex(index, byref(fmt_info))
+      writable = bool(fmt_info.Status & GFL_WRITE.value)
+      compressions = bitmap_types = ()
+      if writable:
+        compressions = [compression for compression in cls.COMPRESSIONS
+                        if libgfl.gflCompressionIsSupportedByIndex(index, compression)]
+        bitmap_types = [(_type, bits) for _type, bits in cls.BITMAP_TYPES
+                        if libgfl.gflBitmapTypeIsSupportedByIndex(index, _type, bits)]
+      extensions = tuple(_lib_text(fmt_info.Extension[j].value).lower()
+                         for j in range(fmt_info.NumberOfExtension))
+      formats.append(FORMAT(index, _lib_text(fmt_info.Name), _lib_text(fmt_info.Description),
+                            bool(fmt_info.Status & GFL_READ.value), writable, extensions,
+                            frozenset(compressions), frozenset(bitmap_types), fmt_info.Status))
+    return cls(cls.library_version(), formats)
+
+  @classmethod
+  def get(cls, path=None):
+    """\
+    Index de la version chargée de la bibliothèque, construit une seule fois par processus.
+
+    :param basestring path: Fichier JSON de l'index : lu si la version correspond, écrit sinon.
+    :rtype: FormatRegistry
+    """
+    version = cls.library_version()
+    registry = cls._registries.get(version)
+    if registry is not None:
+      return registry
+    with cls._lock:
+      registry = cls._registries.get(version)
+      if registry is None:
+        if path is not None:
+          registry = cls.load(path)
+          if registry is not None and registry.version != version:
+            registry = None
+        if registry is None:
+          registry = cls.query()
+          if path is not None:
+            registry.save(path)
+        cls._registries[version] = registry
+    return registry
+
+  def to_dict(self):
+    "Représentation sérialisable en JSON."
+    return {'version': self.version,
+            'formats': [dict(fmt._asdict(), Compressions=sorted(fmt.Compressions),
+                             BitmapTypes=sorted(fmt.BitmapTypes)) for fmt in self.formats.values()]}
+
+  @classmethod
+  def from_dict(cls, data):
+    formats = [FORMAT(**dict(fmt, Extensions=tuple(fmt['Extensions']),
+                             Compressions=frozenset(fmt['Compressions']),
+                             BitmapTypes=frozenset(tuple(item) for item in fmt['BitmapTypes'])))
+               for fmt in data['formats']]
+    return cls(data['version'], formats)
+
+  def save(self, path):
+    "Enregistre l'index (JSON)."
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w') as fp:
+      json.dump(self.to_dict(), fp)
+    try:
+      _replace_file(tmp, path)
+    except OSError:
+      # Windows : le fichier est ouvert par un autre processus, il sera réécrit plus tard.
+      os.remove(tmp)
+
+  @classmethod
+  def load(cls, path):
+    """\
+    Lit un index enregistré par save().
+
+    :rtype: FormatRegistry
+    :return: None si le fichier n'existe pas ou est illisible.
+    """
+    try:
+      with open(path) as fp:
+        return cls.from_dict(json.load(fp))
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+      return None
+
+  def format(self, key):
+    """\
+    Format désigné par son nom ou son index.
+
+    :rtype: FORMAT
+    :return: None si le format est inconnu.
+    """
+    if isinstance(key, int):
+      return self._by_index.get(key)
+    return self.formats.get(_lib_text(key).lower())
+
+  def format_of_ext(self, ext):
+    """\
+    Format associé à une extension (lisible de préférence).
+
+    :param basestring ext: Extension, avec ou sans le point.
+    :rtype: FORMAT
+    :return: None si aucun format n'utilise cette extension.
+    """
+    return self._by_ext.get(_lib_text(ext).lower().lstrip('.'))
+
+  def index_of_ext(self, ext):
+    "Index du format associé à une extension (-1 si aucun)."
+    fmt = self.format_of_ext(ext)
+    return -1 if fmt is None else fmt.Index
+
+  def is_readable(self, key):
+    fmt = self.format(key)
+    return fmt is not None and fmt.Readable
+
+  def is_writable(self, key):
+    fmt = self.format(key)
+    return fmt is not None and fmt.Writable
+
+  def is_ext_readable(self, ext):
+    return _lib_text(ext).lower().lstrip('.') in self.readable_extensions
+
+  def supports_compression(self, key, compression):
+    fmt = self.format(key)
+    return fmt is not None and getattr(compression, 'value', compression) in fmt.Compressions
+
+  def supports_bitmap_type(self, key, _type, bits=8):
+    "Le format peut-il enregistrer une image de ce type (GFL_RGB...) et de ce nombre de bits par composante ?"
+    fmt = self.format(key)
+    return fmt is not None and (_type, bits) in fmt.BitmapTypes
+
+
+class CancelToken(object):
+  """\
+  Jeton d'annulation d'un ou plusieurs chargements (GFL_WANTCANCEL_CALLBACK).
+
+  Le décodage s'arrête dès que cancel() est appelé (depuis n'importe quel thread) ou que le délai
+  est dépassé ; le chargement lève alors GFL_Cancelled. L'arrêt dépend du format : la bibliothèque
+  consulte WantCancel entre deux étapes du décodage.
+  """
+  def __init__(self, timeout=None, on_progress=None):
+    """\
+    :param float timeout: Délai en secondes à partir de la création du jeton (None : aucun).
+    :param on_progress: Fonction appelée avec le pourcentage de décodage (GFL_PROGRESS_CALLBACK).
+    """
+    self.started = _clock()
+    self.deadline = None if timeout is None else self.started + timeout
+    self.on_progress = on_progress
+    self.progress = 0  # Dernier pourcentage signalé par la bibliothèque
+    self._event = threading.Event()
+
+  def cancel(self):
+    "Demande l'arrêt des chargements en cours et à venir."
+    self._event.set()
+
+  @property
+  def elapsed(self):
+    return _clock() - self.started
+
+  @property
+  def expired(self):
+    return self.deadline is not None and _clock() >= self.deadline
+
+  @property
+  def cancelled(self):
+    return self._event.is_set() or self.expired
+
+  def check(self):
+    "Lève GFL_Cancelled si le jeton est annulé ou le délai dépassé."
+    if self._event.is_set():
+      raise GFL_Cancelled(GFL_UNKNOWN_ERROR.value, "Chargement annulé.")
+    if self.expired:
+      raise GFL_Cancelled(GFL_UNKNOWN_ERROR.value,
+                          "Délai de {:.3f} s dépassé.".format(self.deadline - self.started))
+
+
+# ==========================
+# Bibliothèque du processus
+# ==========================
+libgfl = None  # Bibliothèque utilisée par le module (voir get_library)
+_library_lock = threading.Lock()
+_library_pid = os.getpid()
+
+
+def get_library(backend=None, libname=None, stats=None):
+  """\
+  Bibliothèque du processus (`libgfl`), ouverte au premier appel par open_backend.
+
+  Sûre entre threads : la bibliothèque n'est ouverte qu'une fois, les arguments des appels suivants
+  sont ignorés. Une bibliothèque affectée directement à `pygfl.libgfl` est conservée.
+  Un processus créé par fork garde la bibliothèque du parent, déjà chargée et initialisée.
+
+  :rtype: GFL
+  """
+  global libgfl
+  if _library_pid != os.getpid():
+    _after_fork()  # Python sans os.register_at_fork
+  if libgfl is None:
+    with _library_lock:
+      if libgfl is None:
+        libgfl = open_backend(backend, libname, stats)
+  return libgfl
+
+
+def _after_fork():
+  """\
+  Processus fils : les verrous ont pu être copiés pendant qu'un autre thread du parent les tenait,
+  ils sont remplacés. L'allocateur et la bibliothèque en font autant s'ils ont une méthode `_after_fork`.
+  """
+  global _library_lock, _library_pid
+  _library_pid = os.getpid()
+  _library_lock = threading.Lock()
+  _GFL._init_lock = threading.Lock()
+  FormatRegistry._lock = threading.Lock()
+  FormatRegistry._version = None
+  for owner in (_GFL.allocator, libgfl):
+    reset = getattr(owner, '_after_fork', None)
+    if reset is not None:
+      reset()
+
+
+if hasattr(os, 'register_at_fork'):
+  os.register_at_fork(after_in_child=_after_fork)
+
+
 class _GFL(object):
   dll_init = False
-  formats_lisibles = {}
+  formats_path = None  # Fichier JSON de l'index des formats (voir FormatRegistry)
+  allocator = None  # Allocateur utilisé par la bibliothèque (gflLibraryInitEx)
+  info_cache = None  # FileInfoCache consulté par file_info()
+  default_load_params = None  # GFL_LOAD_PARAMS par défaut de la bibliothèque, lu une fois par processus
+  default_save_params = None  # GFL_SAVE_PARAMS par défaut de la bibliothèque, lu une fois par processus
+  _init_lock = threading.Lock()
+
+  def __init__(self, allocator=None):
+    """\
+    Initialise la bibliothèque du processus au premier appel (voir get_library) ; les instances
+    suivantes ne font que copier les options par défaut.
 
-  def __init__(self):
-    if not GFL.dll_init:
-      # Load the DLL :
-      libgfl.gflLibraryInit()
-      libgfl.gflEnableLZW(GFL_TRUE)
-      GFL.dll_init = True
+    Les options de l'instance (`load_params`, `save_params`) sont des modèles : chaque appel en
+    utilise une copie (new_load_params, new_save_params) et ne les modifie jamais, une instance
+    peut donc servir à plusieurs threads à la fois.
 
-      # Options de lecture et de sauvegarde :
-      self.load_params = GFL_LOAD_PARAMS()
-      libgfl.gflGetDefaultLoadParams(byref(self.load_params))
+    :param allocator: Allocateur mémoire de la bibliothèque (CountingAllocator, PoolingAllocator...),
+                      pris en compte uniquement lors de la première initialisation.
+    """
+    if not _GFL.dll_init or _library_pid != os.getpid():
+      _GFL._initialize(allocator)
+    self.load_params = GFL_LOAD_PARAMS.from_buffer_copy(_GFL.default_load_params)
+    self.save_params = GFL_SAVE_PARAMS.from_buffer_copy(_GFL.default_save_params)
+    self.progress_hooks = []  # Fonctions (filename, percent, elapsed) appelées pendant les chargements (métriques)
+
+  @classmethod
+  def _initialize(cls, allocator):
+    "Initialise la bibliothèque (une fois par processus) et lit ses options par défaut."
+    library = get_library()
+    with cls._init_lock:
+      if cls.dll_init:
+        return
+      if allocator is None:
+        library.gflLibraryInit()
+      else:
+        library.gflLibraryInitEx(*allocator.callbacks + (None,))
+        cls.allocator = allocator
+      library.gflEnableLZW(GFL_TRUE)
+
+      load_params = GFL_LOAD_PARAMS()
+      library.gflGetDefaultLoadParams(byref(load_params))
+      save_params = GFL_SAVE_PARAMS()
+      library.gflGetDefaultSaveParams(byref(save_params))
+      cls.default_load_params, cls.default_save_params = load_params, save_params
+      cls.dll_init = True
+
+  def new_load_params(self, page=0):
+    """\
+    Options de lecture d'un appel : copie de `load_params`, page `page`.
 
-      self.save_params = GFL_SAVE_PARAMS()
-      libgfl.gflGetDefaultSaveParams(byref(self.save_params))
+    :rtype: GFL_LOAD_PARAMS
+    """
+    load_params = GFL_LOAD_PARAMS.from_buffer_copy(self.load_params)
+    load_params.ImageWanted = page
+    return load_params
 
+  def new_save_params(self, _type=None, compression=None, quality=None):
+    """\
+    Options d'enregistrement d'un appel : copie de `save_params`, modifiée par les arguments donnés.
+
+    :param basestring _type: Nom du type de fichier à générer.
+    :param GFL_COMPRESSION compression: Mode de compression.
+    :param int quality: Qualité (JPEG...), de 0 à 100.
+    :rtype: GFL_SAVE_PARAMS
+    """
+    save_params = GFL_SAVE_PARAMS.from_buffer_copy(self.save_params)
+    if _type is not None:
+      save_params.FormatIndex = libgfl.gflGetFormatIndexByName(_type)
+    if compression is not None:
+      save_params.Compression = compression
+    if quality is not None:
+      save_params.Quality = quality
+    return save_params
 
   def print_file_info(self, filename):
     "Imprime des informations sur le fichier (pour debug)."
@@ -889,8 +3021,477 @@ class _GFL(object):
     print(file_info)
     libgfl.gflFreeFileInformation(byref(file_info))
 
+  def _read_file_info(self, filename):
+    "Lit les informations d'en-tête d'un fichier (gflGetFileInformation)."
+    file_info = GFL_FILE_INFORMATION()
+    libgfl.gflGetFileInformation(filename, -1, byref(file_info))
+    try:
+      return FILE_INFO(*(getattr(file_info, field) for field in FILE_INFO._fields))
+    finally:
+      libgfl.gflFreeFileInformation(byref(file_info))
+
+  @contextmanager
+  def _watch(self, load_params, token, filename):
+    """\
+    Installe les fonctions de rappel Progress et WantCancel de `load_params` le temps d'un chargement.
+
+    Les fonctions de rappel précédentes sont restaurées à la sortie. Une erreur de la bibliothèque
+    survenue alors que le jeton est annulé devient GFL_Cancelled. En fin de chargement réussi,
+    les fonctions de `progress_hooks` sont appelées avec 100 %.
+    """
+    hooks = tuple(self.progress_hooks)
+    if token is None and not hooks:
+      yield
+      return
+    if token is not None:
+      token.check()
+    started = _clock()
+
+    def progress(percent, _params):
+      if token is not None:
+        token.progress = percent
+        if token.on_progress is not None:
+          token.on_progress(percent)
+      for hook in hooks:
+        hook(filename, percent, _clock() - started)
+
+    def want_cancel(_params):
+      return GFL_TRUE if token.cancelled else GFL_FALSE
+
+    callbacks = load_params.Callbacks
+    saved = (callbacks.Progress, callbacks.ProgressParams, callbacks.WantCancel, callbacks.WantCancelParams)
+    callbacks.Progress = GFL_PROGRESS_CALLBACK(progress)
+    callbacks.ProgressParams = None
+    if token is not None:
+      callbacks.WantCancel = GFL_WANTCANCEL_CALLBACK(want_cancel)
+      callbacks.WantCancelParams = None
+    try:
+      yield
+    except GFL_Exception:
+      if token is not None:
+        token.check()
+      raise
+    finally:
+      (callbacks.Progress, callbacks.ProgressParams,
+       callbacks.WantCancel, callbacks.WantCancelParams) = saved
+    for hook in hooks:
+      hook(filename, 100, _clock() - started)
+
+  def file_info(self, filename):
+    """\
+    Informations d'en-tête d'un fichier, lues dans `info_cache` s'il est défini.
+
+    :rtype: FILE_INFO
+    """
+    if self.info_cache is not None:
+      return self.info_cache.get(filename)
+    return self._read_file_info(filename)
+
+  def page_size(self, filename, page=0, token=None):
+    """\
+    Dimensions d'une page.
+
+    FILE_INFO (gflGetFileInformation) décrit la première page : pour les pages suivantes,
+    seul l'en-tête de la page est lu (gflLoadBitmapBegin).
+
+    :param CancelToken token: Jeton d'annulation / délai.
+    :rtype: tuple(int, int)
+    :return: (largeur, hauteur)
+    """
+    if not page:
+      info = self.file_info(filename)
+      return info.Width, info.Height
+    with self.line_reader(filename, page, token) as reader:
+      return reader.width, reader.height
+
+  def load_bitmap(self, filename, page=0, load_params=None, token=None):
+    """\
+    Charge une page d'un fichier.
+
+    :param int page: Numéro de la page (fichiers multi-pages ou animés).
+    :param GFL_LOAD_PARAMS load_params: Options de lecture (ImageWanted est modifié).
+    :param CancelToken token: Jeton d'annulation / délai du chargement.
+    :rtype: Bitmap
+    :raises GFL_Cancelled: si le jeton est annulé ou le délai dépassé.
+    """
+    if load_params is None:
+      load_params = self.new_load_params()
+    p_bitmap = POINTER(GFL_BITMAP)()
+    load_params.ImageWanted = page
+    with self._watch(load_params, token, filename):
+      libgfl.gflLoadBitmap(filename, byref(p_bitmap), byref(load_params), None)
+    return Bitmap(p_bitmap)
+
+  def load_bytes(self, data, page=0, load_params=None, token=None):
+    """\
+    Charge une page d'une image contenue en mémoire (gflLoadBitmapFromMemory).
+
+    :param data: Contenu du fichier : objet supportant le protocole buffer,
+                 utilisé sans copie s'il s'agit de bytes ou d'un tampon modifiable contigu.
+    :param int page: Numéro de la page (fichiers multi-pages ou animés).
+    :param GFL_LOAD_PARAMS load_params: Options de lecture (ImageWanted est modifié).
+    :param CancelToken token: Jeton d'annulation / délai du chargement.
+    :rtype: Bitmap
+    """
+    if load_params is None:
+      load_params = self.new_load_params()
+    keep, address, size = _buffer_address(data)
+    p_bitmap = POINTER(GFL_BITMAP)()
+    load_params.ImageWanted = page
+    with self._watch(load_params, token, None):
+      libgfl.gflLoadBitmapFromMemory(_address(address), size, byref(p_bitmap), byref(load_params), None)
+    del keep
+    return Bitmap(p_bitmap)
+
+  def load_handle(self, source, page=0, load_params=None, token=None):
+    """\
+    Charge une page au travers des fonctions de rappel Read/Tell/Seek (gflLoadBitmapFromHandle).
+
+    :param source: HandleSource, objet supportant le protocole buffer ou objet fichier.
+    :param int page: Numéro de la page (fichiers multi-pages ou animés).
+    :param GFL_LOAD_PARAMS load_params: Options de lecture (ImageWanted et Callbacks sont modifiés).
+    :param CancelToken token: Jeton d'annulation / délai du chargement.
+    :rtype: Bitmap
+    """
+    if load_params is None:
+      load_params = self.new_load_params()
+    own = not isinstance(source, HandleSource)
+    if own:
+      source = HandleSource(source)
+    try:
+      source.install(load_params)
+      load_params.ImageWanted = page
+      p_bitmap = POINTER(GFL_BITMAP)()
+      try:
+        with self._watch(load_params, token, None):
+          libgfl.gflLoadBitmapFromHandle(GFL_HANDLE(id(source)), byref(p_bitmap), byref(load_params), None)
+      except GFL_Cancelled:
+        raise
+      except GFL_Exception:
+        if source.error is not None:
+          raise source.error
+        raise
+      return Bitmap(p_bitmap)
+    finally:
+      if own:
+        source.close()
+
+  def load_mmap(self, filename, page=0):
+    """\
+    Charge une page d'un fichier projeté en mémoire (voir HandleSource.from_path).
+
+    :rtype: Bitmap
+    """
+    with HandleSource.from_path(filename) as source:
+      return self.load_handle(source, page)
+
+  def save_bytes(self, bitmap, _type="png", compression=None, quality=None):
+    """\
+    Encode une image en mémoire (gflSaveBitmapIntoMemory).
+
+    :param bitmap: Image à encoder.
+    :type  bitmap: Bitmap ou POINTER(GFL_BITMAP)
+    :param basestring _type: Nom du type de fichier à générer.
+    :param GFL_COMPRESSION compression: Mode de compression (par défaut : celui du format).
+    :param int quality: Qualité (JPEG...), de 0 à 100.
+    :rtype: bytes
+    :return: Contenu du fichier.
+    """
+    save_params = self.new_save_params(_type, compression, quality)
+    data = POINTER(GFL_UINT8)()
+    size = GFL_UINT32()
+    libgfl.gflSaveBitmapIntoMemory(byref(data), byref(size), bitmap, byref(save_params))
+    try:
+      return ctypes.string_at(data, size.value)
+    finally:
+      # La mémoire est allouée par la bibliothèque.
+      libgfl.gflMemoryFree(data)
+
+  def load_thumbnail(self, filename, width, height, page=0, flags=GFL_LOAD_HIGH_QUALITY_THUMBNAIL, token=None):
+    """\
+    Charge une vignette tenant dans un rectangle de `width` x `height` pixels (gflLoadThumbnail).
+
+    :param int flags: Options GFL_LOAD_xxx ajoutées aux options par défaut des vignettes
+                      (GFL_LOAD_EMBEDDED_THUMBNAIL : vignette EXIF si elle existe...).
+    :param CancelToken token: Jeton d'annulation / délai du chargement.
+    :rtype: Bitmap
+    """
+    load_params = GFL_LOAD_PARAMS()
+    libgfl.gflGetDefaultThumbnailParams(byref(load_params))
+    load_params.Flags |= flags
+    load_params.ImageWanted = page
+    p_bitmap = POINTER(GFL_BITMAP)()
+    with self._watch(load_params, token, filename):
+      libgfl.gflLoadThumbnail(filename, width, height, byref(p_bitmap), byref(load_params), None)
+    return Bitmap(p_bitmap)
+
+  SCALED = namedtuple('SCALED', ['bitmap', 'path'])
+
+  def load_scaled(self, filename, max_width, max_height, method=GFL_RESIZE_BILINEAR, page=0, token=None):
+    """\
+    Charge une page réduite pour tenir dans `max_width` x `max_height` pixels (proportions conservées).
+
+    La réduction est faite au décodage si possible (gflLoadPreview avec
+    GFL_LOAD_PREVIEW_NO_CANVAS_RESIZE) ; sinon l'image complète est chargée puis réduite (gflResize).
+    Les dimensions viennent de file_info pour la première page, de l'en-tête de la page sinon.
+
+    :param int method: Méthode de redimensionnement GFL_RESIZE_xxx (GFL_RESIZE_QUICK : décodage rapide).
+    :param CancelToken token: Jeton d'annulation / délai des chargements (la réduction finale,
+                              gflResize, n'est pas interrompue).
+    :rtype: SCALED
+    :return: (Bitmap, chemin utilisé) : 'full' (image déjà assez petite), 'preview' (décodage réduit),
+             'preview+resize' (décodage réduit puis ajusté) ou 'resize' (chargement complet puis réduction).
+    """
+    full_width, full_height = self.page_size(filename, page, token)
+    if full_width <= max_width and full_height <= max_height:
+      return _GFL.SCALED(self.load_bitmap(filename, page, token=token), 'full')
+
+    ratio = min(float(max_width) / full_width, float(max_height) / full_height)
+    width = max(1, int(round(full_width * ratio)))
+    height = max(1, int(round(full_height * ratio)))
+
+    flags = GFL_LOAD_PREVIEW_NO_CANVAS_RESIZE
+    if method != GFL_RESIZE_QUICK:
+      flags |= GFL_LOAD_HIGH_QUALITY_THUMBNAIL
+    try:
+      bitmap = self.load_thumbnail(filename, width, height, page, flags, token)
+    except GFL_Cancelled:
+      raise
+    except GFL_Exception:
+      path = 'resize'
+      bitmap = self.load_bitmap(filename, page, token=token)
+    else:
+      if bitmap.Width <= max_width and bitmap.Height <= max_height:
+        return _GFL.SCALED(bitmap, 'preview')
+      path = 'preview+resize'
+
+    with bitmap:
+      p_bitmap = POINTER(GFL_BITMAP)()
+      libgfl.gflResize(bitmap, byref(p_bitmap), width, height, method, 0)
+    return _GFL.SCALED(Bitmap(p_bitmap), path)
+
+  def _alloc_like(self, header, width, height):
+    "Alloue une image du même type (et de même palette) que `header`."
+    p_bitmap = libgfl.gflAllockBitmapEx(header.Type, width, height, header.BitsPerComponent, 1, None)
+    if not p_bitmap:
+      raise GFL_Exception(GFL_ERROR_NO_MEMORY.value, "Allocation d'une image {}x{} impossible.".format(width, height))
+    bitmap = Bitmap(p_bitmap)
+    bitmap.pointer.contents.Xdpi = header.Xdpi
+    bitmap.pointer.contents.Ydpi = header.Ydpi
+    if header.ColorMap and bitmap.ColorMap:
+      ctypes.memmove(bitmap.ColorMap, header.ColorMap, ctypes.sizeof(GFL_COLORMAP))
+      bitmap.pointer.contents.ColorUsed = header.ColorUsed
+    return bitmap
+
+  def load_region(self, filename, rect, page=0, token=None):
+    """\
+    Charge un rectangle d'une page en lisant l'image ligne par ligne : la lecture s'arrête après
+    la dernière ligne utile et seules les colonnes utiles sont conservées.
+
+    :param rect: Rectangle à charger (limité à l'image).
+    :type  rect: GFL_RECT ou tuple(x, y, w, h)
+    :param CancelToken token: Jeton d'annulation / délai, vérifié entre deux lignes.
+    :rtype: Bitmap
+    """
+    if isinstance(rect, GFL_RECT):
+      rect = (rect.x, rect.y, rect.w, rect.h)
+    with self.line_reader(filename, page, token) as reader:
+      header = reader.bitmap.pointer.contents
+      x, y = max(0, rect[0]), max(0, rect[1])
+      w = min(rect[0] + rect[2], reader.width) - x
+      h = min(rect[1] + rect[3], reader.height) - y
+      if w <= 0 or h <= 0:
+        raise GFL_Exception(GFL_ERROR_BAD_PARAMETERS.value, "Rectangle {} hors de l'image.".format(rect))
+
+      copy = _column_copier(header)
+      region = self._alloc_like(header, w, h)
+      try:
+        buf = (GFL_UINT8 * reader.bytes_per_line)()
+        source = ctypes.addressof(buf)
+        destination = ctypes.addressof(region.Data.contents)
+        reader.skip(y)
+        for _ in range(h):
+          reader.read_line(buf)
+          copy(source, destination, x, w)
+          destination += region.BytesPerLine
+      except Exception:
+        region.close()
+        raise
+    return region
+
+  TILE = namedtuple('TILE', ['x', 'y', 'bitmap'])
+
+  def iter_tiles(self, filename, tile_width, tile_height, page=0, token=None):
+    """\
+    Parcourt une page par tuiles de `tile_width` x `tile_height` pixels (plus petites en bord d'image),
+    de gauche à droite puis de haut en bas.
+
+    Seule une bande de `tile_height` lignes est en mémoire, en plus des tuiles que l'appelant conserve :
+    chaque tuile est une image à libérer (close) dès qu'elle n'est plus utile.
+
+    :param CancelToken token: Jeton d'annulation / délai, vérifié entre deux lignes.
+    :rtype: iterator(TILE)
+    :return: (x, y, Bitmap)
+    """
+    with self.line_reader(filename, page, token) as reader:
+      header = reader.bitmap.pointer.contents
+      copy = _column_copier(header)
+      bpl = reader.bytes_per_line
+      # Chaque bande de `tile_height` lignes est lue dans le même tampon.
+      for index, band in enumerate(reader.iter_rows(tile_height)):
+        y = index * tile_height
+        rows = len(band) // bpl
+        source = ctypes.addressof((c_char * len(band)).from_buffer(band))
+        for x in range(0, reader.width, tile_width):
+          w = min(tile_width, reader.width - x)
+          tile = self._alloc_like(header, w, rows)
+          destination = ctypes.addressof(tile.Data.contents)
+          for k in range(rows):
+            copy(source + k * bpl, destination + k * tile.BytesPerLine, x, w)
+          yield _GFL.TILE(x, y, tile)
+
+  def pipeline(self, source, page=0):
+    """\
+    Chaîne de transformations à évaluer à la demande.
+
+    :param source: Fichier à charger ou image.
+    :rtype: Pipeline
+    """
+    return Pipeline(self, source, page)
+
+  def line_reader(self, filename, page=0, token=None):
+    """\
+    Ouvre un fichier pour une lecture ligne par ligne.
+
+    :param int page: Numéro de la page (fichiers multi-pages ou animés).
+    :param CancelToken token: Jeton d'annulation / délai, vérifié entre deux lignes.
+    :rtype: LineReader
+    """
+    return LineReader(filename, self.new_load_params(page), token)
+
+  def read_lines(self, filename, rows=1, page=0, token=None):
+    """\
+    Lit une image par blocs de `rows` lignes, à mémoire constante quelle que soit sa hauteur.
+
+    Le tampon retourné est réutilisé d'un bloc à l'autre (voir LineReader.iter_rows).
+
+    :param CancelToken token: Jeton d'annulation / délai, vérifié entre deux lignes.
+    :rtype: iterator(memoryview)
+    """
+    with self.line_reader(filename, page, token) as reader:
+      for block in reader.iter_rows(rows):
+        yield block
+
+  def line_writer(self, filename, bitmap, _type="tiff", compression=GFL_LZW):
+    """\
+    Crée un fichier à écrire ligne par ligne.
+
+    :param bitmap: Description de l'image (voir bitmap_header).
+    :param basestring _type: Nom du type de fichier à générer.
+    :param GFL_COMPRESSION compression: Mode de compression
+    :rtype: LineWriter
+    """
+    return LineWriter(filename, bitmap, self.new_save_params(_type, compression))
+
+  def transcode(self, src, dst, _type="tiff", compression=GFL_LZW, mode=None, page=0, streaming=True,
+                token=None):
+    """\
+    Convertit une page d'un fichier dans un autre format, sans modification de la géométrie.
+
+    En mode `streaming`, les lignes passent directement de gflLoadBitmapReadLine à
+    gflSaveBitmapWriteLine par un seul tampon : la mémoire utilisée ne dépend pas de la taille
+    de l'image. Sinon l'image complète est chargée puis enregistrée (gflLoadBitmap / gflSaveBitmap).
+
+    :param basestring src: Fichier à convertir.
+    :param basestring dst: Fichier à générer.
+    :param basestring _type: Nom du type de fichier à générer.
+    :param GFL_COMPRESSION compression: Mode de compression
+    :param GFL_MODE mode: Changement du nombre de couleurs (sans tramage), ligne par ligne en mode
+                          `streaming` : les modes vers une palette calculée (GFL_MODE_TO_xxxCOLORS)
+                          ne sont donc pas acceptés dans ce mode.
+    :param int page: Numéro de la page à convertir.
+    :param bool streaming: Conversion ligne par ligne.
+    :param CancelToken token: Jeton d'annulation / délai : vérifié entre deux lignes en mode
+                              `streaming`, pendant le décodage sinon.
+    """
+    save_params = self.new_save_params(_type, compression)
+
+    if not streaming:
+      with self.load_bitmap(src, page, token=token) as bitmap:
+        if mode is None:
+          libgfl.gflSaveBitmap(dst, bitmap, byref(save_params))
+        else:
+          p_bitmap2 = POINTER(GFL_BITMAP)()
+          libgfl.gflChangeColorDepth(bitmap, byref(p_bitmap2), mode, GFL_MODE_NO_DITHER)
+          with Bitmap(p_bitmap2) as bitmap2:
+            libgfl.gflSaveBitmap(dst, bitmap2, byref(save_params))
+      return
+
+    if mode is not None and GFL_MODE_TO_8COLORS <= mode <= GFL_MODE_TO_256COLORS:
+      raise GFL_Exception(GFL_ERROR_BAD_PARAMETERS.value,
+                          "Mode {} incompatible avec une conversion ligne par ligne.".format(mode))
+
+    with self.line_reader(src, page, token) as reader:
+      buf = (GFL_UINT8 * reader.bytes_per_line)()
+      if mode is None:
+        with LineWriter(dst, reader.bitmap, save_params) as writer:
+          for _ in range(reader.height):
+            reader.read_line(buf)
+            writer.write_line(buf)
+        return
+
+      # Image d'une ligne pointant sur le tampon, pour gflChangeColorDepth.
+      row = GFL_BITMAP.from_buffer_copy(reader.bitmap.pointer.contents)
+      row.Height = 1
+      row.Data = ctypes.cast(buf, POINTER(GFL_UINT8))
+      p_row = pointer(row)
+
+      writer = None
+      try:
+        for _ in range(reader.height):
+          reader.read_line(buf)
+          p_row2 = POINTER(GFL_BITMAP)()
+          libgfl.gflChangeColorDepth(p_row, byref(p_row2), mode, GFL_MODE_NO_DITHER)
+          with Bitmap(p_row2) as row2:
+            if writer is None:
+              # Le type de l'image générée n'est connu qu'après la première conversion.
+              header = GFL_BITMAP.from_buffer_copy(row2.pointer.contents)
+              header.Height = reader.height
+              writer = LineWriter(dst, header, save_params)
+            writer.write_line(row2.memoryview())
+      finally:
+        if writer is not None:
+          writer.close()
+
+  def _prepare_page(self, filename, page, load_params, dpi, mode, compression, comment, token=None):
+    """\
+    Charge une page et la prépare pour l'enregistrement (résolution, nombre de couleurs, commentaire).
+
+    :param GFL_LOAD_PARAMS load_params: Options de lecture (ImageWanted est modifié).
+    :rtype: Bitmap
+    """
+    p_bitmap2 = POINTER(GFL_BITMAP)()  # Image après transformation
+
+    # Charge une image :
+    with self.load_bitmap(filename, page, load_params, token) as bitmap:
+      # Change la résolution:
+      if dpi:
+        bitmap.pointer.contents.Xdpi = bitmap.pointer.contents.Ydpi = dpi
+
+      # Changement de type d'image :
+      if getattr(compression, 'value', compression) == GFL_CCITT_FAX4.value:
+        # La compression fax G4 ne fonctionne qu'avec le N&B.
+        libgfl.gflChangeColorDepth(bitmap, byref(p_bitmap2), GFL_MODE_TO_BINARY, GFL_MODE_NO_DITHER)
+      else:
+        libgfl.gflChangeColorDepth(bitmap, byref(p_bitmap2), mode, GFL_MODE_NO_DITHER)
+
+    with Bitmap(p_bitmap2) as bitmap2:
+      # Supprime les commentaires.
+      libgfl.gflBitmapSetComment(bitmap2, comment)
+      return Bitmap(bitmap2.detach())
+
   def convert2img(self, filenames, target, _type="tiff", compression=GFL_LZW,
-                  dpi=None, mode=GFL_MODE_TO_16GREY, comment=""):
+                  dpi=None, mode=GFL_MODE_TO_16GREY, comment="", threads=0, max_pending=8, token=None):
     """\
     Concatène des documents dans un seul
 
@@ -900,14 +3501,13 @@ class _GFL(object):
     :param basestring _type: Nom du type de fichier à générer.
     :param GFL_COMPRESSION compression: Mode de compression
     :param GFL_UINT16 dpi: Modifie le nombre de dpi avant changement du nombre de couleurs.
+    :param int threads: Nombre de threads de préparation des pages (0 : tout dans le thread courant).
+    :param int max_pending: Nombre maximum d'images chargées en mémoire en mode multi-thread.
+    :param CancelToken token: Jeton d'annulation / délai de l'ensemble de la conversion.
+    :raises GFL_Cancelled: si le jeton est annulé ou le délai dépassé (le fichier est incomplet).
     """
     # Calcul du nombre de pages au total :
-    nb_pages = []
-    file_info = GFL_FILE_INFORMATION()
-    for filename in filenames:
-      libgfl.gflGetFileInformation(filename, -1, byref(file_info))
-      nb_pages.append(file_info.NumberOfImages)
-      libgfl.gflFreeFileInformation(byref(file_info))
+    nb_pages = [self.file_info(filename).NumberOfImages for filename in filenames]
 
     # S'il n'y a qu'un seul fichier et qu'il est du type attendu, pas de transcodage.
     if len(nb_pages) == 1:
@@ -916,45 +3516,103 @@ class _GFL(object):
 
 
     sum_nb_pages = sum(nb_pages)  # Nombre total de pages.
+    pages = [(filename, page) for i, filename in enumerate(filenames) for page in range(nb_pages[i])]
 
-    self.save_params.Compression = compression
-    self.save_params.FormatIndex = libgfl.gflGetFormatIndexByName(_type)
+    save_params = self.new_save_params(_type, compression)
 
     handle = GFL_HANDLE()
-    p_bitmap = POINTER(GFL_BITMAP)()  # Image avant transformation
-    p_bitmap2 = POINTER(GFL_BITMAP)()  # Image après transformation
 
-    libgfl.gflFileCreate(byref(handle), target, sum_nb_pages, byref(self.save_params))
+    libgfl.gflFileCreate(byref(handle), target, sum_nb_pages, byref(save_params))
     try:
-      for i, filename in enumerate(filenames):
-        for page in xrange(nb_pages[i]):
-          self.load_params.ImageWanted = page
-          # Charge une image :
-          libgfl.gflLoadBitmap(filename, byref(p_bitmap), byref(self.load_params), None)
-
-          # Change la résolution:
-          if dpi:
-            p_bitmap.contents.Xdpi = p_bitmap.contents.Ydpi = dpi
-
-          # Changement de type d'image :
-          if compression == GFL_CCITT_FAX4:
-            # La compression fax G4 ne fonctionne qu'avec le N&B.
-            libgfl.gflChangeColorDepth(p_bitmap, byref(p_bitmap2), GFL_MODE_TO_BINARY, GFL_MODE_NO_DITHER)
-          else:
-            libgfl.gflChangeColorDepth(p_bitmap, byref(p_bitmap2), mode, GFL_MODE_NO_DITHER)
-
-          # Supprime les commentaires.
-          libgfl.gflBitmapSetComment(p_bitmap2, comment)
-
-          # Enregistre l'image :
-          libgfl.gflFileAddPicture(handle, p_bitmap2)
-
-          # Libération des ressources :
-          libgfl.gflFreeBitmap(p_bitmap)
-          libgfl.gflFreeBitmap(p_bitmap2)
+      if threads:
+        self._convert2img_pipeline(handle, pages, threads, max_pending, dpi, mode, compression, comment, token)
+      else:
+        load_params = self.new_load_params()
+        for filename, page in pages:
+          with self._prepare_page(filename, page, load_params, dpi, mode, compression, comment, token) as bitmap:
+            # Enregistre l'image :
+            libgfl.gflFileAddPicture(handle, bitmap)
     finally:
       libgfl.gflFileClose(handle)
 
+  def _convert2img_pipeline(self, handle, pages, threads, max_pending, dpi, mode, compression, comment, token):
+    """\
+    Assemble les pages en parallèle : les threads de travail chargent et transforment les pages
+    à l'avance, le thread courant les ajoute au fichier dans l'ordre.
+
+    Au plus `max_pending` images (en cours de préparation ou prêtes) sont en mémoire.
+    """
+    cond = threading.Condition()
+    slots = threading.Semaphore(max(1, max_pending))
+    tasks = iter(enumerate(pages))
+    ready = {}  # {numéro de page: Bitmap}
+    state = {'stop': False, 'error': None}
+
+    def worker():
+      # Chaque thread a ses propres options de lecture (ImageWanted).
+      load_params = self.new_load_params()
+      while True:
+        # La réservation précède la prise de tâche : la plus petite page non écrite a toujours sa place.
+        slots.acquire()
+        with cond:
+          task = None if state['stop'] else next(tasks, None)
+        if task is None:
+          slots.release()
+          return
+        index, (filename, page) = task
+        try:
+          bitmap = self._prepare_page(filename, page, load_params, dpi, mode, compression, comment, token)
+        except Exception as exc:
+          with cond:
+            state['stop'] = True
+            if state['error'] is None:
+              state['error'] = exc
+            cond.notify_all()
+          slots.release()
+          return
+        with cond:
+          ready[index] = bitmap
+          cond.notify_all()
+
+    workers = [threading.Thread(target=worker, name='gfl-page-{}'.format(i))
+               for i in range(min(threads, len(pages)))]
+    for thread in workers:
+      thread.daemon = True
+      thread.start()
+
+    try:
+      for index in range(len(pages)):
+        with cond:
+          while index not in ready and state['error'] is None:
+            cond.wait()
+          if index not in ready:
+            raise state['error']
+          bitmap = ready.pop(index)
+        try:
+          libgfl.gflFileAddPicture(handle, bitmap)
+        finally:
+          bitmap.close()
+          slots.release()
+    finally:
+      with cond:
+        state['stop'] = True
+      # Débloque les threads en attente d'une place.
+      for _ in workers:
+        slots.release()
+      for thread in workers:
+        thread.join()
+      for bitmap in ready.values():
+        bitmap.close()
+
+  @property
+  def formats(self):
+    """\
+    Index des formats de la bibliothèque (voir FormatRegistry).
+
+    :rtype: FormatRegistry
+    """
+    return FormatRegistry.get(self.formats_path)
+
   FMT_INFO = namedtuple('FMT_INFO', ['Description', 'Status', 'Extensions'])
   def get_formats(self):
     """\
@@ -964,15 +3622,8 @@ class _GFL(object):
     :return: {nom_format: namedtuple(description, status, list(Extension))}
 
     """
-    data = {}
-    nb_fmts = libgfl.gflGetNumberOfFormat()
-    fmt_info = GFL_FORMAT_INFORMATION()
-
-    for i in xrange(nb_fmts):
-      libgfl.gflGetFormatInformationByIndex(i, byref(fmt_info))
-      l_ext = [ctypes.cast(fmt_info.Extension[j], c_char_p).value for j in xrange(fmt_info.NumberOfExtension)]
-      data[fmt_info.Name] = GFL.FMT_INFO(fmt_info.Description, fmt_info.Status, l_ext)
-    return data
+    return dict((fmt.Name, _GFL.FMT_INFO(fmt.Description, fmt.Status, list(fmt.Extensions)))
+                for fmt in self.formats.formats.values())
 
   def is_ext_supported(self, ext):
     """\
@@ -981,17 +3632,7 @@ class _GFL(object):
     :rtype: bool
     :returs: True si le type de fichier est supporté et False sinon.
     """
-    if not GFL.formats_lisibles:
-      nb_fmts = libgfl.gflGetNumberOfFormat()
-      fmt_info = GFL_FORMAT_INFORMATION()
-
-      for i in xrange(nb_fmts):
-        libgfl.gflGetFormatInformationByIndex(i, byref(fmt_info))
-        GFL.formats_lisibles.update(ctypes.cast(fmt_info.Extension[j], c_char_p).value.lower()
-                                    for j in xrange(fmt_info.NumberOfExtension)
-                                    if (fmt_info.Status & GFL_READ))
-
-    return ext.lower() in GFL.formats_lisibles
+    return self.formats.is_ext_readable(ext)
 
   def _test(self):
     #filenames = [r'C:\home\scan_hellmann\25-DI-783210\toto.tiff']
@@ -1006,6 +3647,80 @@ class _GFL(object):
     self.convert2img(filenames, 'tutu_rle16.tiff', 'tiff', GFL_RLE, 75, GFL_MODE_TO_16GREY)
 
 
+# ==========================
+# Conversions par lots
+# ==========================
+BATCH_RESULT = namedtuple('BATCH_RESULT', ['index', 'target', 'ok', 'elapsed', 'error'])
+
+_batch_gfl = None  # Instance _GFL propre à chaque processus de travail
+_batch_error = None  # Erreur d'initialisation du processus de travail, levée à chaque travail
+
+
+def _batch_init():
+  """\
+  Initialise la bibliothèque une seule fois par processus de travail.
+
+  Une erreur (bibliothèque introuvable...) n'est pas levée : multiprocessing.Pool recréerait
+  indéfiniment le processus. Elle est conservée et levée par chaque travail (voir _batch_worker).
+  """
+  global _batch_gfl, _batch_error
+  try:
+    _batch_gfl = _GFL()
+  except Exception as exc:
+    _batch_error = exc
+
+
+def _batch_worker():
+  """\
+  Instance _GFL du processus de travail.
+
+  :raises GFL_Exception: si l'initialisation du processus a échoué.
+  """
+  if _batch_error is not None:
+    if isinstance(_batch_error, GFL_Exception):
+      raise _batch_error
+    raise GFL_Exception(GFL_UNKNOWN_ERROR.value, "Initialisation impossible : {!r}".format(_batch_error))
+  return _batch_gfl
+
+
+def _batch_run(job):
+  "Exécute une conversion dans un processus de travail."
+  index, (filenames, target, options) = job
+  start = _clock()
+  try:
+    _batch_worker().convert2img(filenames, target, **(options or {}))
+  except Exception as exc:
+    if not isinstance(exc, GFL_Exception):
+      exc = GFL_Exception(GFL_UNKNOWN_ERROR.value, repr(exc))
+    return BATCH_RESULT(index, target, False, _clock() - start, exc)
+  return BATCH_RESULT(index, target, True, _clock() - start, None)
+
+
+def convert_batch(jobs, processes=None, chunksize=1):
+  """\
+  Exécute un lot de conversions (voir _GFL.convert2img) sur un pool de processus.
+
+  Chaque processus initialise la bibliothèque une seule fois. Une erreur sur un travail
+  n'interrompt pas le lot : elle est retournée dans le résultat correspondant.
+
+  :param jobs: Travaux à exécuter.
+  :type  jobs: iterable((list(basestring), basestring, dict))
+  :param int processes: Nombre de processus (par défaut : nombre de cœurs).
+  :param int chunksize: Nombre de travaux envoyés à la fois à un processus.
+  :rtype: iterator(BATCH_RESULT)
+  :return: Résultats (index du travail, cible, succès, durée en s, GFL_Exception ou None)
+           dans l'ordre de fin d'exécution.
+  """
+  pool = multiprocessing.Pool(processes, initializer=_batch_init)
+  try:
+    for result in pool.imap_unordered(_batch_run, enumerate(jobs), chunksize):
+      yield result
+    pool.close()
+  finally:
+    pool.terminate()
+    pool.join()
+
+
 if __name__ == '__main__':
   with GFL() as gfl:
     print(gfl.get_formats())
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: test_gflserver.py
+:synopsis: Tests du serveur de conversion (bibliothèque simulée fakegfl).
+:author: Stéphane JULIEN
+
+Les opérations de test sont ajoutées à _OPERATIONS avant la création du pool : les processus
+de travail (fork) en héritent.
+
+Usage : python -m pytest pygfl/test_gflserver.py
+"""
+from __future__ import unicode_literals
+
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import pygfl
+import gflserver
+
+_DELAY = 0.3
+
+
+def _op_sleep(_gfl, delay=_DELAY):
+  time.sleep(delay)
+  return os.getpid()
+
+
+def _op_crash(_gfl):
+  os.kill(os.getpid(), signal.SIGKILL)
+
+
+def setUpModule():
+  if pygfl.libgfl is None:
+    pygfl.get_library('fake')
+  gflserver._OPERATIONS['sleep'] = _op_sleep
+  gflserver._OPERATIONS['crash'] = _op_crash
+
+
+def tearDownModule():
+  del gflserver._OPERATIONS['sleep']
+  del gflserver._OPERATIONS['crash']
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork'),
+                     "socket Unix ou fork indisponible")
+class ServerTest(unittest.TestCase):
+  def start(self, **options):
+    "Démarre un serveur ; retourne un client connecté."
+    directory = tempfile.mkdtemp(prefix='pygfl-test-')
+    self.addCleanup(shutil.rmtree, directory, True)
+    server = gflserver.GFLServer(os.path.join(directory, 'gfl.sock'), **options)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    self.addCleanup(server.server_close)
+    self.addCleanup(server.shutdown)
+    client = gflserver.GFLClient(server.server_address)
+    client.sock.settimeout(30)
+    self.addCleanup(client.close)
+    return client
+
+  def elapsed(self, client, count):
+    "Durée de `count` demandes envoyées sans attendre les réponses."
+    start = time.time()
+    idents = [client.submit('sleep') for _ in range(count)]
+    for ident in idents:
+      client.result(ident)
+    return time.time() - start
+
+  def test_max_inflight_serializes(self):
+    client = self.start(processes=3, max_inflight=1)
+    self.assertGreaterEqual(self.elapsed(client, 3), 3 * _DELAY)
+
+  def test_requests_run_in_parallel(self):
+    client = self.start(processes=3, max_inflight=3)
+    self.assertLess(self.elapsed(client, 3), 3 * _DELAY)
+
+  def test_lost_request_times_out(self):
+    client = self.start(processes=1, request_timeout=1)
+    with self.assertRaises(pygfl.GFL_Exception) as context:
+      client.call('crash')
+    self.assertIn("Pas de résultat", context.exception.args[-1])
+    # Le pool remplace le processus arrêté : les demandes suivantes sont servies.
+    self.assertIsInstance(client.call('sleep', delay=0), int)
+
+  def test_unknown_operation(self):
+    client = self.start(processes=1)
+    self.assertRaises(pygfl.GFL_Exception, client.call, 'nothing')
+    self.assertIsInstance(client.call('sleep', delay=0), int)
+
+
+if __name__ == '__main__':
+  unittest.main()
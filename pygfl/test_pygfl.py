@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+# $Id:  $
+"""
+:module: test_pygfl.py
+:synopsis: Tests de pygfl sur la bibliothèque simulée (fakegfl), sans libgfl.
+:author: Stéphane JULIEN
+
+Usage : python -m pytest pygfl/test_pygfl.py (ou python -m unittest test_pygfl depuis pygfl/)
+"""
+from __future__ import unicode_literals
+
+import ctypes
+import gc
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+import pygfl
+from pygfl import (GFL_BINARY, GFL_GREY, GFL_MODE_NO_DITHER, GFL_MODE_TO_256COLORS, GFL_MODE_TO_256GREY,
+                   GFL_RGB, Bitmap, BitmapClosedError, CancelToken, CountingAllocator, FileInfoCache,
+                   GFL_Cancelled, Pipeline, PoolingAllocator, ThumbnailCache, bitmap_header)
+
+gfl = None
+
+
+def setUpModule():
+  global gfl
+  if pygfl.libgfl is None:
+    pygfl.get_library('fake')
+  gfl = pygfl._GFL()
+
+
+def new_bitmap(_type, width, height, bits=8):
+  return Bitmap(pygfl.libgfl.gflAllockBitmapEx(_type, width, height, bits, 1, None))
+
+
+def live_bitmaps():
+  "Images allouées et non libérées par la bibliothèque simulée."
+  return len(pygfl.libgfl._bitmaps)
+
+
+def gradient(bitmap):
+  "Remplit les pixels d'un motif différent d'une ligne à l'autre ; retourne les octets écrits."
+  data = bytes(bytearray((3 * i + 7 * (i // bitmap.BytesPerLine)) & 0xff
+                         for i in range(bitmap.BytesPerLine * bitmap.Height)))
+  ctypes.memmove(bitmap.Data, data, len(data))
+  return data
+
+
+class TempDirTest(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.mkdtemp(prefix='pygfl-test-')
+    self.addCleanup(shutil.rmtree, self.directory, True)
+
+  def path(self, name):
+    return os.path.join(self.directory, name)
+
+  def write_image(self, name, _type=GFL_GREY, width=40, height=30, fmt='tiff'):
+    "Écrit une image de synthèse ; retourne (chemin, pixels)."
+    with new_bitmap(_type, width, height) as bitmap:
+      data = gradient(bitmap)
+      with open(self.path(name), 'wb') as fp:
+        fp.write(gfl.save_bytes(bitmap, fmt))
+    return self.path(name), data
+
+
+class PipelinePlanTest(unittest.TestCase):
+  def test_crop_moved_before_per_pixel_depth(self):
+    pipeline = Pipeline(None, 'image.tif').change_color_depth(GFL_MODE_TO_256GREY).crop(10, 10, 20, 20)
+    self.assertEqual(pipeline.plan(100, 100),
+                     [('crop', (10, 10, 20, 20)), ('depth', (GFL_MODE_TO_256GREY, GFL_MODE_NO_DITHER))])
+
+  def test_crop_kept_after_palette_depth(self):
+    # La palette calculée dépend de toute l'image : le recadrage ne doit pas la précéder.
+    pipeline = Pipeline(None, 'image.tif').change_color_depth(GFL_MODE_TO_256COLORS).crop(10, 10, 20, 20)
+    self.assertEqual(pipeline.plan(100, 100),
+                     [('depth', (GFL_MODE_TO_256COLORS, GFL_MODE_NO_DITHER)), ('crop', (10, 10, 20, 20))])
+
+
+class BitmapTest(unittest.TestCase):
+  def test_close_frees_once(self):
+    before = live_bitmaps()
+    bitmap = new_bitmap(GFL_GREY, 4, 3)
+    self.assertEqual(live_bitmaps(), before + 1)
+    bitmap.close()
+    bitmap.close()
+    self.assertTrue(bitmap.closed)
+    self.assertEqual(live_bitmaps(), before)
+
+  def test_with_block_frees(self):
+    before = live_bitmaps()
+    with new_bitmap(GFL_RGB, 4, 3) as bitmap:
+      self.assertEqual((bitmap.Width, bitmap.Height), (4, 3))
+    self.assertEqual(live_bitmaps(), before)
+
+  def test_close_deferred_while_view_exists(self):
+    before = live_bitmaps()
+    bitmap = new_bitmap(GFL_GREY, 4, 3)
+    view = bitmap.memoryview()
+    bitmap.close()
+    self.assertEqual(live_bitmaps(), before + 1)
+    self.assertEqual(len(view.tobytes()), 12)  # La mémoire est toujours valide.
+    del view
+    gc.collect()
+    self.assertEqual(live_bitmaps(), before)
+
+  def test_detach_gives_ownership_back(self):
+    before = live_bitmaps()
+    bitmap = new_bitmap(GFL_GREY, 4, 3)
+    p_bitmap = bitmap.detach()
+    self.assertTrue(bitmap.closed)
+    del bitmap
+    gc.collect()
+    self.assertEqual(live_bitmaps(), before + 1)
+    pygfl.libgfl.gflFreeBitmap(p_bitmap)
+    self.assertEqual(live_bitmaps(), before)
+
+  def test_detach_refused_while_view_exists(self):
+    with new_bitmap(GFL_GREY, 4, 3) as bitmap:
+      view = bitmap.memoryview()
+      self.assertRaises(BufferError, bitmap.detach)
+      del view
+
+  def test_closed_fields(self):
+    bitmap = new_bitmap(GFL_GREY, 4, 3)
+    bitmap.close()
+    self.assertFalse(hasattr(bitmap, 'Width'))
+    self.assertIsNone(getattr(bitmap, 'Width', None))
+    self.assertRaises(ValueError, lambda: bitmap.Width)
+    self.assertRaises(BitmapClosedError, lambda: bitmap.Width)
+
+
+class PixelsTest(unittest.TestCase):
+  def test_set_get_rect(self):
+    with new_bitmap(GFL_RGB, 5, 4) as bitmap:
+      data = bytes(bytearray(range(2 * 3 * 3)))
+      bitmap.set_pixels((1, 2, 3, 2), data)
+      self.assertEqual(bytes(bitmap.get_pixels((1, 2, 3, 2))), data)
+      self.assertEqual(bytes(bitmap.get_pixels((0, 2, 1, 1))), b'\0\0\0')
+
+  def test_rgba_of_grey(self):
+    with new_bitmap(GFL_GREY, 2, 1) as bitmap:
+      bitmap.set_pixels(None, b'\x10\x20')
+      self.assertEqual(bytes(bitmap.get_pixels(rgba=True)), b'\x10\x10\x10\xff\x20\x20\x20\xff')
+
+  def test_fill(self):
+    with new_bitmap(GFL_RGB, 3, 2) as bitmap:
+      bitmap.fill((1, 0, 2, 2), (1, 2, 3))
+      self.assertEqual(bytes(bitmap.get_pixels()), b'\0\0\0\1\2\3\1\2\3' * 2)
+
+  def test_binary_partial_byte_kept(self):
+    with new_bitmap(GFL_BINARY, 12, 1, 1) as bitmap:
+      bitmap.set_pixels(None, b'\xff\xff')
+      bitmap.set_pixels((8, 0, 2, 1), b'\x00')
+      # Les bits au-delà de la largeur restent à zéro.
+      self.assertEqual(bytes(bitmap.get_pixels()), b'\xff\x30')
+
+  def test_rect_outside_image(self):
+    with new_bitmap(GFL_GREY, 3, 2) as bitmap:
+      self.assertRaises(pygfl.GFL_Exception, bitmap.get_pixels, (2, 0, 2, 1))
+
+
+@unittest.skipIf(numpy is None, "numpy absent")
+class ArrayTest(unittest.TestCase):
+  def test_view_shares_pixels(self):
+    with new_bitmap(GFL_RGB, 4, 3) as bitmap:
+      array = bitmap.to_array()
+      self.assertEqual(array.shape, (3, 4, 3))
+      array[1, 2] = (7, 8, 9)
+      self.assertEqual(bytes(bitmap.get_pixels((2, 1, 1, 1))), b'\x07\x08\x09')
+
+  def test_view_keeps_bitmap_alive(self):
+    before = live_bitmaps()
+    bitmap = new_bitmap(GFL_GREY, 4, 3)
+    array = bitmap.to_array()
+    bitmap.close()
+    array[0, 0] = 1
+    self.assertEqual(live_bitmaps(), before + 1)
+    del array
+    gc.collect()
+    self.assertEqual(live_bitmaps(), before)
+
+  def test_raw_pointer_needs_steal(self):
+    before = live_bitmaps()
+    p_bitmap = pygfl.libgfl.gflAllockBitmapEx(GFL_GREY, 4, 3, 8, 1, None)
+    self.assertRaises(TypeError, pygfl.bitmap_to_array, p_bitmap)
+    array = pygfl.bitmap_to_array(p_bitmap, steal=True)
+    self.assertEqual(array.shape, (3, 4))
+    del array
+    gc.collect()
+    self.assertEqual(live_bitmaps(), before)
+
+
+class LineIOTest(TempDirTest):
+  def test_writer_then_reader(self):
+    header = bitmap_header(GFL_GREY, 16, 5)
+    rows = bytes(bytearray(range(16 * 5)))
+    path = pygfl._fs_native(self.path('lines.tif'))
+    with gfl.line_writer(path, header, 'tiff') as writer:
+      writer.write_rows(rows[:32])
+      writer.write_rows(rows[32:])
+    self.assertEqual(b''.join(bytes(block) for block in gfl.read_lines(path, rows=2)), rows)
+    with gfl.line_reader(path) as reader:
+      self.assertEqual((reader.width, reader.height), (16, 5))
+      reader.skip(3)
+      self.assertEqual(bytes(bytearray(reader.read_line())), rows[48:64])
+
+  def test_load_region(self):
+    path, data = self.write_image('region.tif')
+    with gfl.load_region(pygfl._fs_native(path), (5, 10, 4, 3)) as region:
+      self.assertEqual(bytes(region.get_pixels()),
+                       b''.join(data[y * 40 + 5:y * 40 + 9] for y in range(10, 13)))
+
+  def test_transcode_streaming_matches_full(self):
+    path = pygfl._fs_native(self.write_image('src.tif', GFL_RGB)[0])
+    streamed, full = (pygfl._fs_native(self.path(name)) for name in ('streamed.png', 'full.png'))
+    gfl.transcode(path, streamed, 'png', None)
+    gfl.transcode(path, full, 'png', None, streaming=False)
+    with gfl.load_bitmap(streamed) as a, gfl.load_bitmap(full) as b:
+      self.assertEqual(bytes(a.get_pixels()), bytes(b.get_pixels()))
+
+  def test_cancel_between_lines(self):
+    path = pygfl._fs_native(self.write_image('cancel.tif')[0])
+    token = CancelToken()
+    with gfl.line_reader(path, token=token) as reader:
+      reader.read_line()
+      token.cancel()
+      self.assertRaises(GFL_Cancelled, reader.read_line)
+      self.assertEqual(reader.line, 1)
+    self.assertRaises(GFL_Cancelled, gfl.load_region, path, (0, 0, 4, 4), token=token)
+
+
+class AllocatorTest(unittest.TestCase):
+  def test_limit(self):
+    allocator = CountingAllocator(limit=1000)
+    ptr = allocator._alloc(600, None)
+    self.assertTrue(ptr)
+    self.assertIsNone(allocator._alloc(600, None))
+    self.assertIsNone(allocator._realloc(ptr, 1200, None))
+    allocator._free(ptr, None)
+    stats = allocator.stats()
+    self.assertEqual((stats['live_bytes'], stats['peak_bytes'], stats['failures']), (0, 600, 2))
+
+  def test_unknown_pointer_goes_to_libc(self):
+    allocator = CountingAllocator()
+    ptr = pygfl._get_libc().malloc(16)
+    ptr = allocator._realloc(ptr, 32, None)
+    self.assertTrue(ptr)
+    allocator._free(ptr, None)
+    self.assertEqual(allocator.stats()['live_bytes'], 0)
+
+  def test_pool_reuses_blocks(self):
+    allocator = PoolingAllocator(min_size=1024)
+    ptr = allocator._alloc(3000, None)
+    allocator._free(ptr, None)
+    self.assertEqual(allocator._alloc(4000, None), ptr)  # Même classe de taille (4096)
+    stats = allocator.stats()
+    self.assertEqual((stats['pool_hits'], stats['pool_misses'], stats['pooled_bytes']), (1, 1, 0))
+    allocator._free(ptr, None)
+    allocator.trim()
+    self.assertEqual(allocator.stats()['pooled_bytes'], 0)
+
+  def test_pooled_bytes_count_against_limit(self):
+    allocator = PoolingAllocator(limit=8192, min_size=1024)
+    allocator._free(allocator._alloc(4096, None), None)
+    self.assertEqual(allocator.stats()['pooled_bytes'], 4096)
+    ptr = allocator._alloc(8192, None)  # Possible seulement en rendant le bloc conservé.
+    self.assertTrue(ptr)
+    stats = allocator.stats()
+    self.assertEqual((stats['live_bytes'], stats['pooled_bytes']), (8192, 0))
+    allocator._free(ptr, None)
+    allocator.trim()
+
+
+class FileInfoCacheTest(TempDirTest):
+  def test_lookup_and_invalidation(self):
+    path = self.write_image('a.tif', width=40)[0]
+    with FileInfoCache(gfl, self.path('info.db')) as cache:
+      self.assertEqual(cache.get(path).Width, 40)
+      self.write_image('a.tif', width=64)
+      os.utime(path, (time.time() + 10, time.time() + 10))
+      self.assertEqual(cache.get(path).Width, 64)
+
+  def test_memory_lru_bounded(self):
+    paths = [self.write_image('{}.tif'.format(name))[0] for name in 'abc']
+    with FileInfoCache(gfl, self.path('info.db'), max_entries=2) as cache:
+      for path in paths:
+        cache.get(path)
+      cache.get(paths[1])
+      self.assertEqual([os.path.basename(key) for key in cache._memo], ['c.tif', 'b.tif'])
+      self.assertEqual(cache.get(paths[0]).Width, 40)  # Relue dans la base SQLite.
+      self.assertEqual(cache.scan(self.directory, threads=2, extensions={'tif'}), (3, 0, 0))
+
+
+class ThumbnailCacheTest(TempDirTest):
+  def test_counters_and_memory_lru(self):
+    path = self.write_image('a.tif', width=80, height=60)[0]
+    cache = ThumbnailCache(gfl, _type='png')
+    first = cache.get(path, 20, 20)
+    self.assertEqual(cache.get(path, 20, 20), first)
+    self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (1, 0, 1))
+    cache.max_bytes = len(first)
+    cache.get(path, 10, 10)
+    self.assertEqual(cache.size, len(cache._lru[next(iter(cache._lru))]))
+    self.assertEqual(len(cache._lru), 1)
+
+  def test_disk_cache_and_cap(self):
+    path = self.write_image('a.tif', width=80, height=60)[0]
+    directory = self.path('thumbs')
+    size = len(ThumbnailCache(gfl, directory=directory, _type='png').get(path, 20, 20))
+    cache = ThumbnailCache(gfl, directory=directory, _type='png')
+    cache.get(path, 20, 20)
+    self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (0, 1, 0))
+
+    capped = ThumbnailCache(gfl, directory=directory, _type='png', max_disk_bytes=size * 2)
+    for height in range(21, 26):
+      capped.get(path, 20, height)
+    self.assertLessEqual(capped.disk_size, size * 2)
+    self.assertEqual(capped.disk_size, sum(os.path.getsize(os.path.join(directory, name))
+                                           for name in os.listdir(directory)))
+    capped.trim_disk(0)
+    self.assertEqual(os.listdir(directory), [])
+
+
+@unittest.skipIf(numpy is None, "numpy absent")
+class BufferAddressTest(unittest.TestCase):
+  def test_c_order_not_copied(self):
+    array = numpy.arange(12, dtype=numpy.uint8).reshape(3, 4)
+    _keep, address, size = pygfl._buffer_address(array)
+    self.assertEqual((address, size), (array.ctypes.data, 12))
+
+  def test_fortran_order_copied(self):
+    array = numpy.arange(12, dtype=numpy.uint8).reshape(3, 4)
+    for data in (array.T, numpy.asfortranarray(array)):
+      _keep, address, size = pygfl._buffer_address(data)
+      self.assertEqual(ctypes.string_at(address, size), data.tobytes())
+
+  def test_set_pixels_transposed(self):
+    data = numpy.arange(12, dtype=numpy.uint8).reshape(3, 4).T  # 4 lignes de 3 pixels
+    with new_bitmap(GFL_GREY, 3, 4) as bitmap:
+      bitmap.set_pixels(None, data)
+      self.assertEqual(bytes(bitmap.get_pixels()), data.tobytes())
+
+
+if __name__ == '__main__':
+  unittest.main()